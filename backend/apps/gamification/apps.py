@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class GamificationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.gamification'
+    
+    def ready(self):
+        # Register background job handlers
+        from . import tasks  # noqa: F401
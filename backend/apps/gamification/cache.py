@@ -0,0 +1,87 @@
+"""
+Leaderboard result cache with stale-while-revalidate and single-flight
+recomputation.
+
+Each entry holds the serialized payload, the time it was computed and the
+time it stops being fresh. Entries are kept for LEADERBOARD_CACHE_STALE_TTL
+seconds beyond that, so when one goes stale exactly one worker (the one that
+wins the cache lock) recomputes it while every other request keeps getting
+the previous result. Only a cold cache makes callers wait, and then only for
+the lock holder's result; if the holder fails it leaves a short-lived marker
+so the waiters stop waiting and compute the value themselves.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+LOCK_SUFFIX = ':lock'
+FAILED_SUFFIX = ':failed'
+FAILED_MARKER_TTL = 5  # seconds; long enough for every waiter's next poll
+POLL_INTERVAL = 0.05
+
+
+def get_or_refresh(key, compute):
+    """
+    Return the cached entry for ``key`` as a dict with ``data`` and
+    ``generated_at``, recomputing it with ``compute()`` when it is stale.
+    """
+    entry = cache.get(key)
+    if entry is not None and entry['fresh_until'] > time.time():
+        return entry
+    
+    lock_key = key + LOCK_SUFFIX
+    lock_timeout = settings.LEADERBOARD_CACHE_LOCK_TIMEOUT
+    if cache.add(lock_key, True, lock_timeout):
+        try:
+            return _refresh(key, compute)
+        finally:
+            cache.delete(lock_key)
+    
+    if entry is not None:
+        # Someone else is refreshing; serve the stale result meanwhile
+        return entry
+    
+    # Cold cache: wait for the lock holder instead of piling on the database
+    deadline = time.time() + lock_timeout
+    while time.time() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if cache.get(key + FAILED_SUFFIX):
+            break
+    return _refresh(key, compute)
+
+
+def refresh(key, compute):
+    """
+    Recompute ``key`` ahead of demand (e.g. from a warmup job) unless another
+    worker is already doing so; returns the new entry or None.
+    """
+    lock_key = key + LOCK_SUFFIX
+    if not cache.add(lock_key, True, settings.LEADERBOARD_CACHE_LOCK_TIMEOUT):
+        return None
+    try:
+        return _refresh(key, compute)
+    finally:
+        cache.delete(lock_key)
+
+
+def _refresh(key, compute):
+    generated_at = timezone.now()
+    try:
+        data = compute()
+    except Exception:
+        # Tell callers waiting on a cold cache to stop waiting for us
+        cache.set(key + FAILED_SUFFIX, True, FAILED_MARKER_TTL)
+        raise
+    entry = {
+        'data': data,
+        'generated_at': generated_at,
+        'fresh_until': time.time() + settings.LEADERBOARD_CACHE_TTL,
+    }
+    cache.set(key, entry, settings.LEADERBOARD_CACHE_TTL + settings.LEADERBOARD_CACHE_STALE_TTL)
+    cache.delete(key + FAILED_SUFFIX)
+    return entry
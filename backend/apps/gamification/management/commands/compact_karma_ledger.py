@@ -0,0 +1,113 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from apps.gamification.models import DAILY_ROLLUP_REASON, LEADERBOARD_WINDOWS, KarmaRollup, KarmaTransaction
+
+# Compacting moves entries to the start of their day, so only days entirely
+# outside the longest leaderboard window may be compacted
+MIN_OLDER_THAN_DAYS = max(period for period in LEADERBOARD_WINDOWS.values() if period).days
+
+
+class Command(BaseCommand):
+    help = (
+        'Compact KarmaTransaction entries older than --older-than-days into '
+        'one daily summary row per user and post or comment, keeping ledger '
+        'storage and index size bounded. Sums over any range aligned to whole '
+        'days, including all-time totals, are unchanged, and summaries keep '
+        'their object so deleting it still takes its karma back. Safe to run '
+        'alongside live traffic: only entries that existed when the run '
+        'started are compacted. The hourly KarmaRollup buckets of those days '
+        'are rebuilt from the summaries, leaving one bucket per user and day.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=90,
+            help=(
+                'Only compact entries from days that ended at least this many days ago '
+                f'(at least {MIN_OLDER_THAN_DAYS}, the longest leaderboard window).'
+            ),
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows per bulk_create batch of summary entries.',
+        )
+    
+    def handle(self, *args, older_than_days, batch_size, **options):
+        if older_than_days < MIN_OLDER_THAN_DAYS:
+            raise CommandError(
+                f'--older-than-days must be at least {MIN_OLDER_THAN_DAYS} so compacted '
+                f'days stay outside every leaderboard window'
+            )
+        
+        today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        cutoff = today - timezone.timedelta(days=older_than_days)
+        # Reverts of deleted content are dated back into old days; ones
+        # appended during the run are left for the next run
+        last_id = KarmaTransaction.objects.aggregate(last_id=Max('id'))['last_id']
+        entries = KarmaTransaction.objects.exclude(reason=DAILY_ROLLUP_REASON).filter(id__lte=last_id or 0)
+        
+        oldest = min(filter(None, [
+            entries.filter(created_at__lt=cutoff).aggregate(oldest=Min('created_at'))['oldest'],
+            # Hourly buckets left from runs that only compacted the ledger
+            KarmaRollup.objects.filter(bucket__lt=cutoff, bucket__hour__gt=0).aggregate(oldest=Min('bucket'))['oldest'],
+        ]), default=None)
+        if oldest is None:
+            self.stdout.write('Nothing to compact')
+            return
+        
+        compacted = summaries = 0
+        day = oldest.replace(hour=0, minute=0, second=0, microsecond=0)
+        # One short transaction per day keeps write locks brief
+        while day < cutoff:
+            next_day = day + timezone.timedelta(days=1)
+            with transaction.atomic():
+                day_entries = entries.filter(created_at__gte=day, created_at__lt=next_day)
+                totals = (
+                    day_entries.order_by()
+                    .values('user_id', 'content_type_id', 'object_id')
+                    .annotate(karma=Sum('karma_change'))
+                )
+                rows = [
+                    KarmaTransaction(
+                        user_id=row['user_id'],
+                        karma_change=row['karma'],
+                        reason=DAILY_ROLLUP_REASON,
+                        content_type_id=row['content_type_id'],
+                        object_id=row['object_id'],
+                        created_at=day,
+                    )
+                    for row in totals
+                    if row['karma']
+                ]
+                deleted, _ = day_entries.delete()
+                KarmaTransaction.objects.bulk_create(rows, batch_size=batch_size)
+                
+                # Rollups stay per-hour sums of the ledger (what
+                # KarmaRollup.objects.refresh computes), which now mostly
+                # sit in the day's first hour
+                hours = (
+                    KarmaTransaction.objects.filter(created_at__gte=day, created_at__lt=next_day)
+                    .order_by()
+                    .annotate(hour=TruncHour('created_at'))
+                    .values('user_id', 'hour')
+                    .annotate(karma=Sum('karma_change'))
+                )
+                buckets = [
+                    KarmaRollup(user_id=row['user_id'], bucket=row['hour'], karma=row['karma'])
+                    for row in hours
+                    if row['karma']
+                ]
+                KarmaRollup.objects.filter(bucket__gte=day, bucket__lt=next_day).delete()
+                KarmaRollup.objects.bulk_create(buckets, batch_size=batch_size)
+            compacted += deleted
+            summaries += len(rows)
+            day = next_day
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Compacted {compacted} ledger entries into {summaries} daily summaries '
+            f'(before {cutoff:%Y-%m-%d})'
+        ))
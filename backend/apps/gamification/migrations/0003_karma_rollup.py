@@ -0,0 +1,65 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_karma_rollups(apps, schema_editor):
+    """Bucket existing likes by receiving author and hour."""
+    Like = apps.get_model('posts', 'Like')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    KarmaRollup = apps.get_model('gamification', 'KarmaRollup')
+    
+    # content_type_id -> (karma per like, {object_id: author_id})
+    sources = {}
+    for model, name, karma in ((Post, 'post', 5), (Comment, 'comment', 1)):
+        content_type = ContentType.objects.filter(app_label='posts', model=name).first()
+        if content_type:
+            sources[content_type.id] = (karma, dict(model.objects.values_list('id', 'author_id')))
+    
+    buckets = {}
+    likes = Like.objects.values_list('content_type_id', 'object_id', 'created_at')
+    for content_type_id, object_id, created_at in likes.iterator(chunk_size=2000):
+        karma, authors = sources.get(content_type_id, (0, {}))
+        author_id = authors.get(object_id)
+        if author_id is None:
+            continue
+        key = (author_id, created_at.replace(minute=0, second=0, microsecond=0))
+        buckets[key] = buckets.get(key, 0) + karma
+    
+    KarmaRollup.objects.bulk_create(
+        [KarmaRollup(user_id=user_id, bucket=bucket, karma=karma) for (user_id, bucket), karma in buckets.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('gamification', '0002_initial'),
+        ('posts', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KarmaRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('karma', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='karma_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'karma_rollups',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='karmarollup',
+            constraint=models.UniqueConstraint(fields=('user', 'bucket'), name='unique_karma_rollup_bucket'),
+        ),
+        migrations.RunPython(backfill_karma_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:46
+
+from django.db import migrations, models
+
+
+def backfill_karma_ledger(apps, schema_editor):
+    """Write one ledger entry per existing like, dated when the like was made."""
+    Like = apps.get_model('posts', 'Like')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    KarmaTransaction = apps.get_model('gamification', 'KarmaTransaction')
+    
+    # Keep the historical timestamps instead of auto_now_add's "now"
+    KarmaTransaction._meta.get_field('created_at').auto_now_add = False
+    
+    # content_type_id -> (reason, karma per like, {object_id: author_id})
+    sources = {}
+    for model, name, karma in ((Post, 'post', 5), (Comment, 'comment', 1)):
+        content_type = ContentType.objects.filter(app_label='posts', model=name).first()
+        if content_type:
+            sources[content_type.id] = (f'{name}_like', karma, dict(model.objects.values_list('id', 'author_id')))
+    
+    entries = []
+    likes = Like.objects.values_list('content_type_id', 'object_id', 'created_at')
+    for content_type_id, object_id, created_at in likes.iterator(chunk_size=2000):
+        reason, karma, authors = sources.get(content_type_id, (None, 0, {}))
+        author_id = authors.get(object_id)
+        if author_id is None:
+            continue
+        entries.append(KarmaTransaction(
+            user_id=author_id,
+            karma_change=karma,
+            reason=reason,
+            content_type_id=content_type_id,
+            object_id=object_id,
+            created_at=created_at,
+        ))
+    KarmaTransaction.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0003_karma_rollup'),
+        ('posts', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='karmatransaction',
+            index=models.Index(fields=['user', 'created_at'], name='karma_tx_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='karmatransaction',
+            index=models.Index(fields=['created_at'], name='karma_tx_created_idx'),
+        ),
+        migrations.RunPython(backfill_karma_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:46
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0004_karma_ledger'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='karmatransaction',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamification', '0005_karma_transaction_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='karmatransaction',
+            index=models.Index(fields=['content_type', 'object_id'], name='karma_tx_object_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('gamification', '0006_karma_object_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardStanding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('1h', '1h'), ('24h', '24h'), ('7d', '7d'), ('30d', '30d'), ('all', 'all')], max_length=10)),
+                ('karma', models.IntegerField()),
+                ('rank', models.PositiveIntegerField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'leaderboard_standings',
+                'indexes': [models.Index(fields=['period', '-karma', 'user'], name='leaderboard_keyset_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardstanding',
+            constraint=models.UniqueConstraint(fields=('period', 'rank'), name='unique_leaderboard_rank'),
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardstanding',
+            constraint=models.UniqueConstraint(fields=('period', 'user'), name='unique_leaderboard_user'),
+        ),
+    ]
@@ -1,108 +1,336 @@
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
-from django.db.models import Sum, Case, When, IntegerField, F, Count
+from django.db import IntegrityError, connections, models, router, transaction
+from django.db.models import F, Sum, Q, UniqueConstraint, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 
 from apps.users.models import User
 
+# Karma awarded to the author per like received
+POST_LIKE_KARMA = 5
+COMMENT_LIKE_KARMA = 1
+
+# KarmaTransaction.reason of the daily summaries (per user and object)
+# written by the compact_karma_ledger command in place of the entries they
+# replace
+DAILY_ROLLUP_REASON = 'daily_rollup'
+
+
+def karma_bucket(moment):
+    """Start of the hour containing ``moment``; the KarmaRollup granularity."""
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+# Leaderboard windows; None means all-time
+LEADERBOARD_WINDOWS = {
+    '1h': timezone.timedelta(hours=1),
+    '24h': timezone.timedelta(hours=24),
+    '7d': timezone.timedelta(days=7),
+    '30d': timezone.timedelta(days=30),
+    'all': None,
+}
+
 
 class KarmaManager(models.Manager):
-    """Custom manager for karma calculations."""
+    """
+    Custom manager for karma calculations.
+    Rankings are grouped sums over the KarmaTransaction ledger, ordered by
+    (karma desc, user_id asc) so every user has a stable, unique rank. Each
+    window's ranking is materialized into LeaderboardStanding, numbered,
+    at most once per LEADERBOARD_CACHE_TTL by whichever worker finds it
+    stale; pages and rank lookups are then short index scans of it. The
+    full ranking is never loaded into Python.
+    """
+    
+    def ranking(self, window='24h', now=None):
+        """Grouped queryset of {'user_id', 'karma'} for users with positive karma in ``window``."""
+        entries = KarmaTransaction.objects.order_by()
+        period = LEADERBOARD_WINDOWS[window]
+        if period is not None:
+            entries = entries.filter(created_at__gte=(now or timezone.now()) - period)
+        return (
+            entries
+            .values('user_id')
+            .annotate(karma=Sum('karma_change'))
+            .filter(karma__gt=0)
+        )
     
-    def get_leaderboard(self, limit=5):
+    def standings(self, window='24h'):
         """
-        Get top users by karma earned in the last 24 hours.
-        This dynamically calculates karma from like history.
+        Make sure ``window``'s LeaderboardStanding rows are at most
+        LEADERBOARD_CACHE_TTL seconds old, rebuilding them if not (once
+        across workers sharing the cache). Returns when they were computed.
         """
-        from apps.posts.models import Like, Post, Comment
-        from django.contrib.contenttypes.models import ContentType
-        
-        # Calculate the timestamp for 24 hours ago
-        twenty_four_hours_ago = timezone.now() - timezone.timedelta(hours=24)
-        
-        # Get content types
-        post_content_type = ContentType.objects.get_for_model(Post)
-        comment_content_type = ContentType.objects.get_for_model(Comment)
+        from . import cache
         
-        # Get karma from post likes in the last 24 hours (5 karma each)
-        post_karma = (
-            Like.objects
-            .filter(
-                created_at__gte=twenty_four_hours_ago,
-                content_type=post_content_type
-            )
-            .values('object_id')  # The post ID
-            .annotate(post_karma=Count('id') * 5)
-        )
-        
-        # Get karma from comment likes in the last 24 hours (1 karma each)
-        comment_karma = (
-            Like.objects
-            .filter(
-                created_at__gte=twenty_four_hours_ago,
-                content_type=comment_content_type
-            )
-            .values('object_id')  # The comment ID
-            .annotate(comment_karma=Count('id'))
+        entry = cache.get_or_refresh(f'leaderboard-standings:{window}', lambda: self.rebuild_standings(window))
+        return entry['generated_at']
+    
+    def rebuild_standings(self, window='24h'):
+        """
+        Replace ``window``'s standings with the current ranking, numbered,
+        using one INSERT ... SELECT so the rows never pass through Python.
+        """
+        ranked = self.ranking(window).annotate(
+            rank=Window(RowNumber(), order_by=[F('karma').desc(), F('user_id').asc()])
         )
+        sql, params = ranked.query.sql_with_params()
+        using = router.db_for_write(LeaderboardStanding)
+        quote = connections[using].ops.quote_name
+        columns = ', '.join(quote(column) for column in ('user_id', 'karma', 'rank'))
+        try:
+            with transaction.atomic(using=using):
+                LeaderboardStanding.objects.using(using).filter(period=window).delete()
+                with connections[using].cursor() as cursor:
+                    cursor.execute(
+                        f'INSERT INTO {quote(LeaderboardStanding._meta.db_table)} ({quote("period")}, {columns}) '
+                        f'SELECT %s, {columns} FROM ({sql}) ranked',
+                        (window, *params),
+                    )
+        except IntegrityError:
+            # Another worker rebuilt the same window concurrently
+            pass
+    
+    def get_leaderboard(self, limit=5, window='24h', offset=0, after=None):
+        """
+        Get a page of top users by karma earned in ``window``.
+        ``after`` is a (karma, user_id, rank) keyset cursor from the last row
+        of the previous page; it replaces ``offset`` for deep pages.
+        Returns users annotated with ``karma`` and ``rank``.
+        """
+        self.standings(window)
+        standings = self._standings(window)
+        if after is not None:
+            karma, user_id, _ = after
+            standings = standings.filter(Q(karma__lt=karma) | Q(karma=karma, user_id__gt=user_id))
+            offset = 0
+        else:
+            standings = standings.filter(rank__gt=offset)
         
-        # Combine the karma data
-        combined_karma = {}
-        
-        # Add post karma
-        for item in post_karma:
-            post_id = item['object_id']
-            try:
-                post = Post.objects.get(id=post_id)
-                user_id = post.author.id
-                combined_karma[user_id] = combined_karma.get(user_id, 0) + item['post_karma']
-            except Post.DoesNotExist:
-                continue
-        
-        # Add comment karma
-        for item in comment_karma:
-            comment_id = item['object_id']
-            try:
-                comment = Comment.objects.get(id=comment_id)
-                user_id = comment.author.id
-                combined_karma[user_id] = combined_karma.get(user_id, 0) + item['comment_karma']
-            except Comment.DoesNotExist:
-                continue
-        
-        # Get users with karma and sort
-        user_ids_with_karma = [user_id for user_id, karma in combined_karma.items() if karma > 0]
-        
-        if not user_ids_with_karma:
-            return []
+        rows = list(standings.order_by('rank').values('user_id', 'karma', 'rank')[:limit])
+        return self._with_users(rows)
+    
+    def get_rank(self, user_id, window='24h', neighbors=2):
+        """
+        Get a user's rank in ``window`` with up to ``neighbors`` users on each
+        side from the window's standings: one lookup of the user's row and
+        one range of ranks around it. Returns None when the user has no
+        positive karma; ``generated_at`` is when the standings were computed.
+        """
+        generated_at = self.standings(window)
+        standings = self._standings(window)
         
-        users = User.objects.filter(id__in=user_ids_with_karma)
+        row = standings.filter(user_id=user_id).values('user_id', 'karma', 'rank').first()
+        if row is None:
+            return None
         
-        # Create leaderboard
+        rank = row['rank']
+        rows = list(
+            standings.filter(rank__gte=rank - neighbors, rank__lte=rank + neighbors)
+            .order_by('rank')
+            .values('user_id', 'karma', 'rank')
+        )
+        users = self._with_users(rows)
+        position = rank - rows[0]['rank']
+        return {
+            'rank': rank,
+            'karma': row['karma'],
+            'user': users[position],
+            'above': users[:position],
+            'below': users[position + 1:],
+            'generated_at': generated_at,
+        }
+    
+    @staticmethod
+    def _standings(window):
+        # Read where rebuild_standings writes: a replica may lag behind the
+        # rebuild and serve an empty ranking
+        return LeaderboardStanding.objects.using(router.db_for_write(LeaderboardStanding)).filter(period=window)
+    
+    @staticmethod
+    def _with_users(rows):
+        """Load the users for standings rows and annotate them with karma and rank."""
+        user_ids = [row['user_id'] for row in rows]
+        users = User.objects.in_bulk(user_ids)
+        totals = KarmaTransaction.objects.totals(user_ids)
         leaderboard = []
-        for user in users:
-            user.karma_24h = combined_karma[user.id]
+        for row in rows:
+            user = users[row['user_id']]
+            user.karma = row['karma']
+            user.rank = row['rank']
+            user.total_karma = totals.get(user.id, 0)
             leaderboard.append(user)
+        return leaderboard
+
+
+class KarmaTransactionManager(models.Manager):
+    """Manager for appending to and summing the karma ledger."""
+    
+    def totals(self, user_ids):
+        """Return {user_id: total_karma} for many users in one grouped query."""
+        return dict(
+            self.filter(user_id__in=user_ids)
+            .order_by()
+            .values_list('user_id')
+            .annotate(total=Sum('karma_change'))
+        )
+    
+    def append(self, entries):
+        """
+        Append ledger entries with a single bulk INSERT and queue a refresh
+        of the receivers' hourly KarmaRollup buckets. Call it inside the
+        transaction that caused the karma change.
+        """
+        from apps.jobs import queue
         
-        # Sort by karma_24h descending and limit
-        leaderboard.sort(key=lambda x: x.karma_24h, reverse=True)
-        return leaderboard[:limit]
+        entries = self.bulk_create(entries)
+        buckets = {(entry.user_id, karma_bucket(entry.created_at).isoformat()) for entry in entries}
+        queue.enqueue_many([
+            (
+                'gamification.refresh_rollups',
+                {'user_id': user_id, 'bucket': bucket},
+                f'karma-rollup:{user_id}:{bucket}',
+            )
+            for user_id, bucket in sorted(buckets)
+        ])
+        return entries
+    
+    def revert(self, model, object_ids, reason):
+        """
+        Take back the karma recorded against posts or comments (``model``)
+        that are being deleted, as if it had never been earned. Each
+        (user, object, moment) sum of their entries gets a negated entry
+        dated the same, so every window, rollup and leaderboard drops it;
+        entries from an earlier revert cancel out, so reverting twice is
+        harmless. Call it inside the deleting transaction.
+        """
+        content_type = ContentType.objects.db_manager(self.db).get_for_model(model)
+        rows = (
+            self.filter(content_type=content_type, object_id__in=object_ids)
+            .order_by()
+            .values_list('user_id', 'object_id', 'created_at')
+            .annotate(karma=Sum('karma_change'))
+            .exclude(karma=0)
+        )
+        return self.append([
+            KarmaTransaction(
+                user_id=user_id,
+                karma_change=-karma,
+                reason=reason,
+                content_type=content_type,
+                object_id=object_id,
+                created_at=created_at,
+            )
+            for user_id, object_id, created_at, karma in rows
+        ])
 
 
 class KarmaTransaction(models.Model):
     """
-    Model to track karma transactions for audit purposes.
-    This is optional but useful for debugging and analytics.
+    Append-only karma ledger: one signed entry per karma change, keyed by
+    the user who received it (+5/-5 for post likes/unlikes, +1/-1 for
+    comments). Karma totals, windows and leaderboards are sums over it.
+    Deleting a post or comment appends entries cancelling the karma it
+    earned (see KarmaTransactionManager.revert).
     """
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='karma_transactions')
     karma_change = models.IntegerField()  # Positive for gain, negative for loss
-    reason = models.CharField(max_length=100)  # 'post_like', 'comment_like', 'post_unlike', etc.
+    reason = models.CharField(max_length=100)  # 'post_like', 'comment_unlike', 'post_deleted', etc.
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
     object_id = models.PositiveIntegerField(null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: compacted daily summaries are dated to their day
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    objects = KarmaTransactionManager()
     
     class Meta:
         db_table = 'karma_transactions'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='karma_tx_user_created_idx'),
+            models.Index(fields=['created_at'], name='karma_tx_created_idx'),
+            # Finds an object's entries when it is deleted
+            models.Index(fields=['content_type', 'object_id'], name='karma_tx_object_idx'),
+        ]
     
     def __str__(self):
         return f'{self.user.username}: {self.karma_change:+d} ({self.reason})'
+
+
+class KarmaRollupManager(models.Manager):
+    """Manager for incrementally maintained per-user karma buckets."""
+    
+    def refresh(self, user_id, bucket):
+        """
+        Set the user's bucket starting at ``bucket`` to the ledger's sum over
+        that hour. Idempotent, so it is safe to run from a retried or
+        duplicated background job.
+        """
+        karma = KarmaTransaction.objects.filter(
+            user_id=user_id,
+            created_at__gte=bucket,
+            created_at__lt=bucket + timezone.timedelta(hours=1),
+        ).aggregate(karma=Sum('karma_change'))['karma'] or 0
+        self.update_or_create(user_id=user_id, bucket=bucket, defaults={'karma': karma})
+    
+    def history(self, user_id, since=None):
+        """
+        Return [(bucket, karma), ...] for a user in bucket order, optionally
+        only from ``since``; one range scan over the (user, bucket) index.
+        """
+        rows = self.filter(user_id=user_id)
+        if since is not None:
+            rows = rows.filter(bucket__gte=karma_bucket(since))
+        return list(rows.order_by('bucket').values_list('bucket', 'karma'))
+
+
+class KarmaRollup(models.Model):
+    """
+    Karma received by a user, bucketed by hour.
+    Refreshed from the ledger by a background job after every karma change,
+    counting karma at the time of the event (a later unlike subtracts from
+    the unlike's bucket), so any window or daily series is a range sum over
+    one user's rows.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='karma_rollups')
+    bucket = models.DateTimeField()  # start of the hour
+    karma = models.IntegerField(default=0)
+    
+    objects = KarmaRollupManager()
+    
+    class Meta:
+        db_table = 'karma_rollups'
+        constraints = [
+            # Also serves as the (user, bucket) range index
+            UniqueConstraint(fields=['user', 'bucket'], name='unique_karma_rollup_bucket')
+        ]
+    
+    def __str__(self):
+        return f'{self.user_id} @ {self.bucket:%Y-%m-%d %H:00}: {self.karma:+d}'
+
+
+class LeaderboardStanding(models.Model):
+    """
+    One user's place in a materialized leaderboard window: everyone with
+    positive karma in the window, numbered from 1 in (karma desc, user_id)
+    order. Rebuilt wholesale by KarmaManager.rebuild_standings.
+    """
+    period = models.CharField(max_length=10, choices=[(window, window) for window in LEADERBOARD_WINDOWS])
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    karma = models.IntegerField()
+    rank = models.PositiveIntegerField()
+    
+    class Meta:
+        db_table = 'leaderboard_standings'
+        constraints = [
+            # Also serves offset pages and neighbor ranges
+            UniqueConstraint(fields=['period', 'rank'], name='unique_leaderboard_rank'),
+            UniqueConstraint(fields=['period', 'user'], name='unique_leaderboard_user'),
+        ]
+        indexes = [
+            # Keyset cursors
+            models.Index(fields=['period', '-karma', 'user'], name='leaderboard_keyset_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.period} #{self.rank}: {self.user_id} ({self.karma})'
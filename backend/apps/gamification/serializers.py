@@ -4,11 +4,14 @@ from .models import KarmaManager
 
 
 class LeaderboardUserSerializer(UserSerializer):
-    """Serializer for users in leaderboard with 24h karma."""
-    karma_24h = serializers.IntegerField(read_only=True)
+    """Serializer for users in leaderboard with their rank and window karma."""
+    rank = serializers.IntegerField(read_only=True)
+    karma = serializers.IntegerField(read_only=True)
+    # Name used before windows were configurable; same value as karma
+    karma_24h = serializers.IntegerField(source='karma', read_only=True)
     
     class Meta(UserSerializer.Meta):
-        fields = UserSerializer.Meta.fields + ['karma_24h']
+        fields = UserSerializer.Meta.fields + ['rank', 'karma', 'karma_24h']
 
 
 class LeaderboardSerializer(serializers.Serializer):
@@ -0,0 +1,29 @@
+"""Background job handlers (see apps/jobs/queue.py)."""
+from datetime import datetime
+
+from apps.jobs.queue import register
+from . import cache
+from .models import KarmaRollup
+
+# The page the frontend shows, and so the one worth keeping warm
+WARM_LEADERBOARD_WINDOW = '24h'
+WARM_LEADERBOARD_LIMIT = 5
+
+
+@register('gamification.refresh_rollups')
+def refresh_rollups(payloads):
+    """Recompute the hourly KarmaRollup buckets touched by new ledger entries."""
+    for user_id, bucket in sorted({(p['user_id'], p['bucket']) for p in payloads}):
+        KarmaRollup.objects.refresh(user_id, datetime.fromisoformat(bucket))
+
+
+@register('gamification.warm_leaderboard')
+def warm_leaderboard(payloads):
+    """
+    Recompute the default leaderboard page so readers don't pay for it.
+    Only useful across processes when CACHES is shared (e.g. Redis).
+    """
+    from .views import compute_leaderboard, leaderboard_cache_key
+    
+    key = leaderboard_cache_key(WARM_LEADERBOARD_WINDOW, WARM_LEADERBOARD_LIMIT)
+    cache.refresh(key, lambda: compute_leaderboard(WARM_LEADERBOARD_WINDOW, WARM_LEADERBOARD_LIMIT))
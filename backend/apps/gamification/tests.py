@@ -1,3 +1,307 @@
-from django.test import TestCase
+import time
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.jobs import queue
+from apps.posts.models import Comment, Like, Post
+from apps.users.models import User
+from . import cache as leaderboard_cache
+from .models import COMMENT_LIKE_KARMA, POST_LIKE_KARMA, KarmaManager, KarmaRollup, KarmaTransaction
+
+
+class LedgerTestCase(TestCase):
+    """Writes karma through the ledger and runs the jobs it queues."""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.now = timezone.now()
+    
+    def credit(self, user, karma, age=timezone.timedelta(0), reason='post_like'):
+        KarmaTransaction.objects.append([
+            KarmaTransaction(user=user, karma_change=karma, reason=reason, created_at=self.now - age)
+        ])
+        queue.drain()
+
+
+class KarmaHistoryTests(LedgerTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='author')
+    
+    def history(self, **params):
+        response = self.client.get(f'/api/gamification/users/{self.user.id}/karma/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+    
+    def test_windows_and_daily_series_come_from_rollups(self):
+        self.credit(self.user, 5)
+        self.credit(self.user, 1, age=timezone.timedelta(days=2))
+        self.credit(self.user, 5, age=timezone.timedelta(days=10))
+        
+        data = self.history(days=3)
+        self.assertEqual(data['total_karma'], 11)
+        self.assertEqual(data['windows'], {'24h': 5, '7d': 6, '30d': 11, 'all': 11})
+        self.assertEqual([day['karma'] for day in data['daily']], [1, 0, 5])
+    
+    def test_windows_longer_than_the_ledger_count_as_all_time(self):
+        self.credit(self.user, 5, age=timezone.timedelta(days=400))
+        
+        data = self.history(windows='999999999d,99999999999999999999h,all')
+        self.assertEqual(data['windows'], {'999999999d': 5, '99999999999999999999h': 5, 'all': 5})
+        for window in ('0d', '7x', '-1d'):
+            response = self.client.get(f'/api/gamification/users/{self.user.id}/karma/', {'windows': window})
+            self.assertEqual(response.status_code, 400)
+    
+    def test_legacy_keys_are_kept_and_clamped_at_zero(self):
+        self.credit(self.user, 5, age=timezone.timedelta(days=3))
+        # Unliked today: the 24h net change is negative
+        self.credit(self.user, -5, reason='post_unlike')
+        
+        data = self.history(windows='24h')
+        self.assertEqual(data['windows'], {'24h': -5})
+        self.assertEqual(data['karma_24h'], 0)
+        self.assertEqual(data['karma_7d'], 0)
+        self.assertEqual(data['total_karma'], 0)
+
+
+class KarmaReversalTests(LedgerTestCase):
+    """Deleting content takes back the karma it earned."""
+    
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create(username='author')
+        self.fan = User.objects.create(username='fan')
+        self.post = Post.objects.create(author=self.author, content='hello')
+        self.comment = Comment.objects.create(author=self.author, post=self.post, content='reply')
+    
+    def like(self, content_object):
+        Like.toggle_like(self.fan, content_object)
+        queue.drain()
+    
+    def leaderboard(self, window):
+        cache.clear()
+        response = self.client.get('/api/gamification/leaderboard/', {'window': window})
+        self.assertEqual(response.status_code, 200)
+        return [(user['username'], user['karma']) for user in response.data['users']]
+    
+    def test_deleting_a_liked_post_removes_it_from_the_leaderboard(self):
+        self.like(self.post)
+        self.like(self.comment)
+        self.assertEqual(self.leaderboard('24h'), [('author', POST_LIKE_KARMA + COMMENT_LIKE_KARMA)])
+        
+        self.post.delete()
+        queue.drain()
+        for window in ('24h', 'all'):
+            self.assertEqual(self.leaderboard(window), [])
+        self.assertEqual(KarmaTransaction.objects.totals([self.author.id]), {self.author.id: 0})
+        self.assertEqual(sum(KarmaRollup.objects.filter(user=self.author).values_list('karma', flat=True)), 0)
+    
+    def test_delete_with_threads_reverts_post_and_comment_karma(self):
+        self.like(self.post)
+        self.like(self.comment)
+        
+        Post.objects.filter(pk=self.post.pk).delete_with_threads()
+        queue.drain()
+        self.assertEqual(self.leaderboard('all'), [])
+    
+    def test_tombstoning_reverts_comment_karma_once(self):
+        self.like(self.post)
+        self.like(self.comment)
+        
+        self.comment.tombstone()
+        self.comment.tombstone()
+        queue.drain()
+        self.assertEqual(self.leaderboard('24h'), [('author', POST_LIKE_KARMA)])
+    
+    def test_reverting_again_adds_nothing(self):
+        self.like(self.post)
+        self.like(self.post)
+        self.like(self.post)
+        KarmaTransaction.objects.revert(Post, [self.post.pk], 'post_deleted')
+        entries = KarmaTransaction.objects.count()
+        
+        KarmaTransaction.objects.revert(Post, [self.post.pk], 'post_deleted')
+        self.assertEqual(KarmaTransaction.objects.count(), entries)
+        self.assertEqual(KarmaTransaction.objects.totals([self.author.id]), {self.author.id: 0})
+
+
+class CompactKarmaLedgerTests(LedgerTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create(username='author')
+        self.other = User.objects.create(username='other')
+        self.post = Post.objects.create(author=self.author, content='hello')
+        # Hours into a day 45 days back
+        day = (self.now - timezone.timedelta(days=45)).replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        def old(hours):
+            return self.now - day - timezone.timedelta(hours=hours)
+        
+        for hours in (1, 2, 5, 9):
+            self.credit(self.author, POST_LIKE_KARMA, age=old(hours), post=self.post)
+        self.credit(self.author, -POST_LIKE_KARMA, age=old(12), reason='post_unlike', post=self.post)
+        self.credit(self.other, 1, age=old(3))
+        self.credit(self.author, 1, age=timezone.timedelta(days=3))
+    
+    def credit(self, user, karma, age=timezone.timedelta(0), reason='post_like', post=None):
+        KarmaTransaction.objects.append([
+            KarmaTransaction(
+                user=user, karma_change=karma, reason=reason, created_at=self.now - age,
+                content_type=ContentType.objects.get_for_model(Post) if post else None,
+                object_id=post.pk if post else None,
+            )
+        ])
+        queue.drain()
+    
+    def snapshot(self):
+        history = self.client.get(f'/api/gamification/users/{self.author.id}/karma/', {'days': 60}).data
+        return (
+            KarmaTransaction.objects.totals([self.author.id, self.other.id]),
+            history['windows'],
+            history['daily'],
+        )
+    
+    def test_compaction_keeps_totals_windows_and_daily_series(self):
+        before = self.snapshot()
+        entries = KarmaTransaction.objects.count()
+        
+        call_command('compact_karma_ledger', older_than_days=30, stdout=StringIO())
+        self.assertEqual(self.snapshot(), before)
+        # Five old author entries and the other user's became two summaries
+        self.assertEqual(KarmaTransaction.objects.count(), entries - 4)
+        old_buckets = KarmaRollup.objects.filter(bucket__lt=self.now - timezone.timedelta(days=30))
+        self.assertEqual(sorted(old_buckets.values_list('user__username', 'karma')), [('author', 15), ('other', 1)])
+    
+    def test_compacted_karma_is_still_reverted_on_delete(self):
+        call_command('compact_karma_ledger', older_than_days=30, stdout=StringIO())
+        self.post.delete()
+        queue.drain()
+        self.assertEqual(KarmaTransaction.objects.totals([self.author.id]), {self.author.id: 1})
+        self.assertEqual(self.snapshot()[1]['all'], 1)
+    
+    def test_older_than_days_must_cover_every_leaderboard_window(self):
+        with self.assertRaises(CommandError):
+            call_command('compact_karma_ledger', older_than_days=29, stdout=StringIO())
+
+
+class LeaderboardTests(LedgerTestCase):
+    
+    def setUp(self):
+        super().setUp()
+        self.users = [User.objects.create(username=f'user{n}') for n in range(6)]
+        # user0: 1, user1: 2, ... earned in the last hour; user5 also earned 100 last week
+        for n, user in enumerate(self.users):
+            self.credit(user, n + 1, age=timezone.timedelta(minutes=30))
+        self.credit(self.users[5], 100, age=timezone.timedelta(days=3))
+        self.credit(self.users[0], -10, age=timezone.timedelta(days=20))
+    
+    def ranking(self, window, **params):
+        response = self.client.get('/api/gamification/leaderboard/', {'window': window, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(user['rank'], user['username'], user['karma']) for user in response.data['users']], response.data
+    
+    def test_windows_rank_by_karma_earned_in_them(self):
+        self.assertEqual(self.ranking('1h', limit=3)[0], [(1, 'user5', 6), (2, 'user4', 5), (3, 'user3', 4)])
+        self.assertEqual(self.ranking('7d', limit=2)[0], [(1, 'user5', 106), (2, 'user4', 5)])
+        # user0 is net negative over 30 days, so not ranked
+        thirty_days, _ = self.ranking('30d', limit=10)
+        self.assertEqual([username for _, username, _ in thirty_days], ['user5', 'user4', 'user3', 'user2', 'user1'])
+    
+    def test_offset_and_cursor_pages_continue_the_ranking(self):
+        first, data = self.ranking('1h', limit=2)
+        by_cursor, _ = self.ranking('1h', limit=2, cursor=data['next_cursor'])
+        by_offset, _ = self.ranking('1h', limit=2, offset=2)
+        self.assertEqual(by_cursor, [(3, 'user3', 4), (4, 'user2', 3)])
+        self.assertEqual(by_offset, by_cursor)
+    
+    def test_my_rank_has_neighbors_from_the_standings(self):
+        self.client.force_authenticate(self.users[2])
+        response = self.client.get('/api/gamification/leaderboard/me/', {'window': '1h', 'neighbors': 1})
+        self.assertEqual(response.data['rank'], 4)
+        self.assertEqual(response.data['karma'], 3)
+        self.assertEqual([user['username'] for user in response.data['above']], ['user3'])
+        self.assertEqual([user['username'] for user in response.data['below']], ['user1'])
+        self.assertIn('generated_at', response.data)
+    
+    def test_rank_is_none_without_positive_karma(self):
+        self.assertIsNone(KarmaManager().get_rank(self.users[0].id, window='30d'))
+    
+    def test_standings_are_reused_until_stale(self):
+        KarmaManager().get_rank(self.users[1].id, window='1h')
+        self.credit(self.users[1], 50)
+        # Served from the standings built before the new karma ...
+        self.assertEqual(KarmaManager().get_rank(self.users[1].id, window='1h')['rank'], 5)
+        # ... until they are rebuilt
+        cache.clear()
+        self.assertEqual(KarmaManager().get_rank(self.users[1].id, window='1h')['rank'], 1)
+
+
+@override_settings(LEADERBOARD_CACHE_TTL=15, LEADERBOARD_CACHE_STALE_TTL=120, LEADERBOARD_CACHE_LOCK_TIMEOUT=10)
+class LeaderboardCacheTests(SimpleTestCase):
+    """Stale-while-revalidate with a single recomputation at a time."""
+    
+    key = 'leaderboard:test'
+    
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+    
+    def compute(self):
+        self.calls += 1
+        return f'result {self.calls}'
+    
+    def get(self):
+        return leaderboard_cache.get_or_refresh(self.key, self.compute)['data']
+    
+    def hold_lock(self):
+        cache.add(self.key + leaderboard_cache.LOCK_SUFFIX, True, 10)
+    
+    def test_fresh_entry_is_served_without_recomputing(self):
+        self.assertEqual(self.get(), 'result 1')
+        self.assertEqual(self.get(), 'result 1')
+        self.assertEqual(self.calls, 1)
+    
+    def test_stale_entry_is_served_while_another_worker_refreshes(self):
+        self.get()
+        with mock.patch.object(leaderboard_cache.time, 'time', return_value=time.time() + 60):
+            self.hold_lock()
+            self.assertEqual(self.get(), 'result 1')
+            self.assertEqual(self.calls, 1)
+            # Once the lock is free the next caller refreshes it
+            cache.delete(self.key + leaderboard_cache.LOCK_SUFFIX)
+            self.assertEqual(self.get(), 'result 2')
+    
+    def test_cold_cache_waits_for_the_lock_holder(self):
+        self.hold_lock()
+        
+        def holder_finishes(seconds):
+            leaderboard_cache._refresh(self.key, lambda: 'from holder')
+        
+        with mock.patch.object(leaderboard_cache.time, 'sleep', side_effect=holder_finishes):
+            self.assertEqual(self.get(), 'from holder')
+        self.assertEqual(self.calls, 0)
+    
+    def test_failed_holder_releases_the_lock_and_stops_waiters(self):
+        def broken():
+            raise RuntimeError('database down')
+        
+        with self.assertRaises(RuntimeError):
+            leaderboard_cache.get_or_refresh(self.key, broken)
+        self.assertIsNone(cache.get(self.key + leaderboard_cache.LOCK_SUFFIX))
+        
+        # A waiter that saw the lock taken gives up after one poll
+        self.hold_lock()
+        with mock.patch.object(leaderboard_cache.time, 'sleep') as sleep:
+            self.assertEqual(self.get(), 'result 1')
+        self.assertEqual(sleep.call_count, 1)
+        self.assertIsNone(cache.get(self.key + leaderboard_cache.FAILED_SUFFIX))
@@ -6,5 +6,6 @@ app_name = 'gamification'
 urlpatterns = [
     # Leaderboard endpoints
     path('leaderboard/', views.leaderboard, name='leaderboard'),
+    path('leaderboard/me/', views.my_rank, name='leaderboard-my-rank'),
     path('users/<int:user_id>/karma/', views.user_karma_history, name='user-karma-history'),
 ]
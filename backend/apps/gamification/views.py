@@ -1,32 +1,69 @@
+import base64
+import hashlib
+import re
+
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from django.utils import timezone
-from django.db import models
 
-from .models import KarmaManager
+from apps.users.models import User
+from . import cache
+from .models import LEADERBOARD_WINDOWS, KarmaManager, KarmaRollup, karma_bucket
 from .serializers import LeaderboardUserSerializer
 
+WINDOW_RE = re.compile(r'^(\d+)([hd])$')
+MAX_LEADERBOARD_LIMIT = 100
+MAX_RANK_NEIGHBORS = 25
+DEFAULT_KARMA_WINDOWS = '24h,7d,30d,all'
+# Response keys kept from before ?windows= existed, always included
+LEGACY_KARMA_WINDOWS = {'karma_24h': '24h', 'karma_7d': '7d'}
+MAX_HISTORY_DAYS = 365
+# Windows at least this long reach back before any ledger entry, so they
+# are answered as 'all' (and never overflow datetime arithmetic)
+MAX_WINDOW = timezone.timedelta(days=100 * 365)
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def leaderboard(request):
     """
-    Get the top 5 users by karma earned in the last 24 hours.
-    This dynamically calculates karma from like history.
+    Get a page of the karma leaderboard (by default the top 5 users by
+    karma earned in the last 24 hours).
+    Query params: ?window= (1h, 24h, 7d, 30d, all), ?limit= and either
+    ?offset= or the ?cursor= returned as next_cursor for deep pages.
+    Pages are served from a short-lived cache that a single worker refreshes
+    while other requests get the previous result; generated_at is when the
+    served ranking was actually computed.
     """
     try:
-        karma_manager = KarmaManager()
-        top_users = karma_manager.get_leaderboard(limit=5)
-        
-        # Serialize the data
-        serializer = LeaderboardUserSerializer(top_users, many=True)
+        window = request.GET.get('window', '24h')
+        if window not in LEADERBOARD_WINDOWS:
+            raise ValueError(f'window must be one of: {", ".join(LEADERBOARD_WINDOWS)}')
+        limit = int(request.GET.get('limit', 5))
+        offset = int(request.GET.get('offset', 0))
+        if not 1 <= limit <= MAX_LEADERBOARD_LIMIT or offset < 0:
+            raise ValueError(f'limit must be between 1 and {MAX_LEADERBOARD_LIMIT} and offset non-negative')
+        cursor = request.GET.get('cursor')
+        after = decode_rank_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+    
+    try:
+        key = leaderboard_cache_key(window, limit, offset, cursor)
+        entry = cache.get_or_refresh(key, lambda: compute_leaderboard(window, limit, offset, after))
         
-        return Response({
-            'users': serializer.data,
-            'generated_at': timezone.now(),
-            'period': '24_hours'
+        response = Response({
+            'users': entry['data']['users'],
+            'next_cursor': entry['data']['next_cursor'],
+            'generated_at': entry['generated_at'],
+            'period': window
         })
+        # Identifies this cache entry version so the compression middleware
+        # compresses it once rather than per request
+        version = f'{key}:{entry["generated_at"].isoformat()}:{request.accepted_renderer.format}'
+        response['ETag'] = f'"{hashlib.sha256(version.encode()).hexdigest()[:32]}"'
+        return response
         
     except Exception as e:
         return Response({
@@ -34,69 +71,147 @@ def leaderboard(request):
         }, status=500)
 
 
+def leaderboard_cache_key(window, limit, offset=0, cursor=None):
+    return f'leaderboard:{window}:{limit}:{offset}:{cursor or ""}'
+
+
+def compute_leaderboard(window, limit, offset=0, after=None):
+    """The cached payload for one leaderboard page."""
+    users = KarmaManager().get_leaderboard(limit=limit, window=window, offset=offset, after=after)
+    return {
+        'users': LeaderboardUserSerializer(users, many=True).data,
+        # A full page may have more after it
+        'next_cursor': encode_rank_cursor(users[-1]) if len(users) == limit else None,
+    }
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def my_rank(request):
+    """
+    Get the current user's leaderboard rank for ?window= (default 24h) with
+    up to ?neighbors= users ranked directly above and below them, read from
+    the window's standings; generated_at is when those were computed.
+    """
+    try:
+        window = request.GET.get('window', '24h')
+        if window not in LEADERBOARD_WINDOWS:
+            raise ValueError(f'window must be one of: {", ".join(LEADERBOARD_WINDOWS)}')
+        neighbors = int(request.GET.get('neighbors', 2))
+        if not 0 <= neighbors <= MAX_RANK_NEIGHBORS:
+            raise ValueError(f'neighbors must be between 0 and {MAX_RANK_NEIGHBORS}')
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+    
+    result = KarmaManager().get_rank(request.user.id, window=window, neighbors=neighbors)
+    if result is None:
+        # No positive karma in the window, so not on the leaderboard
+        return Response({'rank': None, 'karma': 0, 'above': [], 'below': [], 'period': window})
+    
+    return Response({
+        'rank': result['rank'],
+        'karma': result['karma'],
+        'user': LeaderboardUserSerializer(result['user']).data,
+        'above': LeaderboardUserSerializer(result['above'], many=True).data,
+        'below': LeaderboardUserSerializer(result['below'], many=True).data,
+        'generated_at': result['generated_at'],
+        'period': window
+    })
+
+
+def encode_rank_cursor(user):
+    """Opaque keyset cursor for the ranking position after ``user``."""
+    raw = f'{user.karma}:{user.id}:{user.rank}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_rank_cursor(cursor):
+    """Inverse of encode_rank_cursor; returns (karma, user_id, rank)."""
+    try:
+        karma, user_id, rank = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+        return int(karma), int(user_id), int(rank)
+    except ValueError:  # includes binascii and unicode decode errors
+        raise ValueError('Invalid cursor')
+
+
+def parse_window(value):
+    """
+    Parse a window like '24h', '7d' or 'all' into a timedelta (None =
+    all-time). Windows of MAX_WINDOW or more count as all-time.
+    """
+    if value == 'all':
+        return None
+    match = WINDOW_RE.match(value)
+    if not match or int(match.group(1)) < 1:
+        raise ValueError(f'Invalid window {value!r}')
+    amount, unit = int(match.group(1)), match.group(2)
+    hours = amount if unit == 'h' else amount * 24
+    if hours >= MAX_WINDOW.total_seconds() // 3600:
+        return None
+    return timezone.timedelta(hours=hours)
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def user_karma_history(request, user_id):
     """
     Get karma history for a specific user.
-    This is an additional endpoint for debugging/analytics.
+    Answers any set of windows (?windows=24h,7d,30d,all) plus a zero-filled
+    daily series for the last ?days= days from a single range scan over the
+    user's hourly KarmaRollup buckets.
+    
+    Window and daily values are net changes, so they go negative when more
+    karma is taken back (unlikes, deleted content) than earned in the
+    period. karma_24h and karma_7d keep their original meaning of karma
+    earned and are clamped at zero.
     """
     try:
-        from apps.users.models import User
-        from django.contrib.contenttypes.models import ContentType
-        from apps.posts.models import Like
-        
-        user = User.objects.get(pk=user_id)
-        
-        # Calculate karma from likes in different time periods
-        now = timezone.now()
-        
-        # Last 24 hours
-        last_24h = now - timezone.timedelta(hours=24)
-        karma_24h = Like.objects.filter(
-            content_object__author=user,
-            created_at__gte=last_24h
-        ).aggregate(
-            karma=models.Sum(
-                models.Case(
-                    models.When(content_type__model='post', then=5),
-                    models.When(content_type__model='comment', then=1),
-                    default=0,
-                    output_field=models.IntegerField()
-                )
-            )
-        )['karma'] or 0
-        
-        # Last 7 days
-        last_7d = now - timezone.timedelta(days=7)
-        karma_7d = Like.objects.filter(
-            content_object__author=user,
-            created_at__gte=last_7d
-        ).aggregate(
-            karma=models.Sum(
-                models.Case(
-                    models.When(content_type__model='post', then=5),
-                    models.When(content_type__model='comment', then=1),
-                    default=0,
-                    output_field=models.IntegerField()
-                )
-            )
-        )['karma'] or 0
-        
-        return Response({
-            'user_id': user.id,
-            'username': user.username,
-            'total_karma': user.total_karma,
-            'karma_24h': karma_24h,
-            'karma_7d': karma_7d,
-            'generated_at': now
-        })
-        
+        windows = request.GET.get('windows', DEFAULT_KARMA_WINDOWS).split(',')
+        periods = {window: parse_window(window) for window in windows}
+        days = int(request.GET.get('days', 30))
+        if not 1 <= days <= MAX_HISTORY_DAYS:
+            raise ValueError(f'days must be between 1 and {MAX_HISTORY_DAYS}')
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+    
+    try:
+        user = User.objects.only('id', 'username').get(pk=user_id)
     except User.DoesNotExist:
         return Response({
             'error': 'User not found'
         }, status=404)
-    except Exception as e:
-        return Response({
-            'error': f'Failed to get karma history: {str(e)}'
-        }, status=500)
+    
+    now = timezone.now()
+    # total_karma is always reported, so read every bucket for the user
+    rows = KarmaRollup.objects.history(user.id)
+    
+    periods.update(
+        (window, parse_window(window)) for window in LEGACY_KARMA_WINDOWS.values() if window not in periods
+    )
+    window_starts = {
+        window: karma_bucket(now - period) if period else None
+        for window, period in periods.items()
+    }
+    totals = dict.fromkeys(periods, 0)
+    first_day = (now - timezone.timedelta(days=days - 1)).date()
+    daily = {first_day + timezone.timedelta(days=n): 0 for n in range(days)}
+    total_karma = 0
+    
+    for bucket, karma in rows:
+        total_karma += karma
+        for window, start in window_starts.items():
+            if start is None or bucket >= start:
+                totals[window] += karma
+        day = bucket.date()
+        if day in daily:
+            daily[day] += karma
+    
+    return Response({
+        'user_id': user.id,
+        'username': user.username,
+        'total_karma': total_karma,
+        **{key: max(totals[window], 0) for key, window in LEGACY_KARMA_WINDOWS.items()},
+        'windows': {window: totals[window] for window in windows},
+        'daily': [{'date': day, 'karma': karma} for day, karma in daily.items()],
+        'generated_at': now
+    })
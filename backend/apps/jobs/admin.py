@@ -0,0 +1,29 @@
+from django.contrib import admin
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Inspect queued and failed background jobs and requeue failures."""
+    list_display = ['id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'dedup_key']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'dedup_key']
+    readonly_fields = ['locked_at', 'last_error', 'created_at']
+    ordering = ['run_at']
+    actions = ['retry_now']
+    
+    @admin.action(description='Retry selected failed jobs now')
+    def retry_now(self, request, queryset):
+        retried = 0
+        for job in queryset.filter(status=Job.FAILED):
+            job.status, job.attempts, job.run_at, job.locked_at = Job.PENDING, 0, timezone.now(), None
+            try:
+                with transaction.atomic():
+                    job.save(update_fields=['status', 'attempts', 'run_at', 'locked_at'])
+            except IntegrityError:
+                continue  # the same work is already pending again
+            retried += 1
+        self.message_user(request, f'Requeued {retried} jobs; run_jobs (or the thread poller) will pick them up.')
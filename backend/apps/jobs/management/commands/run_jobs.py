@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.jobs import queue
+
+
+class Command(BaseCommand):
+    help = (
+        'Run background jobs from the jobs table (for JOBS_MODE=worker). '
+        'Claims due jobs in batches, runs each batch through its registered '
+        'handler and retries failures with exponential backoff. Several '
+        'workers can run at once.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Jobs claimed per batch (default: JOBS_BATCH_SIZE).',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds to sleep when no job is due.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once no job is due instead of polling.',
+        )
+    
+    def handle(self, *args, batch_size, poll_interval, once, **options):
+        processed = 0
+        try:
+            while True:
+                claimed = queue.run_pending(batch_size)
+                processed += claimed
+                if not claimed:
+                    if once:
+                        break
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} jobs'))
@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import Q, UniqueConstraint
+from django.utils import timezone
+
+
+class JobManager(models.Manager):
+    """Manager for enqueueing and claiming background jobs."""
+    
+    def enqueue_many(self, jobs):
+        """
+        Insert jobs with one bulk INSERT. A job whose dedup_key matches one
+        that is already pending is dropped, so repeated requests for the same
+        work collapse into a single run.
+        """
+        return self.bulk_create(jobs, ignore_conflicts=True)
+    
+    def claim(self, limit):
+        """
+        Mark up to ``limit`` due jobs as running and return them, oldest
+        first. Jobs left running longer than JOBS_LOCK_TIMEOUT seconds (their
+        worker died) are claimed again.
+        """
+        now = timezone.now()
+        stale = now - timezone.timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+        due = self.filter(
+            Q(status=Job.PENDING, run_at__lte=now) | Q(status=Job.RUNNING, locked_at__lt=stale)
+        ).order_by('run_at')
+        # Idle polls stay read-only instead of taking the write lock
+        if not due.exists():
+            return []
+        with transaction.atomic(using=self.db):
+            if connections[self.db].features.has_select_for_update_skip_locked:
+                # Concurrent workers on PostgreSQL skip each other's rows;
+                # SQLite serializes claims with BEGIN IMMEDIATE instead
+                due = due.select_for_update(skip_locked=True)
+            jobs = list(due[:limit])
+            self.filter(id__in=[job.id for job in jobs]).update(status=Job.RUNNING, locked_at=now)
+        return jobs
+    
+    def retry_or_fail(self, job, error):
+        """
+        Record a failed run: back off exponentially and retry, or give up
+        after max_attempts and keep the job as failed with its error.
+        """
+        job.attempts += 1
+        job.last_error = error
+        job.locked_at = None
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+        else:
+            job.status = Job.PENDING
+            delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            job.run_at = timezone.now() + timezone.timedelta(seconds=delay)
+        try:
+            with transaction.atomic(using=self.db):
+                job.save(update_fields=['attempts', 'last_error', 'locked_at', 'status', 'run_at'])
+        except IntegrityError:
+            # The same work was enqueued again meanwhile and will run anyway
+            job.delete()
+
+
+class Job(models.Model):
+    """
+    A unit of deferred work for the background runner (see apps/jobs/queue.py).
+    Successful jobs are deleted; failed ones stay for inspection.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+    
+    name = models.CharField(max_length=100)  # registered handler name
+    payload = models.JSONField(default=dict)
+    dedup_key = models.CharField(max_length=200, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = JobManager()
+    
+    class Meta:
+        db_table = 'jobs'
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='jobs_due_idx'),
+        ]
+        constraints = [
+            # At most one pending job per dedup key
+            UniqueConstraint(
+                fields=['dedup_key'], condition=Q(status='pending'), name='unique_pending_job'
+            )
+        ]
+    
+    def __str__(self):
+        return f'{self.name} [{self.status}] {self.dedup_key or self.pk}'
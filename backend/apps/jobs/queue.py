@@ -0,0 +1,146 @@
+"""
+Lightweight database-backed job queue.
+
+Request handlers enqueue bookkeeping (counter reconciliation, karma rollups,
+cache warmups, search indexing) instead of doing it inline. Jobs are rows in
+the ``jobs`` table, written in the caller's transaction so they only exist if
+its changes commit. Handlers are registered by name and always receive a
+list of payloads, so the runner can hand them a whole batch of same-named
+jobs at once; they must be idempotent, since a job can run more than once.
+
+How jobs get run depends on ``settings.JOBS_MODE``:
+
+- ``worker``: rows wait for ``manage.py run_jobs`` (production).
+- ``thread``: after each commit an in-process thread pool drains the queue,
+  and a poller thread drains it every JOBS_POLL_INTERVAL seconds so delayed
+  jobs and retries run without waiting for another commit (development and
+  single-process deployments; no extra process to run).
+- ``sync``: the queue is drained in the committing thread (scripts, tests).
+"""
+import logging
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+_executor = None
+_executor_lock = threading.Lock()
+_poller = None
+
+
+def register(name):
+    """Decorator registering ``func(payloads)`` as the handler for job ``name``."""
+    def decorator(func):
+        _handlers[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, dedup_key=None, delay=0, max_attempts=5, using=None):
+    """Enqueue one job; see enqueue_many."""
+    enqueue_many([(name, payload, dedup_key)], delay=delay, max_attempts=max_attempts, using=using)
+
+
+def enqueue_many(jobs, delay=0, max_attempts=5, using=None):
+    """
+    Enqueue (name, payload, dedup_key) jobs with one INSERT, to run after
+    ``delay`` seconds. Jobs whose dedup_key is already pending are skipped.
+    ``using`` is the database whose transaction the jobs belong to (the
+    router's choice by default).
+    """
+    run_at = timezone.now() + timezone.timedelta(seconds=delay)
+    Job.objects.db_manager(using).enqueue_many([
+        Job(name=name, payload=payload or {}, dedup_key=dedup_key, run_at=run_at, max_attempts=max_attempts)
+        for name, payload, dedup_key in jobs
+    ])
+    
+    mode = settings.JOBS_MODE
+    if mode == 'thread':
+        transaction.on_commit(_submit_drain, using=using)
+    elif mode == 'sync':
+        transaction.on_commit(drain, using=using)
+
+
+def run_pending(limit=None):
+    """
+    Claim up to ``limit`` due jobs and run them, one handler call per job
+    name. Returns the number of jobs claimed.
+    """
+    jobs = Job.objects.claim(limit or settings.JOBS_BATCH_SIZE)
+    batches = {}
+    for job in jobs:
+        batches.setdefault(job.name, []).append(job)
+    
+    for name, batch in batches.items():
+        handler = _handlers.get(name)
+        try:
+            if handler is None:
+                raise LookupError(f'No handler registered for job {name!r}')
+            with transaction.atomic():
+                handler([job.payload for job in batch])
+        except Exception:
+            error = traceback.format_exc()
+            logger.warning('Job batch %s (%d jobs) failed:\n%s', name, len(batch), error)
+            for job in batch:
+                Job.objects.retry_or_fail(job, error)
+        else:
+            Job.objects.filter(id__in=[job.id for job in batch]).delete()
+    return len(jobs)
+
+
+def drain():
+    """Run batches until no job is due."""
+    while run_pending():
+        pass
+
+
+def start_poller():
+    """
+    Start this process's poller thread for JOBS_MODE=thread unless it is
+    running (or JOBS_POLL_INTERVAL is 0). gunicorn.conf.py starts it in each
+    worker; otherwise the first drain after a commit does.
+    """
+    global _poller
+    if settings.JOBS_MODE != 'thread' or settings.JOBS_POLL_INTERVAL <= 0:
+        return
+    with _executor_lock:
+        # A thread started before a fork is not alive in the child
+        if _poller is None or not _poller.is_alive():
+            _poller = threading.Thread(target=_poll, name='jobs-poller', daemon=True)
+            _poller.start()
+
+
+def _poll():
+    while True:
+        time.sleep(settings.JOBS_POLL_INTERVAL)
+        _drain_in_thread()
+
+
+def _submit_drain():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.JOBS_THREADS, thread_name_prefix='jobs'
+            )
+    _executor.submit(_drain_in_thread)
+    start_poller()
+
+
+def _drain_in_thread():
+    try:
+        drain()
+    except Exception:
+        logger.exception('Background job drain failed')
+    finally:
+        # Pool threads get their own connections; don't leak them
+        connections.close_all()
@@ -0,0 +1,90 @@
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import queue
+from .models import Job
+
+calls = []
+
+
+@queue.register('tests.record')
+def record(payloads):
+    calls.append(sorted(payload['n'] for payload in payloads))
+
+
+@queue.register('tests.fail')
+def fail(payloads):
+    raise RuntimeError('boom')
+
+
+@override_settings(JOBS_MODE='worker', JOBS_RETRY_DELAY=5)
+class QueueTests(TestCase):
+    
+    def setUp(self):
+        calls.clear()
+    
+    def test_pending_dedup_key_collapses_repeated_jobs(self):
+        for n in range(3):
+            queue.enqueue('tests.record', {'n': n}, dedup_key='same')
+        queue.enqueue('tests.record', {'n': 9}, dedup_key='other')
+        
+        self.assertEqual(Job.objects.count(), 2)
+        queue.drain()
+        self.assertEqual(calls, [[0, 9]])
+        self.assertFalse(Job.objects.exists())
+    
+    def test_claimed_job_does_not_block_requeueing(self):
+        queue.enqueue('tests.record', {'n': 1}, dedup_key='same')
+        Job.objects.claim(10)
+        queue.enqueue('tests.record', {'n': 2}, dedup_key='same')
+        
+        self.assertEqual(
+            sorted(Job.objects.values_list('status', flat=True)), [Job.PENDING, Job.RUNNING]
+        )
+    
+    def test_delayed_job_waits_until_due(self):
+        queue.enqueue('tests.record', {'n': 1}, delay=60)
+        
+        self.assertEqual(queue.run_pending(), 0)
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(queue.run_pending(), 1)
+        self.assertEqual(calls, [[1]])
+    
+    def test_failed_job_is_retried_with_backoff(self):
+        queue.enqueue('tests.fail', dedup_key='flaky')
+        
+        before = timezone.now()
+        with self.assertLogs('apps.jobs.queue', 'WARNING'):
+            self.assertEqual(queue.run_pending(), 1)
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertIn('RuntimeError: boom', job.last_error)
+        self.assertGreaterEqual(job.run_at, before + timezone.timedelta(seconds=5))
+        
+        # Not due again until the backoff has passed; the next one doubles it
+        self.assertEqual(queue.run_pending(), 0)
+        Job.objects.update(run_at=timezone.now())
+        before = timezone.now()
+        with self.assertLogs('apps.jobs.queue', 'WARNING'):
+            queue.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+        self.assertGreaterEqual(job.run_at, before + timezone.timedelta(seconds=10))
+    
+    def test_job_fails_after_max_attempts(self):
+        queue.enqueue('tests.fail', max_attempts=1)
+        with self.assertLogs('apps.jobs.queue', 'WARNING'):
+            queue.drain()
+        
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 1))
+        # Failed jobs are kept for inspection and never claimed again
+        self.assertEqual(queue.run_pending(), 0)
+    
+    def test_retry_that_duplicates_a_pending_job_is_dropped(self):
+        queue.enqueue('tests.fail', dedup_key='flaky')
+        job = Job.objects.claim(10)[0]
+        queue.enqueue('tests.fail', dedup_key='flaky')
+        
+        Job.objects.retry_or_fail(job, 'error')
+        self.assertEqual(list(Job.objects.values_list('status', 'attempts')), [(Job.PENDING, 0)])
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.posts'
+    
+    def ready(self):
+        # Register search index signal handlers, background job handlers
+        # and system checks
+        from . import checks, signals, tasks  # noqa: F401
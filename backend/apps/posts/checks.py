@@ -0,0 +1,23 @@
+from django.core import checks
+
+
+@checks.register(checks.Tags.models)
+def check_released_comment_relations(app_configs, **kwargs):
+    """
+    PostQuerySet.delete_with_threads deletes comment trees without the ORM's
+    cascade, relying on CommentQuerySet.release() to clear every row that
+    references them; flag foreign keys to Comment it does not know about.
+    """
+    from .models import Comment, RELEASED_COMMENT_RELATIONS
+    
+    errors = []
+    for relation in Comment._meta.related_objects:
+        name = f'{relation.related_model._meta.label}.{relation.field.name}'
+        if name not in RELEASED_COMMENT_RELATIONS:
+            errors.append(checks.Error(
+                f'{name} references Comment but is not cleared when comment trees are deleted.',
+                hint='Delete its rows in CommentQuerySet.release() and add it to RELEASED_COMMENT_RELATIONS.',
+                obj=relation.related_model,
+                id='posts.E001',
+            ))
+    return errors
@@ -1,9 +1,8 @@
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from django.contrib.contenttypes.models import ContentType
 
-from .models import Post, Like
+from .models import PostLike
 
 
 @api_view(['GET'])
@@ -21,15 +20,11 @@ def posts_like_status(request):
     except ValueError:
         return Response({'error': 'Invalid post IDs'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Get content type for posts
-    post_content_type = ContentType.objects.get_for_model(Post)
-    
     # Get all likes by current user for these posts
-    user_likes = Like.objects.filter(
-        user=request.user,
-        content_type=post_content_type,
-        object_id__in=post_ids
-    ).values_list('object_id', flat=True)
+    user_likes = set(
+        PostLike.objects.filter(user=request.user, post_id__in=post_ids)
+        .values_list('post_id', flat=True)
+    )
     
     # Return dictionary mapping post_id -> is_liked
     like_status = {str(post_id): post_id in user_likes for post_id in post_ids}
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the precomputed feed ranking columns (score, hot_score) '
+        'from the post_likes table. A background job refreshes them after each '
+        'like toggle; run this periodically to reconcile drift, e.g. after likes are '
+        'removed by cascading user deletes.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of posts read and updated per transaction.',
+        )
+    
+    def handle(self, *args, chunk_size, **options):
+        updated = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                post_ids = list(
+                    Post.objects.filter(id__gt=last_id)
+                    .order_by('id')
+                    .values_list('id', flat=True)[:chunk_size]
+                )
+                if not post_ids:
+                    break
+                last_id = post_ids[-1]
+                updated += Post.objects.refresh_scores(post_ids)
+        
+        self.stdout.write(self.style.SUCCESS(f'Updated feed scores for {updated} posts'))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.posts import tags
+from apps.posts.models import Comment, CommentTag, Post, PostTag
+
+
+class Command(BaseCommand):
+    help = (
+        'Extract hashtags and mentions from all posts and comments into the '
+        'tag tables and recount their hourly rollups. New and edited content is '
+        'tagged by a background job; run this once to tag content written '
+        'before tags existed, or to reconcile drift.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of posts or comments read and tagged per transaction.',
+        )
+    
+    def handle(self, *args, chunk_size, **options):
+        for model, link_model in ((Post, PostTag), (Comment, CommentTag)):
+            synced = 0
+            last_id = 0
+            while True:
+                with transaction.atomic():
+                    objects = list(
+                        model.objects.filter(id__gt=last_id)
+                        .order_by('id')
+                        .only('content', 'created_at', *(['is_deleted'] if model is Comment else []))[:chunk_size]
+                    )
+                    if not objects:
+                        break
+                    last_id = objects[-1].id
+                    tags.sync(link_model, objects)
+                    synced += len(objects)
+            self.stdout.write(self.style.SUCCESS(f'Synced tags for {synced} {model._meta.verbose_name_plural}'))
@@ -0,0 +1,62 @@
+from django.db import migrations
+
+SEARCH_TABLE = 'search_index'
+
+
+def create_search_index(apps, schema_editor):
+    """Create the full-text index for this vendor and backfill it."""
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'''
+            CREATE TABLE {SEARCH_TABLE} (
+                id bigint PRIMARY KEY,
+                kind varchar(16) NOT NULL,
+                object_id bigint NOT NULL,
+                document tsvector NOT NULL
+            )
+            '''
+        )
+        schema_editor.execute(
+            f'CREATE INDEX {SEARCH_TABLE}_document_gin ON {SEARCH_TABLE} USING GIN (document)'
+        )
+        insert = (
+            f'INSERT INTO {SEARCH_TABLE} (id, kind, object_id, document) '
+            f"VALUES (%s, %s, %s, to_tsvector('english', %s))"
+        )
+    else:
+        schema_editor.execute(
+            f'''
+            CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(
+                content, kind UNINDEXED, object_id UNINDEXED,
+                tokenize = 'porter unicode61'
+            )
+            '''
+        )
+        insert = f'INSERT INTO {SEARCH_TABLE} (rowid, kind, object_id, content) VALUES (%s, %s, %s, %s)'
+
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    with connection.cursor() as cursor:
+        # Document ids match apps.posts.search.document_id
+        for kind, model, offset in (('post', Post, 0), ('comment', Comment, 1)):
+            rows = model.objects.values_list('id', 'content').iterator(chunk_size=1000)
+            cursor.executemany(
+                insert,
+                [(pk * 2 + offset, kind, pk, content) for pk, content in rows],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:44
+
+import math
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_feed_scores(apps, schema_editor):
+    """Seed score/hot_score from existing likes (see apps.posts.models.hot_score)."""
+    Post = apps.get_model('posts', 'Post')
+    Like = apps.get_model('posts', 'Like')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    
+    post_type = ContentType.objects.filter(app_label='posts', model='post').first()
+    like_counts = {}
+    if post_type:
+        like_counts = dict(
+            Like.objects.filter(content_type=post_type)
+            .order_by()
+            .values_list('object_id')
+            .annotate(count=Count('id'))
+        )
+    
+    posts = list(Post.objects.only('id', 'created_at'))
+    for post in posts:
+        post.score = like_counts.get(post.id, 0)
+        post.hot_score = (
+            math.log10(max(post.score, 1))
+            + post.created_at.timestamp() / settings.FEED_HOT_DECAY_SECONDS
+        )
+    Post.objects.bulk_update(posts, ['score', 'hot_score'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='hot_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='score',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-hot_score', '-id'], name='posts_hot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-score', '-created_at'], name='posts_top_idx'),
+        ),
+        migrations.RunPython(backfill_feed_scores, migrations.RunPython.noop),
+    ]
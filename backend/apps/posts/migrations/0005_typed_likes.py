@@ -0,0 +1,112 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# (typed like model, old generic content type model, target column)
+LIKE_TABLES = [
+    ('PostLike', 'post', 'post_id'),
+    ('CommentLike', 'comment', 'comment_id'),
+]
+
+
+def copy_generic_likes(apps, schema_editor):
+    """
+    Move rows from the generic ``likes`` table into post_likes and
+    comment_likes. The join drops orphaned likes whose post or comment no
+    longer exists, which the generic table had no foreign key to prevent.
+    """
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Like = apps.get_model('posts', 'Like')
+    
+    with schema_editor.connection.cursor() as cursor:
+        for model_name, target, column in LIKE_TABLES:
+            content_type = ContentType.objects.filter(app_label='posts', model=target).first()
+            if content_type is None:
+                continue  # fresh database, nothing was ever liked
+            like_model = apps.get_model('posts', model_name)
+            target_table = apps.get_model('posts', target)._meta.db_table
+            cursor.execute(
+                f'''
+                INSERT INTO {like_model._meta.db_table} (user_id, {column}, created_at)
+                SELECT l.user_id, l.object_id, l.created_at
+                FROM {Like._meta.db_table} l
+                JOIN {target_table} t ON t.id = l.object_id
+                WHERE l.content_type_id = %s
+                ''',
+                [content_type.id],
+            )
+
+
+def copy_typed_likes(apps, schema_editor):
+    """Reverse of copy_generic_likes."""
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Like = apps.get_model('posts', 'Like')
+    
+    with schema_editor.connection.cursor() as cursor:
+        for model_name, target, column in LIKE_TABLES:
+            content_type, _ = ContentType.objects.get_or_create(app_label='posts', model=target)
+            like_model = apps.get_model('posts', model_name)
+            cursor.execute(
+                f'''
+                INSERT INTO {Like._meta.db_table} (user_id, content_type_id, object_id, created_at)
+                SELECT user_id, %s, {column}, created_at
+                FROM {like_model._meta.db_table}
+                ''',
+                [content_type.id],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0004_post_feed_scores'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        # Their data migrations still read the generic likes table
+        ('gamification', '0004_karma_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentLike',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('comment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='likes', to='posts.comment')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comment_likes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'comment_likes',
+                'ordering': ['-created_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='PostLike',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='likes', to='posts.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_likes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'post_likes',
+                'ordering': ['-created_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='postlike',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_post_like'),
+        ),
+        migrations.AddConstraint(
+            model_name='commentlike',
+            constraint=models.UniqueConstraint(fields=('user', 'comment'), name='unique_comment_like'),
+        ),
+        migrations.RunPython(copy_generic_likes, copy_typed_likes),
+        migrations.DeleteModel(
+            name='Like',
+        ),
+    ]
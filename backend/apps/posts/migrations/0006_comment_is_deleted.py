@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_typed_likes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:05
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_comment_counts(apps, schema_editor):
+    """Seed comment_count with each post's live (not tombstoned) comments."""
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    
+    counts = dict(
+        Comment.objects.filter(is_deleted=False)
+        .order_by()
+        .values_list('post_id')
+        .annotate(count=Count('id'))
+    )
+    posts = list(Post.objects.filter(id__in=counts).only('id'))
+    for post in posts:
+        post.comment_count = counts[post.id]
+    Post.objects.bulk_update(posts, ['comment_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_comment_is_deleted'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_comment_counts, migrations.RunPython.noop),
+    ]
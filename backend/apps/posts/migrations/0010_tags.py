@@ -0,0 +1,107 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_timeline_entries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'comment_tags',
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='PostTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'post_tags',
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('hashtag', 'Hashtag'), ('mention', 'Mention')], max_length=10)),
+                ('name', models.CharField(max_length=150)),
+            ],
+            options={
+                'db_table': 'tags',
+            },
+        ),
+        migrations.CreateModel(
+            name='TagRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='posts.tag')),
+            ],
+            options={
+                'db_table': 'tag_rollups',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('kind', 'name'), name='unique_tag'),
+        ),
+        migrations.AddField(
+            model_name='posttag',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='posts.post'),
+        ),
+        migrations.AddField(
+            model_name='posttag',
+            name='tag',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.tag'),
+        ),
+        migrations.AddField(
+            model_name='commenttag',
+            name='comment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='posts.comment'),
+        ),
+        migrations.AddField(
+            model_name='commenttag',
+            name='tag',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.tag'),
+        ),
+        migrations.AddIndex(
+            model_name='tagrollup',
+            index=models.Index(fields=['bucket'], name='tag_rollups_bucket_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tagrollup',
+            constraint=models.UniqueConstraint(fields=('tag', 'bucket'), name='unique_tag_rollup_bucket'),
+        ),
+        migrations.AddIndex(
+            model_name='posttag',
+            index=models.Index(fields=['tag', '-created_at', '-post'], name='post_tags_tag_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='posttag',
+            constraint=models.UniqueConstraint(fields=('tag', 'post'), name='unique_post_tag'),
+        ),
+        migrations.AddIndex(
+            model_name='commenttag',
+            index=models.Index(fields=['tag', '-created_at', '-comment'], name='comment_tags_tag_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='commenttag',
+            constraint=models.UniqueConstraint(fields=('tag', 'comment'), name='unique_comment_tag'),
+        ),
+    ]
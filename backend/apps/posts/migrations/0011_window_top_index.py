@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_tags'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['created_at', 'score'], name='posts_window_top_idx'),
+        ),
+    ]
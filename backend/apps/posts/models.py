@@ -1,15 +1,133 @@
-from django.contrib.contenttypes.fields import GenericForeignKey
+import math
+
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
-from django.db.models import UniqueConstraint, F
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import Count, F, OuterRef, Subquery, UniqueConstraint
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from mptt.managers import TreeManager
 from mptt.models import MPTTModel, TreeForeignKey
+from mptt.querysets import TreeQuerySet
 
 from apps.users.models import User
 
 
+# Comment trees (and like/post ids) removed per transaction by delete_with_threads
+DELETE_CHUNK_SIZE = 500
+
+
+def hot_score(score, created_at):
+    """
+    Reddit-style "hot" rank: log-scaled likes plus a recency term.
+    Every FEED_HOT_DECAY_SECONDS of age is worth a 10x difference in likes,
+    so older posts decay relative to new ones without ever being rescored;
+    the value only changes when the like count does.
+    """
+    return math.log10(max(score, 1)) + created_at.timestamp() / settings.FEED_HOT_DECAY_SECONDS
+
+
 class PostQuerySet(models.QuerySet):
     """Custom QuerySet for Post with efficient comment fetching."""
     
+    def hot(self):
+        """Posts by precomputed hot score (served from posts_hot_idx)."""
+        return self.order_by('-hot_score', '-id')
+    
+    def top(self, since=None):
+        """
+        Most liked posts, optionally only those created after ``since``.
+        All-time top walks posts_top_idx in order; a window instead range
+        scans posts_window_top_idx on created_at and sorts just those rows
+        by score, rather than walking every post by score to find the recent
+        ones.
+        """
+        if since is None:
+            return self.order_by('-score', '-created_at')
+        # score + 0 sorts the same as score, but no index covers the
+        # expression. Ordering by plain score lets SQLite satisfy ORDER BY
+        # from posts_top_idx and check created_at on every post in score
+        # order; with the expression it range scans posts_window_top_idx for
+        # the window and sorts only those rows
+        return self.filter(created_at__gte=since).order_by((F('score') + 0).desc(), '-created_at')
+    
+    def tagged(self, kind, name):
+        """
+        Posts using a tag, newest first. The order is taken from the tag
+        links (their created_at is the post's), so the post_tags (tag,
+        created_at) index yields the newest page directly. hot() and top()
+        re-sort the joined matches by score instead, which does not use it.
+        """
+        return self.filter(tag_links__tag__kind=kind, tag_links__tag__name=name).order_by(
+            '-tag_links__created_at', '-tag_links__post_id'
+        )
+    
+    def refresh_scores(self, post_ids):
+        """
+        Recompute the denormalized like score and hot rank of these posts
+        from post_likes. Idempotent, so it can run from a deduplicated
+        background job after like toggles; locks the posts' rows, so must run
+        inside a transaction. Returns the number of posts changed.
+        """
+        posts = list(
+            self.select_for_update().filter(id__in=post_ids)
+            .order_by('id').only('id', 'created_at', 'score', 'hot_score')
+        )
+        like_counts = PostLike.objects.count_map([post.id for post in posts])
+        changed = []
+        for post in posts:
+            score = like_counts.get(post.id, 0)
+            rank = hot_score(score, post.created_at)
+            if post.score != score or abs(post.hot_score - rank) > 1e-9:
+                post.score, post.hot_score = score, rank
+                changed.append(post)
+        self.bulk_update(changed, ['score', 'hot_score'])
+        return len(changed)
+    
+    def delete_with_threads(self, chunk_size=DELETE_CHUNK_SIZE):
+        """
+        Delete these posts together with their comment trees and likes, and
+        take back the karma the posts and comments earned.
+        
+        A plain delete() loads every comment, cascades down the tree one
+        level at a time and unindexes comments one by one. Here each post's
+        comment trees are removed whole by tree_id, a chunk of trees per
+        transaction, after CommentQuerySet.release() has cleared what
+        references them with bulk ``IN`` deletes; whole trees go at once, so
+        MPTT never has to renumber lft/rght. Returns the number of posts
+        deleted.
+        """
+        from apps.gamification.models import KarmaTransaction
+        from . import tags
+        
+        karma = KarmaTransaction.objects.db_manager(self.db)
+        post_ids = list(self.values_list('id', flat=True))
+        tree_ids = list(
+            Comment.objects.using(self.db).filter(post_id__in=post_ids, parent__isnull=True)
+            .order_by('tree_id')
+            .values_list('tree_id', flat=True)
+        )
+        for start in range(0, len(tree_ids), chunk_size):
+            with transaction.atomic(using=self.db):
+                trees = Comment.objects.using(self.db).filter(tree_id__in=tree_ids[start:start + chunk_size])
+                trees.release(chunk_size=chunk_size)
+                # Nothing references the trees any more and replies go with
+                # their roots, so the ORM's row-by-row cascade collection
+                # has nothing to do
+                trees.delete_released()
+        
+        deleted = 0
+        for start in range(0, len(post_ids), chunk_size):
+            chunk = post_ids[start:start + chunk_size]
+            with transaction.atomic(using=self.db):
+                karma.revert(Post, chunk, 'post_deleted')
+                tags.forget(PostTag, chunk, using=self.db)
+                # With the threads gone the regular cascade only has the
+                # posts' own rows (likes, timeline entries) left
+                _, counts = Post.objects.using(self.db).filter(id__in=chunk).delete()
+                deleted += counts.get(Post._meta.label, 0)
+        return deleted
+    
     def with_comment_tree(self):
         """
         Fetch posts with their complete comment tree efficiently.
@@ -27,26 +145,52 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Precomputed ranking columns, refreshed by a background job after each
+    # like toggle and reconciled by the recompute_feed_scores command
+    score = models.PositiveIntegerField(default=0)  # number of likes
+    hot_score = models.FloatField(default=0)
+    
+    # Live (not tombstoned) comments, kept in step by the comment signal
+    # handlers and Comment.tombstone()
+    comment_count = models.PositiveIntegerField(default=0)
+    
     objects = PostQuerySet.as_manager()
     
     class Meta:
         db_table = 'posts'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-hot_score', '-id'], name='posts_hot_idx'),
+            models.Index(fields=['-score', '-created_at'], name='posts_top_idx'),
+            models.Index(fields=['created_at', 'score'], name='posts_window_top_idx'),
+            # Keyset pagination of one author's timeline
+            models.Index(fields=['author', '-created_at', '-id'], name='posts_author_idx'),
+        ]
     
     def __str__(self):
         return f'{self.author.username}: {self.content[:50]}...'
     
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            # created_at is only filled in by super().save(); the few
+            # microseconds of difference are irrelevant to the rank
+            self.hot_score = hot_score(self.score, timezone.now())
+        super().save(*args, **kwargs)
+    
+    def delete(self, using=None, keep_parents=False):
+        """
+        Delete through PostQuerySet.delete_with_threads, so the thread goes
+        in bulk and the karma the post and its comments earned is taken back.
+        """
+        using = using or router.db_for_write(Post, instance=self)
+        deleted = Post.objects.using(using).filter(pk=self.pk).delete_with_threads()
+        self.pk = None
+        return deleted, {self._meta.label: deleted}
+    
     @property
     def like_count(self):
         """Get like count efficiently."""
-        from django.contrib.contenttypes.models import ContentType
-        from .models import Like
-        
-        content_type = ContentType.objects.get_for_model(self)
-        return Like.objects.filter(
-            content_type=content_type,
-            object_id=self.pk
-        ).count()
+        return self.likes.count()
     
     def get_comment_tree(self):
         """
@@ -56,6 +200,76 @@ class Post(models.Model):
         return Comment.objects.filter(post=self).order_by('tree_id', 'lft')
 
 
+# Foreign keys to Comment whose rows CommentQuerySet.release() deletes, or
+# (replies) that are deleted along with their trees; see checks.py
+RELEASED_COMMENT_RELATIONS = {'posts.Comment.parent', 'posts.CommentLike.comment', 'posts.CommentTag.comment'}
+
+
+class CommentQuerySet(TreeQuerySet):
+    """QuerySet for Comment; the one place comment deletes clean up after."""
+    
+    def release(self, reason='comment_deleted', chunk_size=DELETE_CHUNK_SIZE):
+        """
+        Clear everything attached to these comments before they are deleted
+        or tombstoned: their likes and the karma those earned, their tag
+        links (queueing the tag rollups for a recount) and their search
+        entries, a chunk of comments per bulk ``IN`` delete. Every delete
+        path goes through here, so a new dependent only needs handling in
+        one place. Call it inside the deleting transaction.
+        """
+        from apps.gamification.models import KarmaTransaction
+        from . import search, tags
+        
+        comment_ids = list(self.order_by().values_list('id', flat=True))
+        karma = KarmaTransaction.objects.db_manager(self.db)
+        for start in range(0, len(comment_ids), chunk_size):
+            chunk = comment_ids[start:start + chunk_size]
+            CommentLike.objects.using(self.db).filter(comment_id__in=chunk).delete()
+            karma.revert(Comment, chunk, reason)
+            tags.forget(CommentTag, chunk, using=self.db)
+            search.remove_documents(search.COMMENT, chunk, using=self.db)
+        return comment_ids
+    
+    def with_reply_counts(self):
+        """
+        Annotate ``reply_count``: the live (not tombstoned) replies below
+        each comment at any depth, counted like Post.comment_count. One
+        subquery per row over its subtree's (tree_id, lft) range; for whole
+        threads already in memory count_live_replies() is cheaper.
+        """
+        replies = (
+            Comment.objects.filter(
+                tree_id=OuterRef('tree_id'), lft__gt=OuterRef('lft'), rght__lt=OuterRef('rght'), is_deleted=False
+            )
+            .order_by()
+            .values('tree_id')
+            .annotate(count=Count('id'))
+            .values('count')
+        )
+        return self.annotate(reply_count=Coalesce(Subquery(replies), 0))
+    
+    def delete_released(self):
+        """
+        Delete whole comment trees after release() with one DELETE, without
+        the per-row cascade collection and signals of delete().
+        """
+        return self._raw_delete(using=self.db)
+
+
+def count_live_replies(comments):
+    """
+    Set ``reply_count`` (see CommentQuerySet.with_reply_counts) on comments
+    that make up whole trees, e.g. a post's full thread, in one pass from the
+    deepest nodes up; no queries.
+    """
+    counts = {comment.id: 0 for comment in comments}
+    for comment in sorted(comments, key=lambda c: (c.tree_id, c.lft), reverse=True):
+        comment.reply_count = counts[comment.id]
+        if comment.parent_id in counts:
+            counts[comment.parent_id] += comment.reply_count + (not comment.is_deleted)
+    return comments
+
+
 class Comment(MPTTModel):
     """Model for threaded comments using MPTT for efficient tree operations."""
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
@@ -64,15 +278,24 @@ class Comment(MPTTModel):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Soft-deleted comments stay in the tree as tombstones (see tombstone())
+    is_deleted = models.BooleanField(default=False)
+    
     # MPTT fields for tree structure
     parent = TreeForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
     
+    objects = TreeManager.from_queryset(CommentQuerySet)()
+    
     class MPTTMeta:
         order_insertion_by = ['created_at']
     
     class Meta:
         db_table = 'comments'
         ordering = ['created_at']
+        indexes = [
+            # Keyset pagination of one author's timeline
+            models.Index(fields=['author', '-created_at', '-id'], name='comments_author_idx'),
+        ]
     
     def __str__(self):
         return f'{self.author.username}: {self.content[:50]}...'
@@ -80,36 +303,150 @@ class Comment(MPTTModel):
     @property
     def like_count(self):
         """Get like count efficiently."""
-        from django.contrib.contenttypes.models import ContentType
-        from .models import Like
-        
-        content_type = ContentType.objects.get_for_model(self)
-        return Like.objects.filter(
-            content_type=content_type,
-            object_id=self.pk
-        ).count()
+        return self.likes.count()
+    
+    def delete(self, *args, **kwargs):
+        """Hard-delete the comment and its replies, releasing them first (see CommentQuerySet.release)."""
+        using = kwargs.get('using') or router.db_for_write(Comment, instance=self)
+        with transaction.atomic(using=using):
+            self.get_descendants(include_self=True).using(using).release()
+            return super().delete(*args, **kwargs)
+    
+    def tombstone(self):
+        """
+        Soft-delete: blank the content and mark the comment deleted, keeping
+        the node in place so its replies stay threaded. Unlike delete(), this
+        never changes lft/rght, so no part of the tree is renumbered. The
+        comment is released like a deleted one: its likes, the karma they
+        earned, its tags and its search entry go.
+        """
+        self.content, self.is_deleted, self.updated_at = '', True, timezone.now()
+        with transaction.atomic():
+            tombstoned = Comment.objects.filter(pk=self.pk, is_deleted=False).update(
+                content=self.content, is_deleted=True, updated_at=self.updated_at
+            )
+            if tombstoned:
+                Post.objects.filter(pk=self.post_id).update(comment_count=F('comment_count') - 1)
+                Comment.objects.filter(pk=self.pk).release()
 
 
-class Like(models.Model):
-    """Model for likes with generic foreign key to posts and comments."""
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='likes')
+class LikeQuerySet(models.QuerySet):
+    """QuerySet for PostLike and CommentLike with bulk lookups by target id."""
+    
+    def for_targets(self, object_ids):
+        """Restrict to likes on the posts (or comments) with these ids."""
+        return self.filter(**{f'{self.model.target_field}__in': object_ids})
+    
+    def count_map(self, object_ids):
+        """Return {target_id: like_count} for many posts or comments in one query."""
+        counts = (
+            self.for_targets(object_ids)
+            .order_by()
+            .values_list(self.model.target_field)
+            .annotate(count=models.Count('id'))
+        )
+        return dict(counts)
+
+
+class AbstractLike(models.Model):
+    """Fields shared by the typed like tables."""
     created_at = models.DateTimeField(auto_now_add=True)
     
-    # Generic foreign key to link to either Post or Comment
-    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
-    object_id = models.PositiveIntegerField()
-    content_object = GenericForeignKey('content_type', 'object_id')
+    objects = LikeQuerySet.as_manager()
+    
+    # Name of the foreign key to the liked object
+    target_field = None
     
     class Meta:
-        db_table = 'likes'
-        # Prevent duplicate likes on the same object by the same user
-        constraints = [
-            UniqueConstraint(fields=['user', 'content_type', 'object_id'], name='unique_like')
-        ]
+        abstract = True
         ordering = ['-created_at']
     
     def __str__(self):
-        return f'{self.user.username} likes {self.content_object}'
+        return f'{self.user.username} likes {getattr(self, self.target_field)}'
+
+
+class PostLike(AbstractLike):
+    """A user's like on a post; deleted with the post or the user."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='post_likes')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='likes')
+    
+    target_field = 'post'
+    
+    class Meta(AbstractLike.Meta):
+        db_table = 'post_likes'
+        # Prevent duplicate likes; its index also serves lookups by user
+        constraints = [
+            UniqueConstraint(fields=['user', 'post'], name='unique_post_like')
+        ]
+
+
+class CommentLike(AbstractLike):
+    """A user's like on a comment; deleted with the comment or the user."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comment_likes')
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name='likes')
+    
+    target_field = 'comment'
+    
+    class Meta(AbstractLike.Meta):
+        db_table = 'comment_likes'
+        constraints = [
+            UniqueConstraint(fields=['user', 'comment'], name='unique_comment_like')
+        ]
+
+
+class Like:
+    """
+    Entry point for likes on either posts or comments.
+    
+    Likes used to live in one generic ``likes`` table keyed by content type
+    and an untyped object id; they are now stored in PostLike and CommentLike
+    with real foreign keys. This keeps the old ``Like.toggle_like`` API and
+    offers the bulk lookups for callers that handle both kinds of object.
+    """
+    
+    @staticmethod
+    def model_for(target):
+        """The like model for a Post or Comment instance or class."""
+        model = target if isinstance(target, type) else type(target)
+        if issubclass(model, Post):
+            return PostLike
+        if issubclass(model, Comment):
+            return CommentLike
+        raise TypeError(f'{model.__name__} cannot be liked')
+    
+    @classmethod
+    def count_map(cls, model, object_ids):
+        """Return {object_id: like_count} for many objects of ``model``."""
+        return cls.model_for(model).objects.count_map(object_ids)
+    
+    @classmethod
+    def liked_by(cls, user, object_ids_by_model):
+        """
+        Return {model: set of object ids} liked by ``user`` among the given
+        ids of each model, in one query however many models are asked for.
+        """
+        liked = {model: set() for model in object_ids_by_model}
+        if not user.is_authenticated:
+            return liked
+        
+        queries = []
+        for model, object_ids in object_ids_by_model.items():
+            if object_ids:
+                like_model = cls.model_for(model)
+                queries.append(
+                    like_model.objects.for_targets(object_ids)
+                    .filter(user=user)
+                    .order_by()
+                    .annotate(kind=models.Value(like_model.target_field))
+                    .values_list('kind', like_model.target_field)
+                )
+        if not queries:
+            return liked
+        
+        models_by_kind = {cls.model_for(model).target_field: model for model in object_ids_by_model}
+        for kind, object_id in queries[0].union(*queries[1:], all=True):
+            liked[models_by_kind[kind]].add(object_id)
+        return liked
     
     @classmethod
     def toggle_like(cls, user, content_object):
@@ -119,25 +456,276 @@ class Like(models.Model):
         """
         from django.db import transaction
         
-        content_type = ContentType.objects.get_for_model(content_object)
+        like_model = cls.model_for(content_object)
+        target = {f'{like_model.target_field}_id': content_object.pk}
         
         with transaction.atomic():
-            # Check if like already exists
-            existing_like = cls.objects.filter(
-                user=user,
-                content_type=content_type,
-                object_id=content_object.pk
-            ).first()
-            
-            if existing_like:
-                # User already liked, so unlike
-                existing_like.delete()
-                return False, 'unliked'
+            # Deleting reports whether there was a like to remove, so no
+            # separate existence check is needed
+            deleted, _ = like_model.objects.filter(user=user, **target).delete()
+            if deleted:
+                liked, action = False, 'unliked'
             else:
-                # User hasn't liked yet, so like
-                like = cls.objects.create(
-                    user=user,
-                    content_type=content_type,
-                    object_id=content_object.pk
+                try:
+                    with transaction.atomic():
+                        like_model.objects.create(user=user, **target)
+                except IntegrityError:
+                    # A concurrent request liked first and did the bookkeeping
+                    return True, 'liked'
+                liked, action = True, 'liked'
+            
+            # The feed score and the leaderboard cache catch up in the
+            # background; jobs are deduplicated, so a burst of toggles costs
+            # one run of each. The warmup waits out the cache TTL so it runs
+            # at most once per TTL however busy likes are.
+            from apps.jobs import queue
+            if isinstance(content_object, Post):
+                queue.enqueue(
+                    'posts.refresh_scores', {'post_id': content_object.pk},
+                    dedup_key=f'post-score:{content_object.pk}'
                 )
-                return True, 'liked'
+            queue.enqueue(
+                'gamification.warm_leaderboard', dedup_key='leaderboard-warm',
+                delay=settings.LEADERBOARD_CACHE_TTL
+            )
+            
+            # Credit (or take back) the author's karma in the ledger
+            from apps.gamification.models import KarmaTransaction, POST_LIKE_KARMA, COMMENT_LIKE_KARMA
+            kind, karma = (
+                ('post', POST_LIKE_KARMA) if isinstance(content_object, Post)
+                else ('comment', COMMENT_LIKE_KARMA)
+            )
+            KarmaTransaction.objects.append([
+                KarmaTransaction(
+                    user_id=content_object.author_id,
+                    karma_change=karma if liked else -karma,
+                    reason=f'{kind}_like' if liked else f'{kind}_unlike',
+                    content_type=ContentType.objects.get_for_model(content_object),
+                    object_id=content_object.pk,
+                )
+            ])
+            
+            return liked, action
+
+
+class TagManager(models.Manager):
+    """Manager for hashtags and mentions."""
+    
+    def ensure(self, keys):
+        """
+        Return {(kind, name): tag_id} for ``keys``, creating missing tags with
+        one INSERT; tags created concurrently elsewhere are picked up too.
+        """
+        if not keys:
+            return {}
+        self.bulk_create([Tag(kind=kind, name=name) for kind, name in keys], ignore_conflicts=True)
+        tags = self.filter(name__in={name for _, name in keys}).values_list('kind', 'name', 'id')
+        return {(kind, name): tag_id for kind, name, tag_id in tags if (kind, name) in keys}
+
+
+class Tag(models.Model):
+    """A normalized (lowercased) hashtag or @mention; see apps/posts/tags.py."""
+    HASHTAG = 'hashtag'
+    MENTION = 'mention'
+    KIND_CHOICES = [
+        (HASHTAG, 'Hashtag'),
+        (MENTION, 'Mention'),
+    ]
+    
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    name = models.CharField(max_length=150)
+    
+    objects = TagManager()
+    
+    class Meta:
+        db_table = 'tags'
+        constraints = [
+            UniqueConstraint(fields=['kind', 'name'], name='unique_tag'),
+        ]
+    
+    def __str__(self):
+        return f'{"#" if self.kind == self.HASHTAG else "@"}{self.name}'
+
+
+class AbstractTagLink(models.Model):
+    """
+    Common fields of PostTag and CommentTag. created_at is the tagged
+    object's, copied so a tag's newest content is one index range scan.
+    """
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField()
+    
+    # Name of the foreign key to the tagged object
+    target_field = None
+    
+    class Meta:
+        abstract = True
+    
+    def __str__(self):
+        return f'{self.tag_id} -> {self.target_field} {getattr(self, f"{self.target_field}_id")}'
+
+
+class PostTag(AbstractTagLink):
+    """A tag in a post's content."""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='tag_links')
+    
+    target_field = 'post'
+    
+    class Meta(AbstractTagLink.Meta):
+        db_table = 'post_tags'
+        constraints = [
+            UniqueConstraint(fields=['tag', 'post'], name='unique_post_tag'),
+        ]
+        indexes = [
+            models.Index(fields=['tag', '-created_at', '-post'], name='post_tags_tag_idx'),
+        ]
+
+
+class CommentTag(AbstractTagLink):
+    """A tag in a comment's content."""
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name='tag_links')
+    
+    target_field = 'comment'
+    
+    class Meta(AbstractTagLink.Meta):
+        db_table = 'comment_tags'
+        constraints = [
+            UniqueConstraint(fields=['tag', 'comment'], name='unique_comment_tag'),
+        ]
+        indexes = [
+            models.Index(fields=['tag', '-created_at', '-comment'], name='comment_tags_tag_idx'),
+        ]
+
+
+class TagRollupManager(models.Manager):
+    """Manager for the hourly per-tag usage counts."""
+    
+    def refresh(self, tag_id, bucket):
+        """
+        Set the tag's bucket starting at ``bucket`` to the number of posts
+        and comments created in that hour that use it. Idempotent, so it is
+        safe to run from a retried or duplicated background job.
+        """
+        hour = {'tag_id': tag_id, 'created_at__gte': bucket, 'created_at__lt': bucket + timezone.timedelta(hours=1)}
+        count = PostTag.objects.filter(**hour).count() + CommentTag.objects.filter(**hour).count()
+        self.update_or_create(tag_id=tag_id, bucket=bucket, defaults={'count': count})
+    
+    def trending(self, since, kind=Tag.HASHTAG, limit=10):
+        """
+        Return [(name, count), ...] for the most used tags of ``kind`` in
+        buckets from ``since`` on, most used first.
+        """
+        return list(
+            self.filter(bucket__gte=since, tag__kind=kind, count__gt=0)
+            .values_list('tag__name')
+            .annotate(total=models.Sum('count'))
+            .order_by('-total', 'tag__name')[:limit]
+        )
+
+
+class TagRollup(models.Model):
+    """
+    Uses of a tag by posts and comments created in one hour. Refreshed from
+    PostTag and CommentTag by a background job whenever links are added or
+    removed, so trending tags over any window is a range sum over buckets.
+    """
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='rollups')
+    bucket = models.DateTimeField()  # start of the hour
+    count = models.PositiveIntegerField(default=0)
+    
+    objects = TagRollupManager()
+    
+    class Meta:
+        db_table = 'tag_rollups'
+        constraints = [
+            UniqueConstraint(fields=['tag', 'bucket'], name='unique_tag_rollup_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket'], name='tag_rollups_bucket_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.tag_id} @ {self.bucket:%Y-%m-%d %H:00}: {self.count}'
+
+
+class TimelineEntryQuerySet(models.QuerySet):
+    """QuerySet for the home timeline inbox."""
+    
+    def deliver(self, posts, user_ids):
+        """Add ``posts`` to the inboxes of ``user_ids``, skipping entries that exist."""
+        entries = [
+            TimelineEntry(user_id=user_id, post=post, author_id=post.author_id, created_at=post.created_at)
+            for user_id in user_ids
+            for post in posts
+        ]
+        self.bulk_create(entries, batch_size=settings.FEED_FANOUT_BATCH_SIZE, ignore_conflicts=True)
+    
+    def deliver_to_followers(self, posts, author_id, user_ids):
+        """
+        Deliver ``posts`` by ``author_id`` to those of ``user_ids`` that
+        still follow the author. Their Follow rows stay locked until the
+        entries are written, so an unfollow either commits first and the
+        user is skipped, or waits and then drops the new entries too.
+        """
+        from apps.users.models import Follow
+        
+        with transaction.atomic(using=self.db):
+            following = list(
+                Follow.objects.using(self.db).select_for_update()
+                .filter(followee_id=author_id, follower_id__in=user_ids)
+                .values_list('follower_id', flat=True)
+            )
+            if following:
+                self.deliver(posts, following)
+    
+    def fan_out(self, post):
+        """
+        Deliver ``post`` to every follower of its author, a batch of
+        followers per INSERT, rechecking each batch against Follow so
+        followers who unfollowed meanwhile are skipped. Authors with more than
+        FEED_FANOUT_MAX_FOLLOWERS followers are skipped; their posts are
+        pulled into the home feed at read time instead.
+        """
+        from apps.users.models import Follow
+        
+        if post.author.follower_count > settings.FEED_FANOUT_MAX_FOLLOWERS:
+            return
+        follower_ids = (
+            Follow.objects.filter(followee_id=post.author_id)
+            .values_list('follower_id', flat=True)
+            .iterator(chunk_size=settings.FEED_FANOUT_BATCH_SIZE)
+        )
+        batch = []
+        for follower_id in follower_ids:
+            batch.append(follower_id)
+            if len(batch) == settings.FEED_FANOUT_BATCH_SIZE:
+                self.deliver_to_followers([post], post.author_id, batch)
+                batch = []
+        if batch:
+            self.deliver_to_followers([post], post.author_id, batch)
+
+
+class TimelineEntry(models.Model):
+    """
+    A post in a follower's home timeline inbox, written when the post is
+    created (fan-out-on-write) so a home feed page is one range scan of
+    the reader's entries. created_at is the post's, copied for ordering.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField()
+    
+    objects = TimelineEntryQuerySet.as_manager()
+    
+    class Meta:
+        db_table = 'timeline_entries'
+        constraints = [
+            UniqueConstraint(fields=['user', 'post'], name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-post'], name='timeline_user_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.user_id}: post {self.post_id}'
@@ -0,0 +1,103 @@
+"""
+Full-text search over posts and comments.
+
+Both content types share one inverted index: an FTS5 virtual table on SQLite
+or a ``tsvector`` column with a GIN index on PostgreSQL (created by migration
+0003_search_index). Rows are keyed by a document id derived from the object
+type and primary key, so updates and deletes hit the index by rowid and never
+need a scan. The index is kept in sync by the signal handlers in signals.py.
+"""
+import re
+
+from django.db import connections
+
+POST = 'post'
+COMMENT = 'comment'
+
+SEARCH_TABLE = 'search_index'
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def document_id(kind, object_id):
+    """Stable index key: posts get even ids, comments odd ones."""
+    return object_id * 2 + (1 if kind == COMMENT else 0)
+
+
+def index_document(kind, object_id, content, using='default'):
+    """Insert or replace the index entry for one post or comment."""
+    connection = connections[using]
+    doc_id = document_id(kind, object_id)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f'''
+                INSERT INTO {SEARCH_TABLE} (id, kind, object_id, document)
+                VALUES (%s, %s, %s, to_tsvector('english', %s))
+                ON CONFLICT (id) DO UPDATE SET document = EXCLUDED.document
+                ''',
+                [doc_id, kind, object_id, content],
+            )
+        else:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [doc_id])
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, content, kind, object_id) VALUES (%s, %s, %s, %s)',
+                [doc_id, content, kind, object_id],
+            )
+
+
+def remove_document(kind, object_id, using='default'):
+    """Drop the index entry for one post or comment."""
+    remove_documents(kind, [object_id], using=using)
+
+
+def remove_documents(kind, object_ids, using='default'):
+    """Drop the index entries for many posts or comments in one statement."""
+    if not object_ids:
+        return
+    key = 'id' if connections[using].vendor == 'postgresql' else 'rowid'
+    placeholders = ', '.join(['%s'] * len(object_ids))
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE {key} IN ({placeholders})',
+            [document_id(kind, object_id) for object_id in object_ids],
+        )
+
+
+def search(query, limit=20, offset=0, using='default'):
+    """
+    Return up to ``limit`` ranked hits as (kind, object_id, rank) tuples,
+    best match first. Every term must match; punctuation is ignored.
+    """
+    terms = _TERM_RE.findall(query)
+    if not terms:
+        return []
+
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f'''
+                SELECT kind, object_id, ts_rank(document, query) AS rank
+                FROM {SEARCH_TABLE}, plainto_tsquery('english', %s) query
+                WHERE document @@ query
+                ORDER BY rank DESC, id DESC
+                LIMIT %s OFFSET %s
+                ''',
+                [' '.join(terms), limit, offset],
+            )
+            return cursor.fetchall()
+
+        # Quote each term so user input can never be parsed as FTS5 syntax
+        match = ' '.join(f'"{term}"' for term in terms)
+        cursor.execute(
+            f'''
+            SELECT kind, object_id, -bm25({SEARCH_TABLE}) AS rank
+            FROM {SEARCH_TABLE}
+            WHERE {SEARCH_TABLE} MATCH %s
+            ORDER BY bm25({SEARCH_TABLE}), rowid DESC
+            LIMIT %s OFFSET %s
+            ''',
+            [match, limit, offset],
+        )
+        return cursor.fetchall()
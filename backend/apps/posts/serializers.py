@@ -1,20 +1,36 @@
+from django.db import transaction
 from rest_framework import serializers
-from apps.users.serializers import UserSerializer
-from .models import Post, Comment, Like
+from apps.users.serializers import AuthorField, UserSerializer
+from .models import Post, Comment
 
 
 class CommentSerializer(serializers.ModelSerializer):
     """Serializer for Comment model with MPTT support."""
-    author = UserSerializer(read_only=True)
+    author = AuthorField()
     parent_id = serializers.IntegerField(read_only=True, allow_null=True)
+    # Live replies below this node at any depth (tombstones excluded, like
+    # Post.comment_count); views annotate it so lists need no query per node
+    reply_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Comment
         fields = [
             'id', 'author', 'content', 'created_at', 'updated_at',
-            'parent_id', 'level'
+            'parent_id', 'level', 'is_deleted', 'reply_count'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'level']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'level', 'is_deleted']
+    
+    def get_reply_count(self, obj):
+        if hasattr(obj, 'reply_count'):
+            return obj.reply_count
+        return obj.get_descendants().filter(is_deleted=False).count()
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.is_deleted:
+            # Tombstones keep their place in the thread but not their author
+            data['author'] = None
+        return data
 
 
 class CommentCreateSerializer(serializers.ModelSerializer):
@@ -29,26 +45,31 @@ class CommentCreateSerializer(serializers.ModelSerializer):
         post = self.context['post']
         author = self.context['request'].user
         
-        comment = Comment.objects.create(
-            post=post,
-            author=author,
-            **validated_data
-        )
+        # The post's comment_count is bumped by a post_save handler; keep
+        # both writes in one transaction
+        with transaction.atomic():
+            comment = Comment.objects.create(
+                post=post,
+                author=author,
+                **validated_data
+            )
         return comment
 
 
 class PostSerializer(serializers.ModelSerializer):
     """Serializer for Post model."""
-    author = UserSerializer(read_only=True)
-    like_count = serializers.ReadOnlyField()
+    author = AuthorField()
+    # Denormalized from post_likes by the posts.refresh_scores job queued on
+    # each like toggle, so it can briefly lag behind the likes themselves
+    like_count = serializers.IntegerField(source='score', read_only=True)
     
     class Meta:
         model = Post
         fields = [
             'id', 'author', 'content', 'created_at', 'updated_at',
-            'like_count'
+            'like_count', 'comment_count'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'comment_count']
 
 
 class PostCreateSerializer(serializers.ModelSerializer):
@@ -59,19 +80,24 @@ class PostCreateSerializer(serializers.ModelSerializer):
         fields = ['content']
     
     def create(self, validated_data):
-        """Create post with author from request."""
+        """
+        Create post with author from request. Delivery to followers' home
+        timelines is queued in the same transaction (fan-out-on-write).
+        """
+        from apps.jobs import queue
+        
         author = self.context['request'].user
-        return Post.objects.create(author=author, **validated_data)
+        with transaction.atomic():
+            post = Post.objects.create(author=author, **validated_data)
+            queue.enqueue('posts.fan_out', {'post_id': post.pk})
+        return post
 
 
-class LikeSerializer(serializers.ModelSerializer):
-    """Serializer for Like model."""
+class LikeSerializer(serializers.Serializer):
+    """Serializer for PostLike and CommentLike."""
+    id = serializers.IntegerField(read_only=True)
     user = UserSerializer(read_only=True)
-    
-    class Meta:
-        model = Like
-        fields = ['id', 'user', 'created_at']
-        read_only_fields = ['id', 'user', 'created_at']
+    created_at = serializers.DateTimeField(read_only=True)
 
 
 class LikeToggleSerializer(serializers.Serializer):
@@ -83,3 +109,15 @@ class LikeToggleSerializer(serializers.Serializer):
         if value not in ['like', 'unlike']:
             raise serializers.ValidationError("Action must be 'like' or 'unlike'")
         return value
+
+
+class SearchResultSerializer(serializers.Serializer):
+    """Serializer for a ranked full-text search hit (post or comment)."""
+    type = serializers.CharField()
+    id = serializers.IntegerField()
+    post_id = serializers.IntegerField()
+    content = serializers.CharField()
+    created_at = serializers.DateTimeField()
+    author = AuthorField()
+    like_count = serializers.IntegerField()
+    rank = serializers.FloatField()
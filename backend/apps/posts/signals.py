@@ -0,0 +1,59 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.jobs import queue
+from . import search
+from .models import Comment, Post
+
+
+def _content_changed(update_fields):
+    return update_fields is None or 'content' in update_fields
+
+
+def _enqueue_index(kind, object_id):
+    # Indexing runs in the background; edits before it runs coalesce
+    queue.enqueue(
+        'posts.index_documents', {'kind': kind, 'id': object_id},
+        dedup_key=f'index:{kind}:{object_id}'
+    )
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, using, update_fields=None, **kwargs):
+    """Keep the search index in sync when a post is created or edited."""
+    if _content_changed(update_fields):
+        _enqueue_index(search.POST, instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, using, **kwargs):
+    search.remove_document(search.POST, instance.pk, using=using)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, using, update_fields=None, **kwargs):
+    """Keep the search index in sync when a comment is created or edited."""
+    if instance.is_deleted:
+        search.remove_document(search.COMMENT, instance.pk, using=using)
+    elif _content_changed(update_fields):
+        _enqueue_index(search.COMMENT, instance.pk)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, using, **kwargs):
+    search.remove_document(search.COMMENT, instance.pk, using=using)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, using, **kwargs):
+    """Keep Post.comment_count in step; one UPDATE, so safe under concurrency."""
+    if created and not instance.is_deleted:
+        Post.objects.using(using).filter(pk=instance.post_id).update(comment_count=F('comment_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, using, **kwargs):
+    # Tombstones were already uncounted by Comment.tombstone()
+    if not instance.is_deleted:
+        Post.objects.using(using).filter(pk=instance.post_id).update(comment_count=F('comment_count') - 1)
@@ -0,0 +1,93 @@
+"""
+Hashtags and mentions.
+
+``#tags`` and ``@mentions`` are parsed out of post and comment content when it
+is written (by the posts.index_documents job, alongside search indexing) and
+stored as PostTag / CommentTag rows pointing at a normalized Tag. Browsing a
+topic is then a range scan of the (tag, created_at) index rather than a
+substring scan of posts.content. TagRollup keeps hourly per-tag counts for
+the trending endpoint; links removed by deletes queue a rollup refresh.
+"""
+import re
+
+from apps.jobs import queue
+from .models import Tag, TagRollup
+
+HASHTAG_RE = re.compile(r'(?<![\w#&])#(\w{1,100})')
+# Usernames may contain . + - and @ (see AbstractUser.username)
+MENTION_RE = re.compile(r'(?<![\w@])@(\w[\w.@+-]{0,149})')
+
+
+def bucket(moment):
+    """Start of the hour containing ``moment``; the TagRollup granularity."""
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def extract(content):
+    """Return the set of (kind, name) tags in ``content``, lowercased."""
+    found = {(Tag.HASHTAG, name.lower()) for name in HASHTAG_RE.findall(content)}
+    for name in MENTION_RE.findall(content):
+        # A mention ending a sentence keeps its trailing punctuation
+        found.add((Tag.MENTION, name.rstrip('.').lower()))
+    return found
+
+
+def parse(value):
+    """Tag key for a ?tag= value: '@name' is a mention, 'name' or '#name' a hashtag."""
+    if value.startswith('@'):
+        return Tag.MENTION, value[1:].lower()
+    return Tag.HASHTAG, value.lstrip('#').lower()
+
+
+def sync(link_model, objects):
+    """
+    Make the tag links of ``objects`` (posts for PostTag, comments for
+    CommentTag) match their current content, then recount the rollups of
+    every tag added or removed. Tombstoned comments keep no tags.
+    """
+    if not objects:
+        return
+    field = f'{link_model.target_field}_id'
+    keys = {
+        obj.pk: set() if getattr(obj, 'is_deleted', False) else extract(obj.content)
+        for obj in objects
+    }
+    tag_ids = Tag.objects.ensure(set().union(*keys.values()))
+    wanted = {object_id: {tag_ids[key] for key in object_keys} for object_id, object_keys in keys.items()}
+    created_at = {obj.pk: obj.created_at for obj in objects}
+    
+    stale_ids, changed, current = [], set(), set()
+    for link_id, object_id, tag_id in (
+        link_model.objects.filter(**{f'{field}__in': list(wanted)}).values_list('id', field, 'tag_id')
+    ):
+        current.add((object_id, tag_id))
+        if tag_id not in wanted[object_id]:
+            stale_ids.append(link_id)
+            changed.add((object_id, tag_id))
+    new = {(object_id, tag_id) for object_id, ids in wanted.items() for tag_id in ids} - current
+    changed |= new
+    
+    link_model.objects.filter(id__in=stale_ids).delete()
+    link_model.objects.bulk_create(
+        [link_model(tag_id=tag_id, created_at=created_at[object_id], **{field: object_id}) for object_id, tag_id in new],
+        ignore_conflicts=True,
+    )
+    for tag_id, hour in sorted({(tag_id, bucket(created_at[object_id])) for object_id, tag_id in changed}):
+        TagRollup.objects.refresh(tag_id, hour)
+
+
+def forget(link_model, object_ids, using='default'):
+    """
+    Delete the tag links of objects about to be deleted and queue their
+    rollups for a recount. Called from the bulk delete paths
+    (Post.objects.delete_with_threads, CommentQuerySet.release).
+    """
+    links = link_model.objects.using(using).filter(**{f'{link_model.target_field}_id__in': object_ids})
+    touched = {(tag_id, bucket(moment)) for tag_id, moment in links.values_list('tag_id', 'created_at')}
+    if not touched:
+        return
+    links.delete()
+    queue.enqueue_many([
+        ('posts.refresh_tag_rollups', {'tag_id': tag_id, 'bucket': hour.isoformat()}, f'tag-rollup:{tag_id}:{hour.isoformat()}')
+        for tag_id, hour in sorted(touched)
+    ], using=using)
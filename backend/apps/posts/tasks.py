@@ -0,0 +1,72 @@
+"""Background job handlers (see apps/jobs/queue.py)."""
+from datetime import datetime
+
+from django.conf import settings
+
+from apps.jobs.queue import register
+from apps.users.models import User
+from . import search, tags
+from .models import Comment, CommentTag, Post, PostTag, TagRollup, TimelineEntry
+
+
+@register('posts.refresh_scores')
+def refresh_scores(payloads):
+    """Bring liked posts' score and hot_score up to date."""
+    Post.objects.refresh_scores({p['post_id'] for p in payloads})
+
+
+@register('posts.index_documents')
+def index_documents(payloads):
+    """
+    (Re)index created or edited posts and comments and sync their hashtags
+    and mentions, loading each kind with one query. Objects deleted or
+    tombstoned since are dropped from the index instead.
+    """
+    ids = {search.POST: set(), search.COMMENT: set()}
+    for payload in payloads:
+        ids[payload['kind']].add(payload['id'])
+    objects = {
+        search.POST: Post.objects.only('content', 'created_at').in_bulk(ids[search.POST]),
+        search.COMMENT: Comment.objects.only('content', 'created_at', 'is_deleted').in_bulk(ids[search.COMMENT]),
+    }
+    tags.sync(PostTag, list(objects[search.POST].values()))
+    tags.sync(CommentTag, list(objects[search.COMMENT].values()))
+    for kind, object_ids in ids.items():
+        for object_id in sorted(object_ids):
+            obj = objects[kind].get(object_id)
+            if obj is None or getattr(obj, 'is_deleted', False):
+                search.remove_document(kind, object_id)
+            else:
+                search.index_document(kind, object_id, obj.content)
+
+
+@register('posts.refresh_tag_rollups')
+def refresh_tag_rollups(payloads):
+    """Recount the hourly TagRollup buckets touched by deleted tag links."""
+    for tag_id, bucket in sorted({(p['tag_id'], p['bucket']) for p in payloads}):
+        TagRollup.objects.refresh(tag_id, datetime.fromisoformat(bucket))
+
+
+@register('posts.fan_out')
+def fan_out(payloads):
+    """Deliver new posts to their authors' followers' timeline inboxes."""
+    post_ids = {p['post_id'] for p in payloads}
+    for post in Post.objects.select_related('author').filter(id__in=post_ids):
+        TimelineEntry.objects.fan_out(post)
+
+
+@register('posts.backfill_timeline')
+def backfill_timeline(payloads):
+    """
+    Seed a new follower's inbox with the author's latest
+    FEED_BACKFILL_POSTS posts, so the home feed isn't empty until they post
+    again. Authors whose posts are pulled at read time need nothing, and
+    neither does a follower who has unfollowed again since the job was queued.
+    """
+    authors = User.objects.in_bulk({p['author_id'] for p in payloads})
+    for payload in payloads:
+        author = authors.get(payload['author_id'])
+        if author is None or author.follower_count > settings.FEED_FANOUT_MAX_FOLLOWERS:
+            continue
+        posts = author.posts.order_by('-created_at', '-id')[:settings.FEED_BACKFILL_POSTS]
+        TimelineEntry.objects.deliver_to_followers(list(posts), author.pk, [payload['user_id']])
@@ -1,3 +1,356 @@
+import base64
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.gamification.models import KarmaTransaction
+from apps.jobs import queue
+from apps.users.models import Follow, User
+from . import search, tags
+from .views import encode_bitmap
+from .models import Comment, CommentLike, CommentTag, Like, LikeQuerySet, Post, PostLike, PostTag, Tag, TimelineEntry
+
+
+class FeedSortTests(TestCase):
+    """The precomputed feed orderings."""
+    
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+    
+    def make_post(self, score, age):
+        post = Post.objects.create(author=self.author, content='post', score=score)
+        Post.objects.filter(pk=post.pk).update(created_at=timezone.now() - age)
+        return post
+    
+    def test_windowed_top_keeps_only_recent_posts_by_score(self):
+        old = self.make_post(score=50, age=timedelta(days=3))
+        low = self.make_post(score=1, age=timedelta(hours=2))
+        high = self.make_post(score=9, age=timedelta(hours=5))
+        
+        since = timezone.now() - timedelta(days=1)
+        self.assertEqual(list(Post.objects.top(since=since)), [high, low])
+        self.assertEqual(list(Post.objects.top()), [old, high, low])
+
+
+class ToggleLikeTests(TestCase):
+    
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.fan = User.objects.create(username='fan')
+        self.post = Post.objects.create(author=self.author, content='post')
+        self.client = APIClient()
+        self.client.force_authenticate(self.fan)
+    
+    def test_like_then_unlike(self):
+        url = f'/api/posts/like/post/{self.post.pk}/'
+        self.assertEqual(self.client.post(url).data, {'liked': True, 'action': 'liked', 'like_count': 1})
+        self.assertEqual(self.client.post(url).data, {'liked': False, 'action': 'unliked', 'like_count': 0})
+        self.assertEqual(
+            list(KarmaTransaction.objects.order_by('id').values_list('reason', 'karma_change')),
+            [('post_like', 5), ('post_unlike', -5)],
+        )
+    
+    def test_concurrent_like_is_not_an_error(self):
+        # Another request's like lands between our delete and insert
+        PostLike.objects.create(user=self.fan, post=self.post)
+        with mock.patch.object(LikeQuerySet, 'delete', return_value=(0, {})):
+            response = self.client.post(f'/api/posts/like/post/{self.post.pk}/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['liked'], True)
+        self.assertEqual(PostLike.objects.count(), 1)
+        self.assertFalse(KarmaTransaction.objects.exists())
+
+
+class ThreadDeletionTests(TestCase):
+    """Deleting and tombstoning comments clears what hangs off them."""
+    
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.fan = User.objects.create(username='fan')
+        self.post = Post.objects.create(author=self.author, content='hello #django')
+        self.root = Comment.objects.create(author=self.author, post=self.post, content='great #django')
+        self.reply = Comment.objects.create(author=self.author, post=self.post, parent=self.root, content='thanks @fan')
+        Comment.objects.create(author=self.fan, post=self.post, parent=self.reply, content='welcome')
+        Like.toggle_like(self.fan, self.root)
+        Like.toggle_like(self.fan, self.reply)
+        queue.drain()
+    
+    def karma(self):
+        return KarmaTransaction.objects.totals([self.author.id]).get(self.author.id, 0)
+    
+    def test_delete_with_threads_removes_threads_and_their_dependents(self):
+        self.assertEqual(len(search.search('django')), 2)
+        self.assertEqual(CommentTag.objects.count(), 2)
+        self.assertEqual(self.karma(), 2)
+        self.assertEqual(Post.objects.filter(pk=self.post.pk).delete_with_threads(chunk_size=1), 1)
+        
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(CommentLike.objects.exists())
+        self.assertFalse(CommentTag.objects.exists())
+        self.assertFalse(PostTag.objects.exists())
+        self.assertEqual(search.search('django'), [])
+        self.assertEqual(self.karma(), 0)
+    
+    def test_tombstone_keeps_replies_and_releases_the_comment(self):
+        self.root.tombstone()
+        
+        self.root.refresh_from_db()
+        self.assertTrue(self.root.is_deleted)
+        self.assertEqual(self.root.get_descendant_count(), 2)
+        self.assertEqual(list(CommentLike.objects.values_list('comment_id', flat=True)), [self.reply.pk])
+        self.assertFalse(CommentTag.objects.filter(comment=self.root).exists())
+        self.assertEqual(search.search('great'), [])
+        self.assertEqual(self.karma(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+        
+        client = APIClient()
+        client.force_authenticate(self.fan)
+        self.assertEqual(client.post(f'/api/posts/like/comment/{self.root.pk}/').status_code, 404)
+    
+    def test_tombstone_cannot_be_edited(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        url = f'/api/posts/comments/{self.root.pk}/'
+        self.assertEqual(client.delete(url).status_code, 204)
+        
+        self.assertEqual(client.patch(url, {'content': 'back again'}).status_code, 403)
+        self.assertEqual(client.put(url, {'content': 'back again'}).status_code, 403)
+        self.root.refresh_from_db()
+        self.assertEqual((self.root.content, self.root.is_deleted), ('', True))
+        thread = client.get(f'/api/posts/{self.post.pk}/comments/threaded/').data['comments']
+        self.assertEqual(thread[0]['content'], '')
+    
+    def test_hard_delete_releases_the_subtree(self):
+        self.reply.delete()
+        
+        self.assertEqual(list(Comment.objects.values_list('pk', flat=True)), [self.root.pk])
+        self.assertEqual(list(CommentLike.objects.values_list('comment_id', flat=True)), [self.root.pk])
+        self.assertFalse(CommentTag.objects.exclude(comment=self.root).exists())
+        self.assertEqual(self.karma(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+
+class ReplyCountTests(TestCase):
+    """reply_count and comment_count both leave tombstones out."""
+    
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.post = Post.objects.create(author=self.author, content='hello')
+        self.root = Comment.objects.create(author=self.author, post=self.post, content='root')
+        self.reply = Comment.objects.create(author=self.author, post=self.post, parent=self.root, content='reply')
+        Comment.objects.create(author=self.author, post=self.post, parent=self.reply, content='nested')
+        Comment.objects.create(author=self.author, post=self.post, parent=self.root, content='second')
+        self.reply.tombstone()
+        self.client = APIClient()
+    
+    def test_threaded_view_counts_live_replies(self):
+        response = self.client.get(f'/api/posts/{self.post.pk}/comments/threaded/')
+        root = response.data['comments'][0]
+        self.assertEqual(root['reply_count'], 2)
+        self.assertEqual([child['reply_count'] for child in root['children']], [1, 0])
+    
+    def test_annotated_counts_match_the_thread(self):
+        counts = dict(Comment.objects.with_reply_counts().values_list('content', 'reply_count'))
+        self.assertEqual(counts['root'], 2)
+        self.assertEqual(counts['nested'], 0)
+        self.assertEqual(self.client.get(f'/api/posts/comments/{self.root.pk}/').data['reply_count'], 2)
+    
+    def test_batch_keeps_the_post_comment_count(self):
+        response = self.client.get('/api/posts/batch/', {'post_ids': [self.post.pk]})
+        result = response.data['results'][0]
+        self.assertEqual(result['comment_count'], 3)
+        self.assertEqual([comment['reply_count'] for comment in result['comments']], [2])
+
+
+class HomeFeedTests(TestCase):
+    """The home timeline follows who the reader follows."""
+    
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+    
+    def toggle_follow(self):
+        self.client.post(f'/api/users/{self.author.pk}/follow/')
+    
+    def publish(self, content):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        client.post('/api/posts/', {'content': content})
+    
+    def home(self, **params):
+        response = self.client.get('/api/posts/home/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+    
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        self.publish('before')
+        self.toggle_follow()
+        queue.drain()
+        self.publish('after')
+        queue.drain()
+        
+        self.assertEqual([post['content'] for post in self.home()['results']], ['after', 'before'])
+        first = self.home(limit=1)
+        self.assertEqual([post['content'] for post in self.home(limit=1, cursor=first['next_cursor'])['results']], ['before'])
+    
+    def test_unfollow_empties_the_feed(self):
+        self.toggle_follow()
+        self.publish('hello')
+        queue.drain()
+        self.toggle_follow()
+        
+        self.assertEqual(self.home()['results'], [])
+    
+    def test_jobs_queued_before_an_unfollow_deliver_nothing(self):
+        self.publish('old')
+        self.toggle_follow()
+        self.publish('new')
+        # Unfollowed before the backfill and fan-out jobs ran
+        self.toggle_follow()
+        queue.drain()
+        
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+
+
+class TagTests(TestCase):
+    """Hashtags and mentions: extraction, ?tag= browsing and trending counts."""
+    
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.client = APIClient()
+    
+    def publish(self, content):
+        post = Post.objects.create(author=self.author, content=content)
+        queue.drain()
+        return post
+    
+    def trending(self, **params):
+        response = self.client.get('/api/posts/tags/trending/', params)
+        self.assertEqual(response.status_code, 200)
+        return [(tag['name'], tag['count']) for tag in response.data['tags']]
+    
+    def test_extract_and_parse(self):
+        self.assertEqual(
+            tags.extract('#Django tips for @jane.doe. Not a&#39;tag or mail@example.com #django'),
+            {(Tag.HASHTAG, 'django'), (Tag.MENTION, 'jane.doe')},
+        )
+        self.assertEqual(tags.parse('#Python'), (Tag.HASHTAG, 'python'))
+        self.assertEqual(tags.parse('python'), (Tag.HASHTAG, 'python'))
+        self.assertEqual(tags.parse('@Jane'), (Tag.MENTION, 'jane'))
+    
+    def test_tag_filter_lists_tagged_posts_newest_first(self):
+        first = self.publish('learning #django')
+        self.publish('about #python')
+        second = self.publish('more #Django, thanks @author')
+        
+        for sort in ('new', 'hot', 'top'):
+            response = self.client.get('/api/posts/', {'tag': 'django', 'sort': sort})
+            ids = [post['id'] for post in response.data]
+            self.assertEqual(sorted(ids), sorted([first.pk, second.pk]))
+        response = self.client.get('/api/posts/', {'tag': '#django'})
+        self.assertEqual([post['id'] for post in response.data], [second.pk, first.pk])
+        response = self.client.get('/api/posts/', {'tag': '@author'})
+        self.assertEqual([post['id'] for post in response.data], [second.pk])
+    
+    def test_deleting_posts_updates_trending(self):
+        post = self.publish('#django #python')
+        self.publish('#django')
+        self.assertEqual(self.trending(), [('django', 2), ('python', 1)])
+        
+        post.delete()
+        queue.drain()
+        self.assertFalse(PostTag.objects.filter(post_id=post.pk).exists())
+        self.assertEqual(self.trending(), [('django', 1)])
+
+
+class PostsBatchTests(TestCase):
+    
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.viewer = User.objects.create(username='viewer')
+        self.posts = []
+        for n in range(50):
+            post = Post.objects.create(author=self.author, content=f'post {n}')
+            root = Comment.objects.create(author=self.author, post=post, content='root')
+            Comment.objects.create(author=self.viewer, post=post, parent=root, content='reply')
+            Like.toggle_like(self.viewer, post)
+            Like.toggle_like(self.viewer, root)
+            self.posts.append(post)
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+    
+    def batch(self, post_ids):
+        return self.client.get('/api/posts/batch/', {'post_ids': post_ids})
+    
+    def test_query_count_does_not_grow_with_the_batch(self):
+        ids = [post.pk for post in self.posts]
+        with CaptureQueriesContext(connection) as one:
+            self.assertEqual(self.batch(ids[:1]).status_code, 200)
+        with self.assertNumQueries(len(one)):
+            response = self.batch(ids)
+        
+        self.assertEqual(len(response.data['results']), 50)
+        result = response.data['results'][-1]
+        self.assertEqual(result['post']['liked_by_viewer'], True)
+        self.assertEqual([c['liked_by_viewer'] for c in result['comments']], [True])
+    
+    def test_at_most_fifty_ids(self):
+        ids = [post.pk for post in self.posts] + [self.posts[-1].pk + 1]
+        self.assertEqual(self.batch(ids).status_code, 400)
+        # Unknown ids within the limit are reported, not an error
+        response = self.batch(ids[-2:])
+        self.assertEqual(response.data['missing'], [ids[-1]])
+
 
-# Create your tests here.
+class ThreadLikesTests(TestCase):
+    """The viewer's likes in the threaded view, per node or as a bitmap."""
+    
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.viewer = User.objects.create(username='viewer')
+        self.post = Post.objects.create(author=self.author, content='hello')
+        first = Comment.objects.create(author=self.author, post=self.post, content='first')
+        reply = Comment.objects.create(author=self.author, post=self.post, parent=first, content='reply')
+        second = Comment.objects.create(author=self.author, post=self.post, content='second')
+        Comment.objects.create(author=self.author, post=self.post, parent=reply, content='nested')
+        # Depth-first order: first, reply, nested, second
+        Like.toggle_like(self.viewer, self.post)
+        Like.toggle_like(self.viewer, reply)
+        Like.toggle_like(self.viewer, second)
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+        self.url = f'/api/posts/{self.post.pk}/comments/threaded/'
+    
+    def test_liked_by_viewer_on_post_and_every_node(self):
+        data = self.client.get(self.url).data
+        self.assertTrue(data['post']['liked_by_viewer'])
+        first, second = data['comments']
+        reply = first['children'][0]
+        self.assertEqual(
+            [first['liked_by_viewer'], reply['liked_by_viewer'], reply['children'][0]['liked_by_viewer'],
+             second['liked_by_viewer']],
+            [False, True, False, True],
+        )
+        self.assertNotIn('liked_bitmap', data)
+    
+    def test_bitmap_follows_depth_first_order(self):
+        data = self.client.get(self.url, {'likes': 'bitmap'}).data
+        # Bits 1 (reply) and 3 (second), least significant first
+        self.assertEqual(base64.b64decode(data['liked_bitmap']), bytes([0b1010]))
+        self.assertNotIn('liked_by_viewer', data['comments'][0])
+        self.assertTrue(data['post']['liked_by_viewer'])
+    
+    def test_encode_bitmap_spans_bytes(self):
+        flags = [False] * 9 + [True]
+        self.assertEqual(base64.b64decode(encode_bitmap(flags)), bytes([0, 0b10]))
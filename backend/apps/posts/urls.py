@@ -8,6 +8,10 @@ urlpatterns = [
     # Post endpoints
     path('', views.PostListCreateView.as_view(), name='post-list-create'),
     path('<int:pk>/', views.PostDetailView.as_view(), name='post-detail'),
+    path('search/', views.search_view, name='search'),
+    path('batch/', views.posts_batch, name='posts-batch'),
+    path('home/', views.home_feed, name='home-feed'),
+    path('tags/trending/', views.trending_tags, name='trending-tags'),
     
     # Comment endpoints
     path('<int:post_id>/comments/', views.CommentListCreateView.as_view(), name='comment-list-create'),
@@ -1,6 +1,5 @@
 from django.db import models
-from django.contrib.contenttypes.models import ContentType
-from .models import Post, Comment, Like
+from .models import Post, Comment
 
 
 class PostQuerySet(models.QuerySet):
@@ -54,61 +53,6 @@ class CommentManager(models.Manager):
         return comments
 
 
-class LikeManager(models.Manager):
-    """Custom manager for Like with concurrency-safe operations."""
-    
-    def get_like_count(self, content_type, object_id):
-        """Get like count for a specific object efficiently."""
-        return self.filter(
-            content_type=content_type,
-            object_id=object_id
-        ).count()
-    
-    def user_has_liked(self, user, content_type, object_id):
-        """Check if user has already liked an object."""
-        return self.filter(
-            user=user,
-            content_type=content_type,
-            object_id=object_id
-        ).exists()
-    
-    def toggle_like(self, user, content_object):
-        """
-        Toggle a like with race condition protection.
-        Uses database transactions and select_for_update.
-        """
-        from django.db import transaction
-        
-        content_type = ContentType.objects.get_for_model(content_object)
-        
-        with transaction.atomic():
-            # Lock the user's likes for this content type to prevent race conditions
-            existing_like = (
-                self.objects
-                .select_for_update()
-                .filter(
-                    user=user,
-                    content_type=content_type,
-                    object_id=content_object.pk
-                )
-                .first()
-            )
-            
-            if existing_like:
-                # User already liked, so unlike
-                existing_like.delete()
-                return False, 'unliked'
-            else:
-                # User hasn't liked yet, so like
-                like = self.create(
-                    user=user,
-                    content_type=content_type,
-                    object_id=content_object.pk
-                )
-                return True, 'liked'
-
-
 # Custom managers
 PostManager = PostQuerySet.as_manager()
 Comment.objects = CommentManager()
-Like.objects = LikeManager()
@@ -1,19 +1,74 @@
+import base64
+
 from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from django.contrib.contenttypes.models import ContentType
-from django.db import transaction
+from django.db import router, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
 
-from apps.users.models import User
-from .models import Post, Comment, Like
+from apps.users.models import Follow, User
+from apps.users.serializers import AuthorCache
+from community_feed.pagination import encode_timeline_cursor, seek, timeline_params
+from . import search, tags
+from .models import Post, Comment, Like, Tag, TagRollup, TimelineEntry, count_live_replies
 from .serializers import (
     PostSerializer, PostCreateSerializer, CommentSerializer,
-    CommentCreateSerializer, LikeSerializer
+    CommentCreateSerializer, LikeSerializer, SearchResultSerializer
 )
 
+SEARCH_MAX_LIMIT = 100
+
+TRENDING_MAX_LIMIT = 50
+
+BATCH_MAX_POSTS = 50
+BATCH_DEFAULT_ROOTS = 3
+BATCH_MAX_ROOTS = 20
+
+# ?window= values accepted by the "top" feed sort
+FEED_TOP_WINDOWS = {
+    '24h': timezone.timedelta(hours=24),
+    '7d': timezone.timedelta(days=7),
+    '30d': timezone.timedelta(days=30),
+    'all': None,
+}
+
+# ?window= values accepted by the trending tags endpoint
+TRENDING_WINDOWS = {
+    '1h': timezone.timedelta(hours=1),
+    '24h': timezone.timedelta(hours=24),
+    '7d': timezone.timedelta(days=7),
+}
+
+
+def is_normalized(request):
+    """Whether the client asked for ?shape=normalized (authors listed once)."""
+    return request.query_params.get('shape') == 'normalized'
+
+
+def encode_bitmap(flags):
+    """
+    Pack booleans into a base64 bitmap: flag i is bit (i % 8), counting from
+    the least significant bit, of byte i // 8.
+    """
+    bitmap = bytearray((len(flags) + 7) // 8)
+    for i, flag in enumerate(flags):
+        if flag:
+            bitmap[i >> 3] |= 1 << (i & 7)
+    return base64.b64encode(bytes(bitmap)).decode()
+
 
 class PostListCreateView(generics.ListCreateAPIView):
-    """View to list and create posts."""
+    """
+    View to list and create posts.
+    The feed is ordered by ?sort=new (default), hot, or top; top accepts a
+    ?window= of 24h, 7d, 30d or all. Hot and top read the precomputed score
+    columns through their indexes instead of aggregating likes per request.
+    ?tag=name (or @username for mentions) limits it to posts using that tag.
+    """
     queryset = Post.objects.select_related('author').all()
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     
@@ -24,7 +79,42 @@ class PostListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         """Optimize queryset to prevent N+1 queries."""
-        return Post.objects.select_related('author').all()
+        queryset = Post.objects.select_related('author').all()
+        if self.request.method != 'GET':
+            return queryset
+        
+        tag = self.request.query_params.get('tag')
+        if tag is not None:
+            queryset = queryset.tagged(*tags.parse(tag))
+        
+        sort = self.request.query_params.get('sort', 'new')
+        if sort == 'hot':
+            return queryset.hot()
+        if sort == 'top':
+            window = self.request.query_params.get('window', 'all')
+            if window not in FEED_TOP_WINDOWS:
+                raise ValidationError({'window': f'Must be one of: {", ".join(FEED_TOP_WINDOWS)}'})
+            period = FEED_TOP_WINDOWS[window]
+            return queryset.top(since=timezone.now() - period if period else None)
+        if sort != 'new':
+            raise ValidationError({'sort': 'Must be one of: new, hot, top'})
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        """
+        Serialize the feed with one AuthorCache so each author's payload is
+        built once. ?shape=normalized returns {'results', 'authors'} with
+        author ids on the posts.
+        """
+        posts = list(self.filter_queryset(self.get_queryset()))
+        normalized = is_normalized(request)
+        authors = AuthorCache([post.author for post in posts], normalized=normalized)
+        context = {**self.get_serializer_context(), 'authors': authors}
+        data = self.get_serializer(posts, many=True, context=context).data
+        
+        if normalized:
+            return Response({'results': data, 'authors': authors.as_dict()})
+        return Response(data)
 
 
 class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -36,6 +126,10 @@ class PostDetailView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         """Optimize queryset."""
         return Post.objects.select_related('author').all()
+    
+    def perform_destroy(self, instance):
+        """Delete the post's thread in bulk rather than row by row."""
+        Post.objects.filter(pk=instance.pk).delete_with_threads()
 
 
 @api_view(['POST'])
@@ -50,7 +144,8 @@ def toggle_like(request, content_type, object_id):
         if content_type == 'post':
             content_object = Post.objects.get(pk=object_id)
         elif content_type == 'comment':
-            content_object = Comment.objects.get(pk=object_id)
+            # Tombstones can't be liked (they no longer earn karma)
+            content_object = Comment.objects.get(pk=object_id, is_deleted=False)
         else:
             return Response(
                 {'error': 'Invalid content type'},
@@ -93,7 +188,7 @@ class CommentListCreateView(generics.ListCreateAPIView):
         post_id = self.kwargs['post_id']
         return Comment.objects.filter(
             post_id=post_id
-        ).select_related('author').order_by('tree_id', 'lft')
+        ).select_related('author').with_reply_counts().order_by('tree_id', 'lft')
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -108,10 +203,22 @@ class CommentListCreateView(generics.ListCreateAPIView):
 
 
 class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
-    """View to retrieve, update, and delete comments."""
-    queryset = Comment.objects.select_related('author').all()
+    """
+    View to retrieve, update, and delete comments.
+    Deleting leaves a tombstone so replies keep their place in the thread;
+    tombstones cannot be edited back to life.
+    """
+    queryset = Comment.objects.select_related('author').with_reply_counts()
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    
+    def perform_update(self, serializer):
+        if serializer.instance.is_deleted:
+            raise PermissionDenied('Deleted comments cannot be edited')
+        serializer.save()
+    
+    def perform_destroy(self, instance):
+        instance.tombstone()
 
 
 @api_view(['GET'])
@@ -120,34 +227,42 @@ def post_comments(request, post_id):
     """
     Get comments for a post in threaded format.
     Optimized to prevent N+1 queries using MPTT and bulk operations.
+    For authenticated viewers every node (and the post) carries
+    liked_by_viewer, loaded with one query for the whole thread. With
+    ?likes=bitmap the per-node flags are replaced by a single base64
+    'liked_bitmap' whose bit i is set when the viewer liked the i-th comment
+    in depth-first (tree_id, lft) order, which is much smaller for huge
+    threads.
     """
     try:
-        from django.contrib.contenttypes.models import ContentType
-        from django.db.models import Count
+        post = Post.objects.select_related('author').get(pk=post_id)
+        comments = count_live_replies(list(post.get_comment_tree().select_related('author')))
         
-        post = Post.objects.get(pk=post_id)
-        comments = post.get_comment_tree().select_related('author')
-        
-        # Prefetch like counts to prevent N+1 queries
-        comment_content_type = ContentType.objects.get_for_model(Comment)
-        like_counts = (
-            Like.objects
-            .filter(content_type=comment_content_type, object_id__in=[c.id for c in comments])
-            .values('object_id')
-            .annotate(count=Count('id'))
-        )
+        # Prefetch like counts (comment_id -> like_count) to prevent N+1 queries
+        like_count_map = Like.count_map(Comment, [c.id for c in comments])
         
-        # Create a mapping of comment_id -> like_count
-        like_count_map = {item['object_id']: item['count'] for item in like_counts}
+        # Serialize each distinct author once, with one bulk karma lookup
+        normalized = is_normalized(request)
+        authors = AuthorCache([post.author] + [c.author for c in comments], normalized=normalized)
+        context = {'authors': authors}
         
         # Bulk serialize all comments at once to prevent N+1 queries
-        serializer = CommentSerializer(comments, many=True)
+        serializer = CommentSerializer(comments, many=True, context=context)
         serialized_comments = serializer.data
         
         # Add like counts to serialized data
         for comment_data in serialized_comments:
             comment_data['like_count'] = like_count_map.get(comment_data['id'], 0)
         
+        # The viewer's likes across the whole thread in one query
+        liked = None
+        bitmap = request.query_params.get('likes') == 'bitmap'
+        if request.user.is_authenticated:
+            liked = Like.liked_by(request.user, {Post: [post.id], Comment: [c.id for c in comments]})
+            if not bitmap:
+                for comment_data in serialized_comments:
+                    comment_data['liked_by_viewer'] = comment_data['id'] in liked[Comment]
+        
         # Build threaded structure from already serialized data
         def build_tree(serialized_comments_list):
             """Build threaded comment tree from serialized list."""
@@ -169,13 +284,247 @@ def post_comments(request, post_id):
         
         threaded_comments = build_tree(serialized_comments)
         
-        return Response({
-            'post': PostSerializer(post).data,
+        response = {
+            'post': PostSerializer(post, context=context).data,
             'comments': threaded_comments
-        })
+        }
+        if liked is not None:
+            response['post']['liked_by_viewer'] = post.id in liked[Post]
+            if bitmap:
+                response['liked_bitmap'] = encode_bitmap([c.id in liked[Comment] for c in comments])
+        if normalized:
+            response['authors'] = authors.as_dict()
+        return Response(response)
         
     except Post.DoesNotExist:
         return Response(
             {'error': 'Post not found'},
             status=status.HTTP_404_NOT_FOUND
         )
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def search_view(request):
+    """
+    Full-text search over posts and comments, best match first.
+    Hits come from the inverted index; authors and like counts are then
+    loaded with one bulk query per content type, whatever the page size.
+    """
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return Response({'error': 'Query parameter q is required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        limit = min(int(request.GET.get('limit', 20)), SEARCH_MAX_LIMIT)
+        offset = int(request.GET.get('offset', 0))
+        if limit < 1 or offset < 0:
+            raise ValueError
+    except ValueError:
+        return Response({'error': 'Invalid limit or offset'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Fetch one extra hit to know whether another page exists. The index is
+    # raw SQL, so ask the router which database reads go to (the replica
+    # when ReplicaRoutingMiddleware routes this view there)
+    hits = search.search(query, limit=limit + 1, offset=offset, using=router.db_for_read(Post))
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+    
+    post_ids = [object_id for kind, object_id, _ in hits if kind == search.POST]
+    comment_ids = [object_id for kind, object_id, _ in hits if kind == search.COMMENT]
+    objects = {
+        search.POST: Post.objects.select_related('author').in_bulk(post_ids),
+        search.COMMENT: Comment.objects.select_related('author').in_bulk(comment_ids),
+    }
+    like_counts = {
+        search.POST: Like.count_map(Post, post_ids),
+        search.COMMENT: Like.count_map(Comment, comment_ids),
+    }
+    
+    results = []
+    for kind, object_id, rank in hits:
+        obj = objects[kind].get(object_id)
+        if obj is None:
+            # Deleted between the index lookup and the bulk fetch
+            continue
+        results.append({
+            'type': kind,
+            'id': obj.id,
+            'post_id': obj.id if kind == search.POST else obj.post_id,
+            'content': obj.content,
+            'created_at': obj.created_at,
+            'author': obj.author,
+            'like_count': like_counts[kind].get(object_id, 0),
+            'rank': rank,
+        })
+    
+    authors = AuthorCache([result['author'] for result in results])
+    
+    return Response({
+        'query': query,
+        'results': SearchResultSerializer(results, many=True, context={'authors': authors}).data,
+        'next_offset': offset + limit if has_more else None,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def posts_batch(request):
+    """
+    Get several posts at once (?post_ids=1&post_ids=2...) with a summary of
+    each comment thread: the post's comment_count (tombstones excluded) and
+    the first ?roots= (default 3) top-level comments with their reply counts,
+    counted the same way. Authenticated
+    viewers also get liked_by_viewer on every post and comment.
+    Runs the same five queries whatever the batch size, so the client can
+    fill a whole feed page with one request instead of one per post.
+    """
+    try:
+        post_ids = list(dict.fromkeys(int(pid) for pid in request.GET.getlist('post_ids')))
+        roots = int(request.GET.get('roots', BATCH_DEFAULT_ROOTS))
+    except ValueError:
+        return Response({'error': 'Invalid post IDs or roots'}, status=status.HTTP_400_BAD_REQUEST)
+    if not post_ids:
+        return Response({'error': 'No post IDs provided'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(post_ids) > BATCH_MAX_POSTS:
+        return Response(
+            {'error': f'At most {BATCH_MAX_POSTS} post IDs per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not 0 <= roots <= BATCH_MAX_ROOTS:
+        return Response(
+            {'error': f'roots must be between 0 and {BATCH_MAX_ROOTS}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    posts = Post.objects.select_related('author').in_bulk(post_ids)
+    
+    # The first N root comments of every post in one query: number each
+    # post's roots in thread order and keep the first N rows
+    root_comments = list(
+        Comment.objects.filter(post_id__in=list(posts), parent__isnull=True)
+        .select_related('author')
+        .with_reply_counts()
+        .annotate(position=Window(
+            RowNumber(), partition_by=F('post_id'), order_by=[F('tree_id').asc()]
+        ))
+        .filter(position__lte=roots)
+        .order_by('post_id', 'position')
+    ) if roots and posts else []
+    comment_ids = [comment.id for comment in root_comments]
+    like_count_map = Like.count_map(Comment, comment_ids) if comment_ids else {}
+    
+    liked = None
+    if request.user.is_authenticated:
+        liked = Like.liked_by(request.user, {Post: list(posts), Comment: comment_ids})
+    
+    normalized = is_normalized(request)
+    authors = AuthorCache(
+        [post.author for post in posts.values()] + [c.author for c in root_comments],
+        normalized=normalized
+    )
+    context = {'authors': authors}
+    
+    comments_by_post = {}
+    for comment, comment_data in zip(root_comments, CommentSerializer(root_comments, many=True, context=context).data):
+        comment_data['like_count'] = like_count_map.get(comment.id, 0)
+        if liked is not None:
+            comment_data['liked_by_viewer'] = comment.id in liked[Comment]
+        comments_by_post.setdefault(comment.post_id, []).append(comment_data)
+    
+    results = []
+    for post_id in post_ids:
+        post = posts.get(post_id)
+        if post is None:
+            continue
+        post_data = PostSerializer(post, context=context).data
+        if liked is not None:
+            post_data['liked_by_viewer'] = post_id in liked[Post]
+        results.append({
+            'post': post_data,
+            'comment_count': post.comment_count,
+            'comments': comments_by_post.get(post_id, []),
+        })
+    
+    response = {
+        'results': results,
+        'missing': [post_id for post_id in post_ids if post_id not in posts],
+    }
+    if normalized:
+        response['authors'] = authors.as_dict()
+    return Response(response)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def home_feed(request):
+    """
+    Get a page of posts by the authors the user follows, newest first.
+    Query params: ?limit= (default 20) and the ?cursor= returned as
+    next_cursor. Posts come from the user's timeline inbox, filled when
+    they are created, merged with the latest posts of followed authors too
+    popular to fan out (see TimelineEntryQuerySet.fan_out), so a page is
+    one inbox range scan plus one indexed read of those authors' posts.
+    """
+    try:
+        limit, after = timeline_params(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Each source returns one extra row, so whether another page follows
+    # is known after merging
+    entries = seek(
+        TimelineEntry.objects.filter(user=request.user).select_related('post__author'),
+        after, id_field='post_id'
+    )[:limit + 1]
+    posts = {entry.post_id: entry.post for entry in entries}
+    pulled = Follow.objects.pulled_authors(request.user)
+    if pulled:
+        for post in seek(Post.objects.filter(author_id__in=pulled).select_related('author'), after)[:limit + 1]:
+            posts.setdefault(post.id, post)
+    
+    ordered = sorted(posts.values(), key=lambda post: (post.created_at, post.id), reverse=True)
+    next_cursor = encode_timeline_cursor(ordered[limit - 1]) if len(ordered) > limit else None
+    page = ordered[:limit]
+    
+    normalized = is_normalized(request)
+    authors = AuthorCache([post.author for post in page], normalized=normalized)
+    results = PostSerializer(page, many=True, context={'authors': authors}).data
+    liked = Like.liked_by(request.user, {Post: [post.id for post in page]})
+    for post_data in results:
+        post_data['liked_by_viewer'] = post_data['id'] in liked[Post]
+    
+    response = {'results': results, 'next_cursor': next_cursor}
+    if normalized:
+        response['authors'] = authors.as_dict()
+    return Response(response)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def trending_tags(request):
+    """
+    Get the most used tags in the last ?window= (1h, 24h default, or 7d),
+    counting posts and comments, with ?limit= (default 10) and ?kind=hashtag
+    (default) or mention. Sums the hourly TagRollup buckets in the window,
+    so the cost doesn't grow with the amount of content.
+    """
+    window = request.GET.get('window', '24h')
+    kind = request.GET.get('kind', Tag.HASHTAG)
+    try:
+        if window not in TRENDING_WINDOWS:
+            raise ValueError(f'window must be one of: {", ".join(TRENDING_WINDOWS)}')
+        if kind not in (Tag.HASHTAG, Tag.MENTION):
+            raise ValueError(f'kind must be {Tag.HASHTAG} or {Tag.MENTION}')
+        limit = int(request.GET.get('limit', 10))
+        if not 1 <= limit <= TRENDING_MAX_LIMIT:
+            raise ValueError(f'limit must be between 1 and {TRENDING_MAX_LIMIT}')
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    since = tags.bucket(timezone.now() - TRENDING_WINDOWS[window])
+    trending = TagRollup.objects.trending(since, kind=kind, limit=limit)
+    return Response({
+        'tags': [{'name': name, 'count': count} for name, count in trending],
+        'period': window,
+    })
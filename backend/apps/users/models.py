@@ -1,65 +1,117 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q, UniqueConstraint
 from django.utils import timezone
+from django.utils.functional import cached_property
 from datetime import timedelta
 
 
 class User(AbstractUser):
     """Extended User model with dynamic karma calculation."""
     
+    # Kept in step by Follow.objects.toggle(); decides whether the user's
+    # posts are fanned out to followers' inboxes or pulled at read time
+    follower_count = models.PositiveIntegerField(default=0)
+    
     class Meta:
         db_table = 'users'
+        # Blank emails are allowed, so only non-empty addresses must be unique
+        constraints = [
+            UniqueConstraint(
+                fields=['email'],
+                condition=~Q(email=''),
+                name='unique_user_email',
+            )
+        ]
     
     def __str__(self):
         return self.username
     
-    @property
+    @cached_property
     def total_karma(self):
-        """Calculate total karma from all transactions."""
-        from apps.posts.models import Like, Post, Comment
-        from django.contrib.contenttypes.models import ContentType
-        
-        # Get content types for posts and comments
-        post_content_type = ContentType.objects.get_for_model(Post)
-        comment_content_type = ContentType.objects.get_for_model(Comment)
-        
-        # Calculate karma from likes received
-        post_likes_karma = Like.objects.filter(
-            content_type=post_content_type,
-            object_id__in=self.posts.values_list('id', flat=True)
-        ).count() * 5  # 5 karma per post like
-        
-        comment_likes_karma = Like.objects.filter(
-            content_type=comment_content_type,
-            object_id__in=self.comments.values_list('id', flat=True)
-        ).count() * 1  # 1 karma per comment like
+        """
+        Calculate total karma by summing the karma ledger.
+        Bulk loaders such as AuthorCache assign it directly to skip the query.
+        """
+        from django.db.models import Sum
         
-        return post_likes_karma + comment_likes_karma
+        return self.karma_transactions.aggregate(
+            total=Sum('karma_change')
+        )['total'] or 0
     
     @property
     def daily_karma(self):
         """Calculate karma earned in the last 24 hours."""
-        from apps.posts.models import Like, Post, Comment
-        from django.contrib.contenttypes.models import ContentType
-        
-        # Get content types for posts and comments
-        post_content_type = ContentType.objects.get_for_model(Post)
-        comment_content_type = ContentType.objects.get_for_model(Comment)
+        from django.db.models import Sum
         
         # Calculate time threshold (24 hours ago)
         twenty_four_hours_ago = timezone.now() - timedelta(hours=24)
         
-        # Calculate karma from likes received in last 24 hours
-        post_likes_karma = Like.objects.filter(
-            content_type=post_content_type,
-            object_id__in=self.posts.values_list('id', flat=True),
-            created_at__gte=twenty_four_hours_ago
-        ).count() * 5  # 5 karma per post like
-        
-        comment_likes_karma = Like.objects.filter(
-            content_type=comment_content_type,
-            object_id__in=self.comments.values_list('id', flat=True),
+        return self.karma_transactions.filter(
             created_at__gte=twenty_four_hours_ago
-        ).count() * 1  # 1 karma per comment like
+        ).aggregate(total=Sum('karma_change'))['total'] or 0
+
+
+class FollowManager(models.Manager):
+    """Manager for following and unfollowing authors."""
+    
+    def toggle(self, follower, followee):
+        """
+        Follow ``followee``, or unfollow if already following, and return
+        whether ``follower`` now follows them. Keeps follower_count in step
+        and the follower's home timeline inbox in sync: unfollowing drops
+        the author's entries, following backfills their recent posts.
+        """
+        from apps.jobs import queue
+        from apps.posts.models import TimelineEntry
         
-        return post_likes_karma + comment_likes_karma
+        with transaction.atomic():
+            deleted, _ = self.filter(follower=follower, followee=followee).delete()
+            if deleted:
+                User.objects.filter(pk=followee.pk).update(follower_count=F('follower_count') - 1)
+                TimelineEntry.objects.filter(user=follower, author=followee).delete()
+                return False
+            
+            try:
+                with transaction.atomic():
+                    self.create(follower=follower, followee=followee)
+            except IntegrityError:
+                return True  # a concurrent request followed first
+            User.objects.filter(pk=followee.pk).update(follower_count=F('follower_count') + 1)
+            queue.enqueue(
+                'posts.backfill_timeline', {'user_id': follower.pk, 'author_id': followee.pk},
+                dedup_key=f'timeline-backfill:{follower.pk}:{followee.pk}'
+            )
+            return True
+    
+    def pulled_authors(self, follower):
+        """
+        Ids of authors ``follower`` follows whose posts are not fanned out
+        (more than FEED_FANOUT_MAX_FOLLOWERS followers) and so must be read
+        from their own timelines.
+        """
+        return list(
+            self.filter(
+                follower=follower,
+                followee__follower_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+            ).values_list('followee_id', flat=True)
+        )
+
+
+class Follow(models.Model):
+    """``follower`` sees ``followee``'s posts in their home feed."""
+    follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='following')
+    followee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='followers')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    objects = FollowManager()
+    
+    class Meta:
+        db_table = 'follows'
+        constraints = [
+            UniqueConstraint(fields=['follower', 'followee'], name='unique_follow'),
+        ]
+    
+    def __str__(self):
+        return f'{self.follower_id} follows {self.followee_id}'
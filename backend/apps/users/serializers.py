@@ -1,6 +1,21 @@
+import re
+
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
+from rest_framework.authtoken.models import Token
+
 from .models import User
 
+# The database-enforced unique fields of a signup, with the name PostgreSQL
+# reports for each constraint and the column SQLite reports instead (its
+# errors read "UNIQUE constraint failed: users.email")
+UNIQUE_SIGNUP_FIELDS = {
+    'username': ('users_username_key', 'users.username'),
+    'email': ('unique_user_email', 'users.email'),
+}
+_SQLITE_UNIQUE_RE = re.compile(r'UNIQUE constraint failed: (.+)')
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for User model."""
@@ -11,6 +26,55 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'total_karma', 'date_joined']
 
 
+class AuthorCache:
+    """
+    Request-scoped cache of serialized authors.
+    Loads total_karma for every distinct author with one grouped query and
+    serializes each author once, however many posts or comments they wrote.
+    With ``normalized=True``, AuthorField renders only the author id and
+    the payloads are returned once via ``as_dict()``.
+    """
+    
+    def __init__(self, users, normalized=False):
+        from apps.gamification.models import KarmaTransaction
+        
+        self.normalized = normalized
+        self._users = {user.id: user for user in users}
+        totals = KarmaTransaction.objects.totals(list(self._users))
+        for user_id, user in self._users.items():
+            user.total_karma = totals.get(user_id, 0)
+        self._data = {}
+    
+    def get(self, user):
+        """Serialized payload for ``user``, computed on first use."""
+        if user.id not in self._data:
+            self._data[user.id] = UserSerializer(self._users.get(user.id, user)).data
+        return self._data[user.id]
+    
+    def as_dict(self):
+        """{author_id: payload} for every author in the cache."""
+        return {str(user_id): self.get(user) for user_id, user in self._users.items()}
+
+
+class AuthorField(serializers.Field):
+    """
+    Read-only nested author, served from the AuthorCache in the serializer
+    context under 'authors' when the view provides one.
+    """
+    
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+    
+    def to_representation(self, user):
+        authors = self.context.get('authors')
+        if authors is None:
+            return UserSerializer(user).data
+        if authors.normalized:
+            return user.id
+        return authors.get(user)
+
+
 class UserProfileSerializer(serializers.ModelSerializer):
     """Detailed user profile serializer."""
     
@@ -21,25 +85,66 @@ class UserProfileSerializer(serializers.ModelSerializer):
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
-    """Serializer for user registration."""
+    """
+    Serializer for user registration.
+    Uniqueness of username and email is enforced by the database constraints
+    rather than pre-insert exists() queries, so a signup costs exactly two
+    INSERTs (user and token) and stays correct under concurrent requests.
+    """
     password = serializers.CharField(write_only=True, min_length=8)
     password_confirm = serializers.CharField(write_only=True)
     
     class Meta:
         model = User
         fields = ['username', 'email', 'password', 'password_confirm']
+        extra_kwargs = {
+            # Drop the implicit UniqueValidator; the unique index is the check
+            'username': {'validators': [UnicodeUsernameValidator()]},
+        }
     
     def validate(self, attrs):
         if attrs['password'] != attrs['password_confirm']:
             raise serializers.ValidationError("Passwords don't match")
         return attrs
     
-    def validate_email(self, value):
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("Email already exists")
-        return value
+    def create(self, validated_data):
+        """Create the user and their auth token in a single transaction."""
+        validated_data.pop('password_confirm', None)
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(**validated_data)
+                Token.objects.create(user=user)
+        except IntegrityError as e:
+            raise serializers.ValidationError(self._constraint_errors(e, validated_data))
+        # A new user has no ledger entries; spare the response the SUM query
+        user.total_karma = 0
+        return user
+    
+    @staticmethod
+    def _violated_field(error):
+        """The signup field whose unique constraint ``error`` reports, if any."""
+        diag = getattr(error.__cause__, 'diag', None)
+        constraint = getattr(diag, 'constraint_name', None)
+        match = _SQLITE_UNIQUE_RE.search(str(error))
+        columns = set(match.group(1).split(', ')) if match else set()
+        for field, (name, column) in UNIQUE_SIGNUP_FIELDS.items():
+            if constraint == name or column in columns:
+                return field
+        return None
     
-    def validate_username(self, value):
-        if User.objects.filter(username=value).exists():
-            raise serializers.ValidationError("Username already exists")
-        return value
+    @classmethod
+    def _constraint_errors(cls, error, validated_data):
+        """
+        Map a unique constraint violation to field errors. The database
+        reports only the first violation, so the other unique fields are
+        looked up too (on this failure path only) to report every clash.
+        """
+        violated = cls._violated_field(error)
+        if violated is None:
+            raise error
+        errors = {}
+        for field in UNIQUE_SIGNUP_FIELDS:
+            value = validated_data.get(field)
+            if field == violated or (value and User.objects.filter(**{field: value}).exists()):
+                errors[field] = [f'{field.capitalize()} already exists']
+        return errors
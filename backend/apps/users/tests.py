@@ -1,3 +1,115 @@
-from django.test import TestCase
+import base64
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.posts.models import Comment, Post
+from community_feed.pagination import encode_timeline_cursor
+from .models import User
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RegistrationTests(TestCase):
+    """Uniqueness is left to the database and reported per field."""
+    
+    def setUp(self):
+        self.client = APIClient()
+        User.objects.create(username='taken', email='taken@example.com')
+    
+    def register(self, username, email=''):
+        return self.client.post('/api/users/register/', {
+            'username': username, 'email': email,
+            'password': 'long enough', 'password_confirm': 'long enough',
+        })
+    
+    def test_signup_creates_user_and_token_in_two_inserts(self):
+        with self.assertNumQueries(4):  # savepoint, user, token, release
+            response = self.register('fresh', 'fresh@example.com')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['user']['total_karma'], 0)
+        self.assertTrue(response.data['token'])
+    
+    def test_duplicate_username(self):
+        response = self.register('taken', 'other@example.com')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'username': ['Username already exists']})
+    
+    def test_duplicate_email(self):
+        response = self.register('other', 'taken@example.com')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'email': ['Email already exists']})
+    
+    def test_duplicate_username_and_email_are_both_reported(self):
+        response = self.register('taken', 'taken@example.com')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'username', 'email'})
+    
+    def test_blank_emails_may_repeat(self):
+        self.assertEqual(self.register('first').status_code, 201)
+        self.assertEqual(self.register('second').status_code, 201)
+        self.assertEqual(User.objects.filter(email='').count(), 2)
+
+
+class TimelineCursorTests(TestCase):
+    """A user's posts and comments page by (created_at, id) keyset cursors."""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = User.objects.create(username='author')
+        other = User.objects.create(username='other')
+        post = Post.objects.create(author=other, content='thread')
+        self.posts = [Post.objects.create(author=self.author, content=f'post {n}') for n in range(5)]
+        self.comments = [
+            Comment.objects.create(author=self.author, post=post, content=f'comment {n}') for n in range(5)
+        ]
+        # Several rows share one timestamp, so only the id orders them
+        tied = timezone.now() - timezone.timedelta(hours=1)
+        Post.objects.filter(pk__in=[p.pk for p in self.posts[1:4]]).update(created_at=tied)
+        Comment.objects.filter(pk__in=[c.pk for c in self.comments[1:4]]).update(created_at=tied)
+    
+    def walk(self, path, limit=2):
+        ids, cursor = [], None
+        while True:
+            params = {'limit': limit, **({'cursor': cursor} if cursor else {})}
+            response = self.client.get(path, params)
+            self.assertEqual(response.status_code, 200)
+            ids += [item['id'] for item in response.data['results']]
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                return ids
+    
+    def expected(self, rows):
+        rows = [type(rows[0]).objects.get(pk=row.pk) for row in rows]
+        return [row.id for row in sorted(rows, key=lambda row: (row.created_at, row.id), reverse=True)]
+    
+    def test_posts_round_trip_across_equal_timestamps(self):
+        for limit in (1, 2, 3):
+            ids = self.walk(f'/api/users/{self.author.id}/posts/', limit)
+            self.assertEqual(ids, self.expected(self.posts))
+    
+    def test_comments_round_trip_across_equal_timestamps(self):
+        for limit in (1, 2, 3):
+            ids = self.walk(f'/api/users/{self.author.id}/comments/', limit)
+            self.assertEqual(ids, self.expected(self.comments))
+    
+    def test_cursor_at_a_tie_resumes_after_it(self):
+        ordered = self.expected(self.posts)
+        cursor = encode_timeline_cursor(Post.objects.get(pk=ordered[2]))
+        response = self.client.get(f'/api/users/{self.author.id}/posts/', {'cursor': cursor})
+        self.assertEqual([item['id'] for item in response.data['results']], ordered[3:])
+    
+    def test_tampered_cursor_is_rejected(self):
+        for cursor in (
+            'not a cursor',
+            base64.urlsafe_b64encode(b'12').decode(),
+            base64.urlsafe_b64encode(b'abc:2026-01-01T00:00:00').decode(),
+            base64.urlsafe_b64encode(b'12:yesterday').decode(),
+            base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+        ):
+            for path in ('posts', 'comments'):
+                response = self.client.get(f'/api/users/{self.author.id}/{path}/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 400, cursor)
+                self.assertEqual(response.data, {'error': 'Invalid cursor'})
@@ -9,4 +9,9 @@ urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('profile/', views.profile_view, name='profile'),
+    
+    # Per-user timelines
+    path('<int:user_id>/posts/', views.user_posts, name='user-posts'),
+    path('<int:user_id>/comments/', views.user_comments, name='user-comments'),
+    path('<int:user_id>/follow/', views.toggle_follow, name='toggle-follow'),
 ]
@@ -3,10 +3,10 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
-from django.contrib.auth.hashers import make_password
 
-from .models import User
-from .serializers import UserSerializer, UserRegistrationSerializer
+from community_feed.pagination import timeline_page
+from .models import Follow, User
+from .serializers import AuthorCache, UserSerializer, UserRegistrationSerializer
 
 
 class RegisterView(generics.CreateAPIView):
@@ -19,22 +19,12 @@ class RegisterView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        # Hash the password before saving
-        validated_data = serializer.validated_data
-        password = validated_data.pop('password')
-        password_confirm = validated_data.pop('password_confirm', None)
-        
-        # Create user without password first
-        user = User.objects.create(**validated_data)
-        user.set_password(password)
-        user.save()
-        
-        # Create token for the user
-        token, created = Token.objects.get_or_create(user=user)
+        # User and token are created together inside the serializer
+        user = serializer.save()
         
         return Response({
             'user': UserSerializer(user).data,
-            'token': token.key
+            'token': user.auth_token.key
         }, status=status.HTTP_201_CREATED)
 
 
@@ -87,3 +77,100 @@ def profile_view(request):
     return Response({
         'user': UserSerializer(request.user).data
     })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def user_posts(request, user_id):
+    """
+    Get a page of one user's posts, newest first.
+    Query params: ?limit= (default 20) and the ?cursor= returned as
+    next_cursor. Only the user's own rows are read: the author is loaded
+    once and attached to every post, and like counts come from the posts'
+    score column. Authenticated viewers also get liked_by_viewer.
+    """
+    from apps.posts.models import Like, Post
+    from apps.posts.serializers import PostSerializer
+    
+    try:
+        author = User.objects.get(pk=user_id)
+    except User.DoesNotExist:
+        return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        posts, next_cursor = timeline_page(request, Post.objects.filter(author=author))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    for post in posts:
+        post.author = author
+    context = {'authors': AuthorCache([author])}
+    results = PostSerializer(posts, many=True, context=context).data
+    
+    if request.user.is_authenticated:
+        liked = Like.liked_by(request.user, {Post: [post.id for post in posts]})
+        for post_data in results:
+            post_data['liked_by_viewer'] = post_data['id'] in liked[Post]
+    
+    return Response({'results': results, 'next_cursor': next_cursor})
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def user_comments(request, user_id):
+    """
+    Get a page of one user's comments (tombstones excluded), newest first,
+    each with its post_id. Paginated like user_posts; like counts are
+    loaded for the whole page with one grouped query.
+    """
+    from apps.posts.models import Comment, Like
+    from apps.posts.serializers import CommentSerializer
+    
+    try:
+        author = User.objects.get(pk=user_id)
+    except User.DoesNotExist:
+        return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        comments, next_cursor = timeline_page(
+            request, Comment.objects.filter(author=author, is_deleted=False).with_reply_counts()
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    comment_ids = [comment.id for comment in comments]
+    like_count_map = Like.count_map(Comment, comment_ids) if comment_ids else {}
+    liked = None
+    if request.user.is_authenticated:
+        liked = Like.liked_by(request.user, {Comment: comment_ids})
+    
+    for comment in comments:
+        comment.author = author
+    context = {'authors': AuthorCache([author])}
+    results = CommentSerializer(comments, many=True, context=context).data
+    for comment, comment_data in zip(comments, results):
+        comment_data['post_id'] = comment.post_id
+        comment_data['like_count'] = like_count_map.get(comment.id, 0)
+        if liked is not None:
+            comment_data['liked_by_viewer'] = comment.id in liked[Comment]
+    
+    return Response({'results': results, 'next_cursor': next_cursor})
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def toggle_follow(request, user_id):
+    """Follow a user, or unfollow them if already following."""
+    try:
+        followee = User.objects.get(pk=user_id)
+    except User.DoesNotExist:
+        return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+    if followee.pk == request.user.pk:
+        return Response({'error': 'You cannot follow yourself'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    following = Follow.objects.toggle(request.user, followee)
+    followee.refresh_from_db(fields=['follower_count'])
+    return Response({
+        'following': following,
+        'follower_count': followee.follower_count,
+    })
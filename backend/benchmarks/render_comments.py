@@ -0,0 +1,110 @@
+"""
+Encoding benchmark for the post_comments payload.
+
+Builds a synthetic threaded-comments response shaped like
+GET /api/posts/{id}/comments/threaded/ and times DRF's stdlib JSONRenderer
+against ORJSONRenderer and (if msgpack is installed) MessagePackRenderer.
+
+Run from the backend directory:
+
+    python benchmarks/render_comments.py --nodes 10000 --repeat 20
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+settings.configure(INSTALLED_APPS=['rest_framework'], USE_TZ=True)
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from community_feed.renderers import MessagePackRenderer, ORJSONRenderer, msgpack  # noqa: E402
+
+
+def build_payload(nodes, authors=200, seed=42):
+    """A post plus a ``nodes``-comment tree, as post_comments serializes it."""
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def author(author_id):
+        return {
+            'id': author_id,
+            'username': f'user{author_id}',
+            'email': f'user{author_id}@example.com',
+            'total_karma': rng.randint(0, 5000),
+            'date_joined': start.isoformat().replace('+00:00', 'Z'),
+        }
+
+    flat = []
+    for comment_id in range(1, nodes + 1):
+        parent = rng.choice(flat) if flat and rng.random() < 0.8 else None
+        created = (start + timedelta(seconds=comment_id)).isoformat().replace('+00:00', 'Z')
+        flat.append({
+            'id': comment_id,
+            'author': author(rng.randint(1, authors)),
+            'content': 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * rng.randint(1, 4),
+            'created_at': created,
+            'updated_at': created,
+            'parent_id': parent['id'] if parent else None,
+            'level': parent['level'] + 1 if parent else 0,
+            'like_count': rng.randint(0, 50),
+            'children': [],
+        })
+        if parent:
+            parent['children'].append(flat[-1])
+
+    return {
+        'post': {
+            'id': 1,
+            'author': author(1),
+            'content': 'Benchmark post',
+            'created_at': start.isoformat().replace('+00:00', 'Z'),
+            'updated_at': start.isoformat().replace('+00:00', 'Z'),
+            'like_count': 42,
+        },
+        'comments': [node for node in flat if node['parent_id'] is None],
+        # Views also return raw datetimes, e.g. generated_at
+        'generated_at': datetime.now(timezone.utc),
+    }
+
+
+def bench(renderer, payload, repeat):
+    renderer.render(payload)  # warm up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = renderer.render(payload)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--nodes', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    payload = build_payload(args.nodes)
+    renderers = [('json (stdlib)', JSONRenderer()), ('orjson', ORJSONRenderer())]
+    if msgpack is not None:
+        renderers.append(('msgpack', MessagePackRenderer()))
+
+    print(f'{args.nodes} comments, median of {args.repeat} runs')
+    baseline = None
+    for name, renderer in renderers:
+        median_ms, size = bench(renderer, payload, args.repeat)
+        baseline = baseline or median_ms
+        print(f'{name:>14}: {median_ms:8.2f} ms  {size / 1024:8.0f} KiB  {baseline / median_ms:5.1f}x')
+
+
+if __name__ == '__main__':
+    main()
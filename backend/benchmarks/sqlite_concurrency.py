@@ -0,0 +1,172 @@
+"""
+Concurrent read/write benchmark for the SQLite connection tuning.
+
+Simulates the like-toggle hot path (read-then-write inside a transaction)
+from several writer threads while reader threads run feed-style like-count
+aggregates, first with SQLite's stock settings and then with the PRAGMAs
+and transaction mode configured in settings.DATABASES.
+
+Run from the backend directory:
+
+    python benchmarks/sqlite_concurrency.py --writers 8 --readers 8 --seconds 5
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from community_feed.sqlite3.base import apply_pragmas  # noqa: E402
+
+POSTS = 200
+USERS = 500
+
+PROFILES = {
+    # What Django's stock sqlite3 backend gives you
+    'default': {
+        'pragmas': {},
+        'transaction_mode': 'DEFERRED',
+    },
+    # Mirrors the defaults in community_feed/settings.py
+    'tuned': {
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64000,
+            'temp_store': 'MEMORY',
+        },
+        'transaction_mode': 'IMMEDIATE',
+    },
+}
+
+
+def connect(path, profile):
+    # Same connection flags Django uses: autocommit with explicit BEGIN
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    apply_pragmas(conn, profile['pragmas'])
+    return conn
+
+
+def setup(path):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.executescript(
+        '''
+        CREATE TABLE posts (id INTEGER PRIMARY KEY, content TEXT);
+        CREATE TABLE likes (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            post_id INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            UNIQUE (user_id, post_id)
+        );
+        CREATE INDEX likes_post ON likes (post_id);
+        '''
+    )
+    conn.executemany(
+        'INSERT INTO posts (id, content) VALUES (?, ?)',
+        [(i, 'x' * 200) for i in range(1, POSTS + 1)],
+    )
+    conn.close()
+
+
+def writer(path, profile, deadline, stats):
+    conn = connect(path, profile)
+    begin = f"BEGIN {profile['transaction_mode']}"
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        user_id, post_id = rng.randint(1, USERS), rng.randint(1, POSTS)
+        started = time.perf_counter()
+        try:
+            conn.execute(begin)
+            row = conn.execute(
+                'SELECT id FROM likes WHERE user_id = ? AND post_id = ?',
+                (user_id, post_id),
+            ).fetchone()
+            if row:
+                conn.execute('DELETE FROM likes WHERE id = ?', (row[0],))
+            else:
+                conn.execute(
+                    "INSERT INTO likes (user_id, post_id, created_at) VALUES (?, ?, datetime('now'))",
+                    (user_id, post_id),
+                )
+            conn.execute('COMMIT')
+            stats['writes'].append(time.perf_counter() - started)
+        except sqlite3.OperationalError:
+            stats['write_errors'] += 1
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+    conn.close()
+
+
+def reader(path, profile, deadline, stats):
+    conn = connect(path, profile)
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        page = rng.sample(range(1, POSTS + 1), 20)
+        started = time.perf_counter()
+        try:
+            conn.execute(
+                'SELECT post_id, COUNT(*) FROM likes WHERE post_id IN (%s) GROUP BY post_id'
+                % ','.join('?' * len(page)),
+                page,
+            ).fetchall()
+            stats['reads'].append(time.perf_counter() - started)
+        except sqlite3.OperationalError:
+            stats['read_errors'] += 1
+    conn.close()
+
+
+def p95(samples):
+    if not samples:
+        return float('nan')
+    samples = sorted(samples)
+    return samples[int(len(samples) * 0.95)] * 1000
+
+
+def run(name, profile, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.sqlite3')
+        setup(path)
+        stats = {'writes': [], 'reads': [], 'write_errors': 0, 'read_errors': 0}
+        deadline = time.perf_counter() + args.seconds
+        threads = [
+            threading.Thread(target=writer, args=(path, profile, deadline, stats))
+            for _ in range(args.writers)
+        ] + [
+            threading.Thread(target=reader, args=(path, profile, deadline, stats))
+            for _ in range(args.readers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    print(
+        f"{name:>8}: "
+        f"{len(stats['writes']) / args.seconds:8.0f} writes/s "
+        f"(p95 {p95(stats['writes']):6.2f} ms, {stats['write_errors']} locked)  "
+        f"{len(stats['reads']) / args.seconds:8.0f} reads/s "
+        f"(p95 {p95(stats['reads']):6.2f} ms, {stats['read_errors']} locked)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+    
+    print(f'sqlite {sqlite3.sqlite_version}, {args.writers} writers, {args.readers} readers, {args.seconds}s')
+    for name, profile in PROFILES.items():
+        run(name, profile, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Time-to-first-byte benchmark for freshly started gunicorn workers.
+
+Starts gunicorn (configured by gunicorn.conf.py) with a single worker against
+a scratch SQLite database, waits for the worker to report ready, then times
+the first request to each path and a second, steady-state round. Repeated for
+a fresh server per run and per profile:
+
+- cold: no preload, no warmup (what start.sh used to run)
+- preload: application imported in the master before forking
+- warm: preload plus community_feed.warmup in the master
+
+Run from the backend directory:
+
+    python benchmarks/worker_ttfb.py --runs 5
+"""
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+PROFILES = {
+    'cold': {'GUNICORN_PRELOAD': 'False', 'GUNICORN_WARMUP': 'False'},
+    'preload': {'GUNICORN_PRELOAD': 'True', 'GUNICORN_WARMUP': 'False'},
+    'warm': {'GUNICORN_PRELOAD': 'True', 'GUNICORN_WARMUP': 'True'},
+}
+
+DEFAULT_PATHS = [
+    '/api/posts/',
+    '/api/posts/tags/trending/',
+    '/api/gamification/leaderboard/',
+]
+
+
+def prepare_database(env, posts=50):
+    """Migrate a scratch database and seed a few posts so views do real work."""
+    subprocess.run(
+        [sys.executable, 'manage.py', 'migrate', '--verbosity', '0'],
+        cwd=BACKEND_DIR, env=env, check=True,
+    )
+    os.environ.update(env)
+    import django
+    django.setup()
+    from apps.users.models import User
+    from apps.posts.models import Post
+
+    author = User.objects.create_user('bench', password='bench-password')
+    for i in range(posts):
+        Post.objects.create(author=author, content=f'Benchmark post {i} #bench')
+
+
+def start_server(env, timeout=30):
+    """Start gunicorn and return the process once its worker is ready."""
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    ready = threading.Event()
+
+    def watch():
+        for line in process.stderr:
+            if 'Worker ready' in line:
+                ready.set()
+
+    threading.Thread(target=watch, daemon=True).start()
+    if not ready.wait(timeout):
+        process.kill()
+        raise RuntimeError('gunicorn worker did not become ready')
+    return process
+
+
+def ttfb(port, path):
+    """Seconds from sending ``path``'s request to receiving the status line."""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        connection.connect()
+        start = time.perf_counter()
+        connection.request('GET', path, headers={'Host': 'localhost'})
+        response = connection.getresponse()
+        elapsed = time.perf_counter() - start
+        response.read()
+        if response.status >= 500:
+            raise RuntimeError(f'{path} returned {response.status}')
+        return elapsed
+    finally:
+        connection.close()
+
+
+def run_profile(env, paths, runs, port):
+    first = {path: [] for path in paths}
+    steady = {path: [] for path in paths}
+    for _ in range(runs):
+        process = start_server(env)
+        try:
+            for path in paths:
+                first[path].append(ttfb(port, path))
+            for path in paths:
+                steady[path].append(ttfb(port, path))
+        finally:
+            process.terminate()
+            process.wait()
+    return first, steady
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5, help='Fresh servers started per profile.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--worker-class', default='gthread', help='GUNICORN_WORKER_CLASS to test.')
+    parser.add_argument('--path', action='append', dest='paths', help='Path to request (repeatable).')
+    args = parser.parse_args()
+    paths = args.paths or DEFAULT_PATHS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': 'community_feed.settings',
+            'SECRET_KEY': os.environ.get('SECRET_KEY', 'benchmark-only-secret-key'),
+            'SQLITE_PATH': os.path.join(tmp, 'bench.sqlite3'),
+            'JOBS_MODE': 'sync',
+            'PORT': str(args.port),
+            'GUNICORN_WORKERS': '1',
+            'GUNICORN_WORKER_CLASS': args.worker_class,
+        }
+        prepare_database(env)
+
+        width = max(len(path) for path in paths)
+        for name, overrides in PROFILES.items():
+            first, steady = run_profile({**env, **overrides}, paths, args.runs, args.port)
+            print(f'{name} (median of {args.runs} fresh workers, ms)')
+            print(f'  {"path":<{width}}  {"first":>8}  {"steady":>8}')
+            for path in paths:
+                print(
+                    f'  {path:<{width}}  {statistics.median(first[path]) * 1000:8.1f}'
+                    f'  {statistics.median(steady[path]) * 1000:8.1f}'
+                )
+            total = statistics.median(sum(times) for times in zip(*first.values()))
+            print(f'  {"total first requests":<{width}}  {total * 1000:8.1f}\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import glob
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+SORT_KEYS = {
+    'total': lambda group: group['total_ms'],
+    'count': lambda group: group['count'],
+    'max': lambda group: group['max_ms'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Summarize the slow query log (SLOW_QUERY_LOG_FILE and its rotated '
+        'backups) by query fingerprint: how often each query was slow, its '
+        'total and worst time, the views that ran it and its latest plan.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file', default=None,
+            help='Log file to read (default: SLOW_QUERY_LOG_FILE).',
+        )
+        parser.add_argument(
+            '--top', type=int, default=10,
+            help='Number of fingerprints to show.',
+        )
+        parser.add_argument(
+            '--sort', choices=sorted(SORT_KEYS), default='total',
+            help='Order fingerprints by total time, count or worst time.',
+        )
+        parser.add_argument(
+            '--view', default=None,
+            help='Only include queries run by this view name.',
+        )
+    
+    def handle(self, *args, file, top, sort, view, **options):
+        path = file or settings.SLOW_QUERY_LOG_FILE
+        groups = {}
+        for name in sorted(glob.glob(glob.escape(path) + '*')):
+            with open(name) as log:
+                for line in log:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # partially written line
+                    if view and entry['view'] != view:
+                        continue
+                    group = groups.setdefault(entry['fingerprint'], {
+                        'sql': entry['sql'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                        'views': set(), 'explain': None, 'last_seen': '',
+                    })
+                    group['count'] += 1
+                    group['total_ms'] += entry['duration_ms']
+                    group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+                    group['views'].add(entry['view'] or '-')
+                    if entry['timestamp'] >= group['last_seen']:
+                        group['last_seen'] = entry['timestamp']
+                        group['explain'] = entry['explain']
+        
+        if not groups:
+            self.stdout.write(f'No slow queries logged in {path}')
+            return
+        
+        ranked = sorted(groups.items(), key=lambda item: SORT_KEYS[sort](item[1]), reverse=True)
+        for digest, group in ranked[:top]:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{digest}  {group["count"]}x  total {group["total_ms"]:.1f} ms  '
+                f'avg {group["total_ms"] / group["count"]:.1f} ms  max {group["max_ms"]:.1f} ms'
+            ))
+            self.stdout.write(f'  views: {", ".join(sorted(group["views"]))}')
+            self.stdout.write(f'  sql: {group["sql"]}')
+            for row in group['explain'] or []:
+                self.stdout.write(f'  plan: {row}')
+            self.stdout.write('')
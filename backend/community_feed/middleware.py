@@ -0,0 +1,262 @@
+import gzip
+import hashlib
+import hmac
+import os
+import re
+import uuid
+import zlib
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+from .profiling import PROFILERS
+from .routers import REPLICA_ALIAS, reset_use_replica, set_use_replica
+from .slow_queries import SlowQueryRecorder
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_ACCEPT_ENCODING_RE = re.compile(r'([\w*-]+)\s*(?:;\s*q=([\d.]+))?')
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Serve read-heavy GET endpoints from the read replica.
+    
+    Only views named in ``settings.DATABASE_REPLICA_VIEWS`` are routed. After a
+    client makes a successful write, its reads are pinned to the primary for
+    ``settings.DATABASE_REPLICA_PIN_SECONDS`` so it always sees its own
+    changes despite replication lag. Clients are identified by a hash of their
+    Authorization header, so no database lookup is needed to decide.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.replica_views = frozenset(getattr(settings, 'DATABASE_REPLICA_VIEWS', []))
+        self.pin_seconds = getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 5)
+    
+    def __call__(self, request):
+        if REPLICA_ALIAS not in connections:
+            return self.get_response(request)
+        
+        try:
+            response = self.get_response(request)
+        finally:
+            token = getattr(request, '_replica_token', None)
+            if token is not None:
+                reset_use_replica(token)
+        
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_key = self._pin_key(request)
+            if pin_key:
+                cache.set(pin_key, True, self.pin_seconds)
+        return response
+    
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            REPLICA_ALIAS not in connections
+            or request.method not in SAFE_METHODS
+            or request.resolver_match.view_name not in self.replica_views
+            or self._is_pinned(request)
+        ):
+            return None
+        # Reset in __call__ once the response has been rendered
+        request._replica_token = set_use_replica(True)
+        return None
+    
+    def _is_pinned(self, request):
+        pin_key = self._pin_key(request)
+        return bool(pin_key) and cache.get(pin_key, False)
+    
+    @staticmethod
+    def _pin_key(request):
+        credentials = request.META.get('HTTP_AUTHORIZATION')
+        if not credentials:
+            return None
+        digest = hashlib.sha256(credentials.encode()).hexdigest()
+        return f'replica-pin:{digest}'
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli (when installed) or gzip.
+    
+    Bodies shorter than ``settings.COMPRESSION_MIN_SIZE`` bytes are sent as-is
+    since compressing them costs more CPU than it saves on the wire. Streaming
+    responses are passed through unless ``settings.COMPRESSION_STREAMING`` is
+    set, in which case each chunk is gzip-compressed as it is produced.
+    
+    A response that carries an ETag is a known version of a representation,
+    so its compressed bytes are cached under the ETag for
+    ``settings.COMPRESSION_CACHE_TIMEOUT`` seconds and compressed only once no
+    matter how many clients fetch it (e.g. the cached leaderboard pages).
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.gzip_level = getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6)
+        self.brotli_quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5)
+        self.compress_streaming = getattr(settings, 'COMPRESSION_STREAMING', False)
+        self.cache_timeout = getattr(settings, 'COMPRESSION_CACHE_TIMEOUT', 300)
+    
+    def __call__(self, request):
+        response = self.get_response(request)
+        # Whether this URL is compressed can depend on the body size, so
+        # shared caches must key every response on Accept-Encoding
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.has_header('Content-Encoding'):
+            return response
+        if response.streaming:
+            if not self.compress_streaming or response.is_async:
+                return response
+        elif len(response.content) < self.min_size:
+            return response
+        
+        encoding = self._negotiate(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''),
+            # Chunks must be flushed as they arrive, which only gzip is set up for
+            allow_brotli=not response.streaming,
+        )
+        if encoding is None:
+            return response
+        
+        if response.streaming:
+            response.streaming_content = self._gzip_stream(response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            compressed = self._compress_cached(request, response, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+        
+        # A compressed body is no longer byte-identical to the strong ETag
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+    
+    @staticmethod
+    def _negotiate(header, allow_brotli=True):
+        accepted = set()
+        for coding, q in _ACCEPT_ENCODING_RE.findall(header.lower()):
+            try:
+                if q and float(q) <= 0:
+                    continue
+            except ValueError:
+                continue
+            accepted.add(coding)
+        if allow_brotli and brotli is not None and ({'br', '*'} & accepted):
+            return 'br'
+        if {'gzip', '*'} & accepted:
+            return 'gzip'
+        return None
+    
+    def _compress(self, content, encoding):
+        if encoding == 'br':
+            return brotli.compress(content, quality=self.brotli_quality)
+        return gzip.compress(content, compresslevel=self.gzip_level, mtime=0)
+    
+    def _compress_cached(self, request, response, encoding):
+        etag = response.get('ETag')
+        if not etag or not self.cache_timeout:
+            return self._compress(response.content, encoding)
+        # ETags are only unique per resource, so scope the key by path too
+        digest = hashlib.sha256(f'{request.path}:{etag}'.encode()).hexdigest()
+        key = f'compressed:{encoding}:{digest}'
+        compressed = cache.get(key)
+        if compressed is None:
+            compressed = self._compress(response.content, encoding)
+            cache.set(key, compressed, self.cache_timeout)
+        return compressed
+    
+    def _gzip_stream(self, chunks):
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+class ProfilerMiddleware:
+    """
+    Profile a single request on demand.
+    
+    A request carrying ``X-Profile: <settings.PROFILER_TOKEN>`` runs under
+    the profiler named by ``settings.PROFILER_MODE`` ('cprofile' or 'sample',
+    see profiling.py), which can be overridden per request with
+    ``X-Profile-Mode``. The result is
+    written to ``settings.PROFILER_DIR`` and its file name returned in the
+    ``X-Profile-Id`` response header. Without a configured token the
+    middleware removes itself at startup, and requests without the header
+    cost one dictionary lookup. The token is only accepted in the header:
+    query strings end up in access logs.
+    """
+    
+    def __init__(self, get_response):
+        self.token = getattr(settings, 'PROFILER_TOKEN', '')
+        if not self.token:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.directory = settings.PROFILER_DIR
+        self.mode = settings.PROFILER_MODE
+        self.interval = settings.PROFILER_SAMPLE_INTERVAL
+    
+    def __call__(self, request):
+        supplied = request.META.get('HTTP_X_PROFILE')
+        if not supplied or not hmac.compare_digest(supplied.encode(), self.token.encode()):
+            return self.get_response(request)
+        
+        mode = request.META.get('HTTP_X_PROFILE_MODE', self.mode)
+        profiler = PROFILERS.get(mode, PROFILERS[self.mode])(interval=self.interval)
+        profiler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+        
+        profile_id = f'{uuid.uuid4().hex}.{profiler.extension}'
+        os.makedirs(self.directory, exist_ok=True)
+        profiler.dump(os.path.join(self.directory, profile_id))
+        response['X-Profile-Id'] = profile_id
+        return response
+
+
+class SlowQueryLogMiddleware:
+    """
+    Log queries slower than ``settings.SLOW_QUERY_MS`` milliseconds, with
+    their plan and the view that ran them, via SlowQueryRecorder (see
+    slow_queries.py). Removed from the stack at startup while the threshold
+    is 0.
+    """
+    
+    def __init__(self, get_response):
+        self.threshold = getattr(settings, 'SLOW_QUERY_MS', 0)
+        if not self.threshold:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        request._slow_query_recorders = [
+            SlowQueryRecorder(alias, self.threshold) for alias in settings.DATABASES
+        ]
+        with ExitStack() as stack:
+            for recorder in request._slow_query_recorders:
+                stack.enter_context(connections[recorder.alias].execute_wrapper(recorder))
+            return self.get_response(request)
+    
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        for recorder in request._slow_query_recorders:
+            recorder.view = request.resolver_match.view_name
+        return None
@@ -0,0 +1,71 @@
+"""
+Keyset pagination for newest-first timelines (a user's posts or comments,
+the home feed).
+
+Pages are addressed by an opaque cursor holding the (created_at, id) of the
+last item served, so each page is an index seek rather than an OFFSET scan.
+"""
+import base64
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+TIMELINE_DEFAULT_LIMIT = 20
+TIMELINE_MAX_LIMIT = 100
+
+
+def encode_timeline_cursor(item):
+    """Opaque keyset cursor for the timeline position after ``item``."""
+    raw = f'{item.id}:{item.created_at.isoformat()}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_timeline_cursor(cursor):
+    """Inverse of encode_timeline_cursor; returns (created_at, id)."""
+    try:
+        item_id, created_at = base64.urlsafe_b64decode(cursor.encode()).decode().split(':', 1)
+        created_at = parse_datetime(created_at)
+        if created_at is None:
+            raise ValueError
+        return created_at, int(item_id)
+    except ValueError:
+        raise ValueError('Invalid cursor')
+
+
+def timeline_params(request):
+    """
+    The page size and start position from ?limit= and ?cursor=, as
+    (limit, (created_at, id) or None). Raises ValueError on bad params.
+    """
+    limit = int(request.GET.get('limit', TIMELINE_DEFAULT_LIMIT))
+    if not 1 <= limit <= TIMELINE_MAX_LIMIT:
+        raise ValueError(f'limit must be between 1 and {TIMELINE_MAX_LIMIT}')
+    cursor = request.GET.get('cursor')
+    return limit, decode_timeline_cursor(cursor) if cursor else None
+
+
+def seek(queryset, after, id_field='id'):
+    """
+    Order ``queryset`` newest first by (created_at, ``id_field``), starting
+    after the position ``after``. With an index on those columns this seeks
+    straight to the page instead of counting past an OFFSET, so deep pages
+    cost the same as the first.
+    """
+    if after:
+        created_at, item_id = after
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, **{f'{id_field}__lt': item_id})
+        )
+    return queryset.order_by('-created_at', f'-{id_field}')
+
+
+def timeline_page(request, queryset):
+    """
+    One page of ``queryset`` (a single author's rows) for ?limit= and
+    ?cursor=, as (items, next_cursor). Raises ValueError on bad params.
+    """
+    limit, after = timeline_params(request)
+    # One extra row tells whether another page follows
+    items = list(seek(queryset, after)[:limit + 1])
+    next_cursor = encode_timeline_cursor(items[limit - 1]) if len(items) > limit else None
+    return items[:limit], next_cursor
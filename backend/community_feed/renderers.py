@@ -0,0 +1,65 @@
+"""
+Fast API renderers, selected by the request's Accept header.
+
+- ORJSONRenderer answers application/json using orjson, which encodes
+  datetimes natively and is several times faster than the stdlib json
+  module on large payloads such as threaded comment trees. It falls back to
+  DRF's JSONRenderer when orjson is not installed, cannot encode the data,
+  or indentation other than 2 spaces is requested (e.g. by the browsable API).
+- MessagePackRenderer answers application/msgpack with a compact binary
+  encoding. It needs the optional msgpack package and is only registered in
+  REST_FRAMEWORK when that is installed.
+"""
+from rest_framework.utils import encoders
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+
+# Handles the types neither encoder knows (Decimal, lazy strings, querysets...)
+_fallback_encoder = encoders.JSONEncoder()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by orjson."""
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent not in (None, 2):
+            return super().render(data, accepted_media_type, renderer_context)
+        
+        option = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(data, default=_fallback_encoder.default, option=option)
+        except orjson.JSONEncodeError:
+            # e.g. comment threads nested deeper than orjson's recursion limit
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renderer which serializes to MessagePack."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # datetime=True writes aware datetimes as the msgpack timestamp type
+        return msgpack.packb(data, default=_fallback_encoder.default, datetime=True)
@@ -0,0 +1,43 @@
+"""
+Database routing between the primary and the optional read replica.
+
+Reads only go to the replica while the routing flag is set for the current
+request context, which ``ReplicaRoutingMiddleware`` does for GET requests
+to the views listed in ``settings.DATABASE_REPLICA_VIEWS``. Everything else,
+including all writes and like toggles, stays on the primary.
+"""
+from contextvars import ContextVar
+
+PRIMARY_ALIAS = 'default'
+REPLICA_ALIAS = 'replica'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def set_use_replica(enabled):
+    """Set the routing flag; returns a token for ``reset_use_replica``."""
+    return _use_replica.set(enabled)
+
+
+def reset_use_replica(token):
+    _use_replica.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Send opted-in reads to the replica and everything else to the primary."""
+    
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            return REPLICA_ALIAS
+        return PRIMARY_ALIAS
+    
+    def db_for_write(self, model, **hints):
+        return PRIMARY_ALIAS
+    
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+    
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives schema changes through replication
+        return db == PRIMARY_ALIAS
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 import os
 from decouple import config
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,16 +48,23 @@ INSTALLED_APPS = [
     'apps.users',
     'apps.posts',
     'apps.gamification',
+    'apps.jobs',
+    'community_feed',  # project-wide management commands
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'community_feed.middleware.ProfilerMiddleware',
+    'community_feed.middleware.SlowQueryLogMiddleware',
+    # Before anything that reads or rewrites the response body
+    'community_feed.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'community_feed.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'community_feed.urls'
@@ -83,10 +91,86 @@ WSGI_APPLICATION = 'community_feed.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
+# DB_ENGINE selects the backend profile: 'sqlite' (default) or 'postgres'.
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='community_feed'),
+            'USER': config('DB_USER', default='postgres'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            'OPTIONS': {
+                'sslmode': config('DB_SSLMODE', default='prefer'),
+            },
+            'CONN_MAX_AGE': config('CONN_MAX_AGE', default=600, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'community_feed.sqlite3',
+            'NAME': config('SQLITE_PATH', default=str(BASE_DIR / 'db.sqlite3')),
+            'OPTIONS': {
+                'transaction_mode': config('SQLITE_TRANSACTION_MODE', default='IMMEDIATE'),
+                # Applied to every new connection, see community_feed/sqlite3/base.py
+                'pragmas': {
+                    'journal_mode': config('SQLITE_JOURNAL_MODE', default='WAL'),
+                    'synchronous': config('SQLITE_SYNCHRONOUS', default='NORMAL'),
+                    'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int),  # ms
+                    'mmap_size': config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int),  # bytes
+                    'cache_size': config('SQLITE_CACHE_SIZE', default=-64000, cast=int),  # negative = KiB
+                    'temp_store': config('SQLITE_TEMP_STORE', default='MEMORY'),
+                },
+            },
+            # Keep connections open between requests so the PRAGMAs are paid once
+            'CONN_MAX_AGE': config('CONN_MAX_AGE', default=600, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+
+# Optional read replica. Without DB_REPLICA_HOST/DB_REPLICA_NAME the replica
+# alias points at the primary, which is enough to exercise routing locally.
+if config('DB_REPLICA', default=False, cast=bool):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': config('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'HOST': config('DB_REPLICA_HOST', default=DATABASES['default'].get('HOST', '')),
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default'].get('PORT', '')),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['community_feed.routers.PrimaryReplicaRouter']
+
+# GET requests to these views read from the replica (see ReplicaRoutingMiddleware)
+DATABASE_REPLICA_VIEWS = [
+    'posts:post-list-create',
+    'posts:post-comments-threaded',
+    'posts:search',
+    'posts:posts-batch',
+    'posts:home-feed',
+    'posts:trending-tags',
+    'users:user-posts',
+    'users:user-comments',
+    'gamification:leaderboard',
+]
+
+# After a write, that client's reads stay on the primary for this many seconds
+DATABASE_REPLICA_PIN_SECONDS = config('DB_REPLICA_PIN_SECONDS', default=5, cast=int)
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Use a shared backend (e.g. django.core.cache.backends.redis.RedisCache) when
+# running more than one worker process.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='community-feed'),
     }
 }
 
@@ -154,5 +238,70 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
+    # Picked by the Accept header; see community_feed/renderers.py
+    "DEFAULT_RENDERER_CLASSES": [
+        "community_feed.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
+# MessagePack is optional; only offer it when the package is installed
+if find_spec('msgpack'):
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"].append(
+        "community_feed.renderers.MessagePackRenderer"
+    )
+
+# Leaderboard cache (apps/gamification/cache.py): results are fresh for TTL
+# seconds and served stale for up to STALE_TTL more while one worker refreshes
+LEADERBOARD_CACHE_TTL = config('LEADERBOARD_CACHE_TTL', default=15, cast=int)
+LEADERBOARD_CACHE_STALE_TTL = config('LEADERBOARD_CACHE_STALE_TTL', default=120, cast=int)
+LEADERBOARD_CACHE_LOCK_TIMEOUT = config('LEADERBOARD_CACHE_LOCK_TIMEOUT', default=10, cast=int)
+
+# Background jobs (apps/jobs/queue.py). JOBS_MODE is 'worker' (run
+# `manage.py run_jobs` alongside the web process; start.sh does), 'thread'
+# (drain the queue in an in-process thread pool after each commit and every
+# JOBS_POLL_INTERVAL seconds; fine for development) or 'sync' (drain in the
+# committing thread)
+JOBS_MODE = config('JOBS_MODE', default='thread')
+JOBS_THREADS = config('JOBS_THREADS', default=2, cast=int)
+JOBS_POLL_INTERVAL = config('JOBS_POLL_INTERVAL', default=5, cast=float)  # seconds; 0 disables
+JOBS_BATCH_SIZE = config('JOBS_BATCH_SIZE', default=100, cast=int)
+JOBS_RETRY_DELAY = config('JOBS_RETRY_DELAY', default=5, cast=int)  # seconds, doubled per attempt
+JOBS_LOCK_TIMEOUT = config('JOBS_LOCK_TIMEOUT', default=300, cast=int)  # reclaim jobs of dead workers
+
+# On-demand request profiling (community_feed.middleware.ProfilerMiddleware):
+# send `X-Profile: <PROFILER_TOKEN>` to profile one request. Disabled (and
+# removed from the middleware stack) while PROFILER_TOKEN is empty
+PROFILER_TOKEN = config('PROFILER_TOKEN', default='')
+PROFILER_DIR = config('PROFILER_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILER_MODE = config('PROFILER_MODE', default='cprofile')  # or 'sample'
+PROFILER_SAMPLE_INTERVAL = config('PROFILER_SAMPLE_INTERVAL', default=0.001, cast=float)
+
+# Slow query log (community_feed/slow_queries.py): queries taking at least
+# SLOW_QUERY_MS milliseconds are appended with their EXPLAIN output to a
+# rotating NDJSON file; summarize it with `manage.py slow_query_report`.
+# 0 disables it
+SLOW_QUERY_MS = config('SLOW_QUERY_MS', default=0, cast=float)
+SLOW_QUERY_LOG_FILE = config('SLOW_QUERY_LOG_FILE', default=str(BASE_DIR / 'logs' / 'slow_queries.ndjson'))
+SLOW_QUERY_LOG_MAX_BYTES = config('SLOW_QUERY_LOG_MAX_BYTES', default=10 * 1024 * 1024, cast=int)
+SLOW_QUERY_LOG_BACKUPS = config('SLOW_QUERY_LOG_BACKUPS', default=5, cast=int)
+
+# Response compression (community_feed.middleware.CompressionMiddleware).
+# Brotli is used when the brotli package is installed, gzip otherwise
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_GZIP_LEVEL = config('COMPRESSION_GZIP_LEVEL', default=6, cast=int)
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=5, cast=int)
+COMPRESSION_STREAMING = config('COMPRESSION_STREAMING', default=False, cast=bool)
+COMPRESSION_CACHE_TIMEOUT = config('COMPRESSION_CACHE_TIMEOUT', default=300, cast=int)
+
+# Feed ranking: seconds of post age equivalent to a 10x difference in likes
+# for the "hot" sort (see apps.posts.models.hot_score)
+FEED_HOT_DECAY_SECONDS = config('FEED_HOT_DECAY_SECONDS', default=45000, cast=int)
+
+# Home timeline (apps.posts.models.TimelineEntry): new posts are copied into
+# each follower's inbox, FANOUT_BATCH_SIZE followers per INSERT, unless the
+# author has more than FANOUT_MAX_FOLLOWERS followers; such authors' posts are
+# merged in at read time instead. A new follow backfills BACKFILL_POSTS posts
+FEED_FANOUT_MAX_FOLLOWERS = config('FEED_FANOUT_MAX_FOLLOWERS', default=10000, cast=int)
+FEED_FANOUT_BATCH_SIZE = config('FEED_FANOUT_BATCH_SIZE', default=1000, cast=int)
+FEED_BACKFILL_POSTS = config('FEED_BACKFILL_POSTS', default=50, cast=int)
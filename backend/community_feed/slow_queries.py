@@ -0,0 +1,116 @@
+"""
+Slow query log.
+
+SlowQueryRecorder is a ``connection.execute_wrapper`` that times every query
+and, for those over ``settings.SLOW_QUERY_MS``, appends one JSON line to the
+rotating file ``settings.SLOW_QUERY_LOG_FILE``. Each line carries the SQL, a
+fingerprint (the SQL with literals and IN-lists normalized, so repeats of one
+query group together), the view that ran it and, for reads, the database's
+EXPLAIN (QUERY PLAN) output. ``manage.py slow_query_report`` summarizes the
+file by fingerprint. Parameters are not logged since they may hold user data.
+"""
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*\?\s*,?)+\)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+_logger = logging.getLogger('community_feed.slow_queries')
+_logger.propagate = False
+_handler_lock = threading.Lock()
+
+
+def fingerprint(sql):
+    """Normalize ``sql`` so executions differing only in values compare equal."""
+    normalized = _STRING_RE.sub('?', sql)
+    normalized = _NUMBER_RE.sub('?', normalized).replace('%s', '?')
+    normalized = _IN_LIST_RE.sub('IN (...)', normalized)
+    normalized = _SPACE_RE.sub(' ', normalized).strip()
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16], normalized
+
+
+def _get_logger():
+    if not _logger.handlers:
+        with _handler_lock:
+            if not _logger.handlers:
+                path = settings.SLOW_QUERY_LOG_FILE
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                handler = logging.handlers.RotatingFileHandler(
+                    path,
+                    maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+                    backupCount=settings.SLOW_QUERY_LOG_BACKUPS,
+                )
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                _logger.addHandler(handler)
+                _logger.setLevel(logging.INFO)
+    return _logger
+
+
+class SlowQueryRecorder:
+    """Execute wrapper logging queries slower than ``threshold_ms`` for one request."""
+    
+    def __init__(self, alias, threshold_ms, view=None):
+        self.alias = alias
+        self.threshold = threshold_ms / 1000
+        self.view = view
+        self._explaining = False
+    
+    def __call__(self, execute, sql, params, many, context):
+        if self._explaining:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - start
+        if duration >= self.threshold:
+            self.record(sql, params, many, duration, context['connection'])
+        return result
+    
+    def record(self, sql, params, many, duration, connection):
+        digest, normalized = fingerprint(sql)
+        entry = {
+            'timestamp': timezone.now().isoformat(),
+            'alias': self.alias,
+            'view': self.view,
+            'duration_ms': round(duration * 1000, 3),
+            'fingerprint': digest,
+            'sql': normalized,
+            'many': many,
+            'explain': None if many else self.explain(sql, params, connection),
+        }
+        _get_logger().info(json.dumps(entry, default=str))
+    
+    def explain(self, sql, params, connection):
+        """The plan rows for a read query as strings, or None."""
+        if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return None
+        prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+        self._explaining = True
+        try:
+            # A failed statement would abort an enclosing PostgreSQL
+            # transaction, so fence the EXPLAIN off in a savepoint there
+            if connection.in_atomic_block and connection.vendor == 'postgresql':
+                with transaction.atomic(using=self.alias):
+                    return self._run_explain(connection, prefix + sql, params)
+            return self._run_explain(connection, prefix + sql, params)
+        except Exception as e:
+            return [f'EXPLAIN failed: {e}']
+        finally:
+            self._explaining = False
+    
+    @staticmethod
+    def _run_explain(connection, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [' | '.join(str(column) for column in row) for row in cursor.fetchall()]
@@ -0,0 +1,45 @@
+"""
+SQLite backend with production tuning applied on every new connection.
+
+Extends Django's stock sqlite3 backend with two extra OPTIONS keys:
+
+- ``pragmas``: mapping of PRAGMA name -> value run when a connection opens
+  (journal_mode, synchronous, busy_timeout, mmap_size, cache_size, ...).
+- ``transaction_mode``: ``DEFERRED`` (SQLite's default), ``IMMEDIATE`` or
+  ``EXCLUSIVE``. ``IMMEDIATE`` takes the write lock when an atomic block
+  starts, so read-then-write blocks such as ``Like.toggle_like`` wait on
+  ``busy_timeout`` instead of failing with "database is locked" when two
+  writers try to upgrade their read locks at the same time.
+"""
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+def apply_pragmas(conn, pragmas):
+    """Run each PRAGMA on a raw sqlite3 connection."""
+    for name, value in pragmas.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # Our own options must not reach sqlite3.connect()
+        self.pragmas = kwargs.pop('pragmas', {})
+        self.transaction_mode = kwargs.pop('transaction_mode', 'DEFERRED').upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ValueError(
+                f'Invalid SQLite transaction_mode {self.transaction_mode!r}, '
+                f'expected one of {", ".join(TRANSACTION_MODES)}'
+            )
+        return kwargs
+    
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        apply_pragmas(conn, self.pragmas)
+        return conn
+    
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -0,0 +1,295 @@
+import gzip
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import time
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import connection, connections
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from .middleware import CompressionMiddleware, ProfilerMiddleware, brotli
+from .renderers import MessagePackRenderer, ORJSONRenderer, msgpack, orjson
+from .routers import PRIMARY_ALIAS, REPLICA_ALIAS
+from .slow_queries import SlowQueryRecorder, fingerprint
+
+
+@override_settings(
+    DATABASE_ROUTERS=['community_feed.routers.PrimaryReplicaRouter'],
+    DATABASE_REPLICA_PIN_SECONDS=1,
+    # Commits are real here; keep job threads off the test database
+    JOBS_MODE='worker',
+)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Which alias each request reads from. The replica is a test mirror of the
+    primary: a second connection to the same test database, which sees
+    committed rows, hence TransactionTestCase.
+    """
+    # Resolved in setUpClass, after the replica alias is added
+    databases = '__all__'
+    
+    @classmethod
+    def setUpClass(cls):
+        # Without DB_REPLICA=True the alias is not configured; add it as
+        # settings.py would, pointed at the already created test database
+        cls.added_replica = REPLICA_ALIAS not in connections
+        if cls.added_replica:
+            primary = connections[PRIMARY_ALIAS].settings_dict
+            connections.settings[REPLICA_ALIAS] = {**primary, 'TEST': {**primary['TEST'], 'MIRROR': PRIMARY_ALIAS}}
+        super().setUpClass()
+    
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if cls.added_replica:
+            connections[REPLICA_ALIAS].close()
+            del connections[REPLICA_ALIAS]
+            del connections.settings[REPLICA_ALIAS]
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='writer')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+    
+    def tearDown(self):
+        # An open shared-cache connection keeps the tables locked against
+        # the flush that resets the primary
+        connections[REPLICA_ALIAS].close()
+    
+    def aliases(self, method, path, client=None, **data):
+        """Send a request and return the aliases that ran queries for it."""
+        with CaptureQueriesContext(connections[PRIMARY_ALIAS]) as primary:
+            with CaptureQueriesContext(connections[REPLICA_ALIAS]) as replica:
+                response = getattr(client or self.client, method)(path, data)
+        self.assertLess(response.status_code, 400)
+        return {alias for alias, queries in ((PRIMARY_ALIAS, primary), (REPLICA_ALIAS, replica)) if queries}
+    
+    def test_listed_views_read_from_the_replica(self):
+        self.assertEqual(self.aliases('get', '/api/posts/'), {REPLICA_ALIAS})
+        self.assertEqual(self.aliases('get', '/api/posts/tags/trending/'), {REPLICA_ALIAS})
+        # The search index is queried with raw SQL on the routed alias too
+        self.assertEqual(self.aliases('get', '/api/posts/search/', q='hello'), {REPLICA_ALIAS})
+    
+    def test_writes_and_other_views_use_the_primary(self):
+        self.assertEqual(self.aliases('get', '/api/users/profile/'), {PRIMARY_ALIAS})
+        cache.clear()  # forget the write pin for the next check
+        self.assertEqual(self.aliases('post', '/api/posts/', content='hello'), {PRIMARY_ALIAS})
+    
+    def test_writer_is_pinned_to_the_primary_after_a_write(self):
+        self.aliases('post', '/api/posts/', content='hello')
+        
+        self.assertEqual(self.aliases('get', '/api/posts/'), {PRIMARY_ALIAS})
+        # Other clients are not pinned
+        self.assertEqual(self.aliases('get', '/api/posts/', client=APIClient()), {REPLICA_ALIAS})
+        # Reads go back to the replica once DATABASE_REPLICA_PIN_SECONDS pass
+        time.sleep(1.1)
+        self.assertEqual(self.aliases('get', '/api/posts/'), {REPLICA_ALIAS})
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100, COMPRESSION_STREAMING=False, COMPRESSION_CACHE_TIMEOUT=300)
+class CompressionMiddlewareTests(SimpleTestCase):
+    
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.body = b'{"users": [' + b'{"username": "someone", "karma": 5}, ' * 50 + b'{}]}'
+    
+    def respond(self, response, accept='gzip, deflate, br'):
+        middleware = CompressionMiddleware(lambda request: response)
+        result = middleware(self.factory.get('/api/gamification/leaderboard/', HTTP_ACCEPT_ENCODING=accept))
+        self.assertIn('Accept-Encoding', result['Vary'])
+        return result
+    
+    def test_small_bodies_are_sent_as_is(self):
+        response = self.respond(HttpResponse(b'{"ok": true}'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, b'{"ok": true}')
+    
+    @skipUnless(brotli, 'brotli is not installed')
+    def test_brotli_is_preferred_when_accepted(self):
+        response = self.respond(HttpResponse(self.body))
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), self.body)
+    
+    def test_gzip_when_brotli_is_not_accepted(self):
+        response = self.respond(HttpResponse(self.body), accept='gzip;q=1.0, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        
+        response = self.respond(HttpResponse(self.body), accept='identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+    
+    def test_streaming_responses_pass_through_unless_enabled(self):
+        chunks = [self.body[:200], self.body[200:]]
+        response = self.respond(StreamingHttpResponse(iter(chunks)))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+        
+        with self.settings(COMPRESSION_STREAMING=True):
+            response = self.respond(StreamingHttpResponse(iter(chunks)))
+        # Chunks are flushed as they come, so only gzip is used
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.body)
+    
+    def test_compressed_bytes_are_cached_by_etag(self):
+        def versioned():
+            response = HttpResponse(self.body)
+            response['ETag'] = '"v1"'
+            return response
+        
+        with mock.patch('community_feed.middleware.gzip.compress', wraps=gzip.compress) as compress:
+            first = self.respond(versioned(), accept='gzip')
+            second = self.respond(versioned(), accept='gzip')
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(first.content, second.content)
+        # The compressed body no longer matches the strong validator
+        self.assertEqual(second['ETag'], 'W/"v1"')
+
+
+@skipUnless(orjson and msgpack, 'orjson and msgpack are optional')
+class RendererTests(SimpleTestCase):
+    
+    def render(self, data, media_type=None):
+        return ORJSONRenderer().render(data, media_type)
+    
+    def test_orjson_output_matches_the_stdlib_renderer(self):
+        data = {
+            'created_at': datetime(2024, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc),
+            'karma': Decimal('1.50'),
+            1: 'non-string key',
+        }
+        self.assertEqual(json.loads(self.render(data)), json.loads(JSONRenderer().render(data)))
+        self.assertEqual(json.loads(self.render(data))['created_at'], '2024-01-02T03:04:05Z')
+    
+    def test_indent_other_than_two_falls_back(self):
+        self.assertEqual(self.render({'a': 1}, 'application/json; indent=2'), b'{\n  "a": 1\n}')
+        self.assertEqual(self.render({'a': 1}, 'application/json; indent=4'), b'{\n    "a": 1\n}')
+    
+    def test_data_orjson_cannot_encode_falls_back(self):
+        # Integers past 64 bits and nesting past orjson's recursion limit
+        deep = thread = {}
+        for _ in range(300):
+            thread['children'] = {}
+            thread = thread['children']
+        for data in ({'n': 2 ** 70}, deep):
+            with self.subTest(data=str(data)[:20]):
+                with self.assertRaises(orjson.JSONEncodeError):
+                    orjson.dumps(data)
+                self.assertEqual(self.render(data), JSONRenderer().render(data))
+    
+    def test_messagepack_writes_aware_datetimes_as_timestamps(self):
+        moment = datetime(2024, 1, 2, 3, 4, 5, 600000, tzinfo=dt_timezone.utc)
+        packed = MessagePackRenderer().render({'at': moment, 'naive': datetime(2024, 1, 2)})
+        # Timestamps are ext type -1; naive datetimes are left to the DRF encoder
+        self.assertEqual(
+            msgpack.unpackb(packed, timestamp=3), {'at': moment, 'naive': '2024-01-02T00:00:00'}
+        )
+        self.assertIsInstance(msgpack.unpackb(packed)['at'], msgpack.Timestamp)
+
+
+class ProfilerMiddlewareTests(SimpleTestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.factory = RequestFactory()
+    
+    def middleware(self, token='secret'):
+        with self.settings(PROFILER_TOKEN=token, PROFILER_DIR=self.directory, PROFILER_MODE='cprofile'):
+            return ProfilerMiddleware(lambda request: HttpResponse('ok'))
+    
+    def test_not_loaded_without_a_token(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            self.middleware(token='')
+    
+    def test_wrong_or_misplaced_token_is_ignored(self):
+        middleware = self.middleware()
+        for request in (
+            self.factory.get('/api/posts/', HTTP_X_PROFILE='guess'),
+            self.factory.get('/api/posts/', {'profile': 'secret'}),
+        ):
+            self.assertFalse(middleware(request).has_header('X-Profile-Id'))
+        self.assertEqual(os.listdir(self.directory), [])
+    
+    def test_matching_header_writes_a_profile(self):
+        response = self.middleware()(self.factory.get('/api/posts/', HTTP_X_PROFILE='secret'))
+        
+        profile_id = response['X-Profile-Id']
+        self.assertTrue(profile_id.endswith('.pstats'))
+        self.assertEqual(os.listdir(self.directory), [profile_id])
+        pstats.Stats(os.path.join(self.directory, profile_id))  # loads as a profile
+
+
+class SlowQueryLogTests(TestCase):
+    
+    def test_fingerprint_drops_literals_and_parameters(self):
+        digest, normalized = fingerprint(
+            "SELECT * FROM users WHERE username = 'alice' AND id IN (1, 2, 3) LIMIT 21"
+        )
+        
+        self.assertEqual(normalized, 'SELECT * FROM users WHERE username = ? AND id IN (...) LIMIT ?')
+        for sql in (
+            "SELECT * FROM users WHERE username = 'o''brien' AND id IN (7) LIMIT 5",
+            'SELECT *  FROM users\n WHERE username = %s AND id IN (%s, %s) LIMIT %s',
+        ):
+            self.assertEqual(fingerprint(sql)[0], digest)
+        self.assertNotEqual(fingerprint('SELECT * FROM posts WHERE id = 1')[0], digest)
+    
+    def test_recorded_entry_has_no_parameters(self):
+        logger = mock.Mock()
+        with mock.patch('community_feed.slow_queries._get_logger', return_value=logger):
+            with connection.execute_wrapper(SlowQueryRecorder('default', 0, view='profile')):
+                User.objects.filter(username='secret-name').exists()
+        
+        line = logger.info.call_args.args[0]
+        self.assertNotIn('secret-name', line)
+        entry = json.loads(line)
+        self.assertEqual(entry['view'], 'profile')
+        self.assertEqual(entry['fingerprint'], fingerprint(entry['sql'])[0])
+        self.assertTrue(entry['explain'])
+    
+    def test_report_groups_by_fingerprint(self):
+        def entry(sql, duration_ms, view):
+            digest, normalized = fingerprint(sql)
+            return json.dumps({
+                'timestamp': '2026-01-01T00:00:00+00:00', 'view': view, 'fingerprint': digest,
+                'sql': normalized, 'duration_ms': duration_ms, 'explain': None,
+            })
+        
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'slow.ndjson')
+        with open(path, 'w') as log:
+            log.write('\n'.join([
+                entry('SELECT * FROM posts WHERE id = 1', 10, 'post-detail'),
+                entry('SELECT * FROM posts WHERE id = 2', 30, 'post-list'),
+                entry('SELECT * FROM users WHERE id = 3', 5, 'profile'),
+                '{"truncated',
+            ]))
+        out = StringIO()
+        
+        call_command('slow_query_report', file=path, sort='count', stdout=out)
+        
+        headings = [line for line in out.getvalue().splitlines() if 'total' in line]
+        self.assertEqual(len(headings), 2)
+        self.assertIn('2x  total 40.0 ms  avg 20.0 ms  max 30.0 ms', headings[0])
+        self.assertIn('1x  total 5.0 ms', headings[1])
+        self.assertIn('views: post-detail, post-list', out.getvalue())
+        self.assertIn('sql: SELECT * FROM posts WHERE id = ?', out.getvalue())
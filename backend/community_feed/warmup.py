@@ -0,0 +1,63 @@
+"""
+Worker warmup.
+
+Django and DRF initialize a lot lazily: the URL resolver imports every app's
+urls and views and compiles their patterns on the first reverse() or resolve(),
+translation catalogs load on the first gettext, and the ContentType cache
+fills one query at a time. Left alone, that all lands on a worker's first
+requests. (Serializer fields are not warmed: DRF builds and caches them per
+serializer instance, so nothing built here would be reused by a request.) ``warmup()`` does it up front; gunicorn.conf.py calls it in the
+master before forking (preload) or in each worker before it accepts requests.
+"""
+import logging
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver
+from django.utils import translation
+
+logger = logging.getLogger(__name__)
+
+
+def warmup():
+    """
+    Run the lazy initialization a fresh worker would otherwise do while
+    serving. Every step is best effort: a failure is logged and never stops
+    the server. Returns the time taken in seconds.
+    """
+    start = time.perf_counter()
+    for step in (_load_urls, _load_translations, _fill_content_type_cache):
+        try:
+            step()
+        except Exception:
+            logger.exception('Warmup step %s failed', step.__name__)
+    
+    # A preloading master must not hand its connections to forked workers
+    connections.close_all()
+    elapsed = time.perf_counter() - start
+    logger.info('Warmup finished in %.0f ms', elapsed * 1000)
+    return elapsed
+
+
+def _load_urls():
+    # Building the reverse lookup imports every urlconf and view module
+    get_resolver().reverse_dict
+
+
+def _load_translations():
+    translation.activate(settings.LANGUAGE_CODE)
+    translation.gettext('Not found.')
+    translation.deactivate()
+
+
+def _fill_content_type_cache():
+    from django.contrib.contenttypes.models import ContentType
+    
+    models = apps.get_models()
+    for model in models:
+        model._meta.get_fields()
+    # One query instead of one per model on first use
+    ContentType.objects.get_for_models(*models)
+
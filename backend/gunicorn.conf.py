@@ -0,0 +1,71 @@
+"""
+Gunicorn configuration, loaded automatically when gunicorn starts from this
+directory (see start.sh). Everything can be overridden from the environment.
+
+GUNICORN_WORKER_CLASS picks the worker: ``gthread`` (default; sync Django in
+GUNICORN_THREADS threads per process), ``sync``, or ``uvicorn`` (serves the
+ASGI application; needs ``pip install uvicorn``). With GUNICORN_PRELOAD the
+application is imported and warmed up once in the master before forking, so
+workers start warm and share its memory pages; otherwise each worker warms up
+after loading the application and before accepting requests. See
+community_feed/warmup.py.
+"""
+import multiprocessing
+
+# Imported as a module: gunicorn would read a top-level ``config`` as its
+# own setting of that name
+
+import decouple
+
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'uvicorn': 'uvicorn.workers.UvicornWorker',
+}
+
+_worker = decouple.config('GUNICORN_WORKER_CLASS', default='gthread')
+if _worker not in WORKER_CLASSES:
+    raise ValueError(f'GUNICORN_WORKER_CLASS must be one of: {", ".join(WORKER_CLASSES)}')
+
+worker_class = WORKER_CLASSES[_worker]
+wsgi_app = 'community_feed.asgi:application' if _worker == 'uvicorn' else 'community_feed.wsgi:application'
+bind = f'0.0.0.0:{decouple.config("PORT", default=8000, cast=int)}'
+# The replica pin, the leaderboard refresh lock and the ETag cache live in
+# the Django cache, so with the default per-process LocMemCache they only
+# hold inside one worker. More workers need a shared CACHE_BACKEND.
+_shared_cache = decouple.config(
+    'CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'
+) != 'django.core.cache.backends.locmem.LocMemCache'
+workers = decouple.config(
+    'GUNICORN_WORKERS', default=multiprocessing.cpu_count() * 2 + 1 if _shared_cache else 1, cast=int
+)
+if workers > 1 and not _shared_cache:
+    raise ValueError('GUNICORN_WORKERS > 1 needs a shared CACHE_BACKEND (LocMemCache is per process)')
+threads = decouple.config('GUNICORN_THREADS', default=4, cast=int)
+timeout = decouple.config('GUNICORN_TIMEOUT', default=30, cast=int)
+preload_app = decouple.config('GUNICORN_PRELOAD', default=True, cast=bool)
+accesslog = '-'
+
+WARMUP = decouple.config('GUNICORN_WARMUP', default=True, cast=bool)
+
+
+def when_ready(server):
+    # With preload_app the application is already imported in the master
+    if WARMUP and server.cfg.preload_app:
+        from community_feed.warmup import warmup
+        
+        server.log.info('Warmed up in master in %.0f ms', warmup() * 1000)
+
+
+def post_worker_init(worker):
+    if WARMUP and not worker.cfg.preload_app:
+        from community_feed.warmup import warmup
+        
+        worker.log.info('Warmed up worker in %.0f ms', warmup() * 1000)
+    
+    # With JOBS_MODE=thread, runs delayed jobs and retries without waiting
+    # for the next commit to trigger a drain
+    from apps.jobs import queue
+    
+    queue.start_poller()
+    worker.log.info('Worker ready (pid: %s)', worker.pid)
@@ -1,2 +1,8 @@
 python manage.py migrate
-gunicorn community_feed.wsgi:application --bind 0.0.0.0:$PORT
+# JOBS_MODE=worker needs a job runner next to the web process (JOBS_MODE=thread
+# drains jobs inside the gunicorn workers instead); read it like settings.py does
+if [ "$(python -c "from decouple import config; print(config('JOBS_MODE', default='thread'))")" = "worker" ]; then
+    python manage.py run_jobs &
+fi
+# Worker class, preload and warmup are configured in gunicorn.conf.py
+exec gunicorn --config gunicorn.conf.py
@@ -45,6 +45,11 @@ export const postsAPI = {
   deleteComment: (id) => api.delete(`/comments/${id}/`),
   toggleLike: (contentType, objectId) => api.post(`/posts/like/${contentType}/${objectId}/`),
   getLikeStatus: (postIds) => api.get('/posts/like-status/', { params: { post_ids: postIds } }),
+  getBatch: (postIds, roots = 3) => api.get('/posts/batch/', {
+    params: { post_ids: postIds, roots },
+    // Repeat the key (post_ids=1&post_ids=2) as Django's getlist expects
+    paramsSerializer: { indexes: null },
+  }),
 };
 
 // Gamification API